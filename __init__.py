@@ -32,8 +32,11 @@ from .src.nodes.images_to_3dmodels import ImagesTo3DModels
 
 # MPX GenAI SDK components
 from .src.nodes.text_to_image import TextToImage
+from .src.nodes.optimize_models import OptimizeModels, OptimizeModelsToLODChains
 
 from .src.setup_api_key_server import setup_api_key
+from .src.metrics_server import get_metrics_snapshot
+from .src.show_list_server import get_list_page
 
 
 NODE_CLASS_MAPPINGS = {
@@ -71,6 +74,8 @@ NODE_CLASS_MAPPINGS = {
 
     # MPX GenAI SDK components
     "TextToImage": TextToImage,
+    "OptimizeModels": OptimizeModels,
+    "OptimizeModelsToLODChains": OptimizeModelsToLODChains,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
@@ -108,6 +113,8 @@ NODE_DISPLAY_NAME_MAPPINGS = {
 
     # MPX GenAI SDK components
     "TextToImage": "Text to Image(s)",
+    "OptimizeModels": "Optimize 3D Model(s)",
+    "OptimizeModelsToLODChains": "3D Model(s) to LOD Chain(s)",
 }
 
 WEB_DIRECTORY = "./src/js"
@@ -0,0 +1,137 @@
+import os
+import sys
+import types
+import tempfile
+import importlib.util
+
+# Minimal stand-ins for the ComfyUI modules the nodes import (comfy.utils, comfy.model_management,
+# folder_paths and server) so the nodes can be imported and executed outside of ComfyUI.
+# Real ComfyUI modules are always preferred when they can be imported.
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PACKAGE_NAME = "mpx_comfyui_nodes"
+
+
+class ProgressBar():
+    def __init__(self, total):
+        self.total = total
+        self.current = 0
+
+    def update_absolute(self, value, total=None, preview=None):
+        if total is not None:
+            self.total = total
+        self.current = value
+
+    def update(self, value):
+        self.update_absolute(self.current + value, self.total)
+
+
+class InterruptProcessingException(Exception):
+    pass
+
+
+class _Routes():
+    """
+        Accepts route registrations like aiohttp's RouteTableDef and ignores them.
+    """
+    def _register(self, path):
+        def decorator(handler):
+            return handler
+        return decorator
+
+    get = post = put = delete = _register
+
+
+class _PromptServer():
+    instance = None
+
+    def __init__(self):
+        self.routes = _Routes()
+        self.last_prompt_id = None
+
+    def send_sync(self, event, data, sid=None):
+        pass
+
+
+_output_directory = None
+_interrupted = False
+
+
+def _get_output_directory():
+    global _output_directory
+    if _output_directory is None:
+        _output_directory = tempfile.mkdtemp(prefix="mpx_benchmark_output_")
+    return _output_directory
+
+
+def _processing_interrupted():
+    return _interrupted
+
+
+def _interrupt_current_processing(value=True):
+    global _interrupted
+    _interrupted = value
+
+
+def _is_importable(module_name: str) -> bool:
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def install():
+    """
+        Register the shims in sys.modules for every ComfyUI module that can't be imported.
+    """
+    if not _is_importable("comfy"):
+        comfy = types.ModuleType("comfy")
+        comfy.__path__ = []
+
+        comfy_utils = types.ModuleType("comfy.utils")
+        comfy_utils.ProgressBar = ProgressBar
+
+        model_management = types.ModuleType("comfy.model_management")
+        model_management.InterruptProcessingException = InterruptProcessingException
+        model_management.processing_interrupted = _processing_interrupted
+        model_management.interrupt_current_processing = _interrupt_current_processing
+
+        comfy.utils = comfy_utils
+        comfy.model_management = model_management
+        sys.modules["comfy"] = comfy
+        sys.modules["comfy.utils"] = comfy_utils
+        sys.modules["comfy.model_management"] = model_management
+
+    if not _is_importable("folder_paths"):
+        folder_paths = types.ModuleType("folder_paths")
+        folder_paths.get_output_directory = _get_output_directory
+        folder_paths.get_temp_directory = _get_output_directory
+        folder_paths.get_input_directory = _get_output_directory
+        sys.modules["folder_paths"] = folder_paths
+
+    if not _is_importable("server"):
+        server = types.ModuleType("server")
+        _PromptServer.instance = _PromptServer()
+        server.PromptServer = _PromptServer
+        sys.modules["server"] = server
+
+
+def import_package_module(module_name: str):
+    """
+        Import a module of the package by its path below src/, e.g. import_package_module("nodes.utils.script_chunking"),
+        without running the package's __init__.py (which registers every node and the server routes).
+    """
+    import importlib
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [REPO_ROOT]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.src.{module_name}")
+
+
+def import_node_module(module_name: str):
+    """
+        Import one of the node modules, e.g. import_node_module("images_to_3dmodels"), without running the
+        package's __init__.py (which registers every node and the server routes).
+    """
+    return import_package_module(f"nodes.{module_name}")
@@ -0,0 +1,362 @@
+import io
+import json
+import math
+import zlib
+import time
+import random
+import threading
+import itertools
+from collections import Counter
+from types import SimpleNamespace
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from PIL import Image, ImageDraw
+
+# Local stand-in for the MPX API.
+#
+# FakeMasterpiecex mirrors the parts of the mpx_genai_sdk client that the nodes use (llms.call, llms.image_query,
+# components.text2image, components.optimize, functions.imageto3d, assets.create, status.retrieve) and is
+# installed with sdk_client.set_client(). Jobs finish after a latency drawn from a per-endpoint distribution
+# and fail at a configurable rate. Uploads and generated outputs live in FakeStorageServer, a real HTTP server
+# on localhost, so the PUT/GET code paths of the nodes run unchanged.
+
+
+class LatencyModel():
+    """
+        Log-normal latency around median_s. A fraction straggler_rate of the samples is multiplied by straggler_factor.
+    """
+    def __init__(self, median_s: float, sigma: float = 0.3, straggler_rate: float = 0.0, straggler_factor: float = 10.0):
+        self.median_s = median_s
+        self.sigma = sigma
+        self.straggler_rate = straggler_rate
+        self.straggler_factor = straggler_factor
+
+    def sample(self, rng: random.Random) -> float:
+        latency = self.median_s * math.exp(self.sigma * rng.gauss(0, 1))
+        if rng.random() < self.straggler_rate:
+            latency *= self.straggler_factor
+        return latency
+
+
+class EndpointProfile():
+    def __init__(self, latency: LatencyModel, failure_rate: float = 0.0, submit_latency: LatencyModel = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.submit_latency = submit_latency
+
+
+def default_profiles(scale: float = 1.0) -> dict:
+    """
+        Job latencies with roughly the same proportions as the live API, compressed from seconds to tens of milliseconds.
+    """
+    return {
+        "llms.call": EndpointProfile(LatencyModel(0.05 * scale)),
+        "llms.image_query": EndpointProfile(LatencyModel(0.08 * scale)),
+        "components.text2image": EndpointProfile(LatencyModel(0.10 * scale)),
+        "functions.imageto3d": EndpointProfile(LatencyModel(0.40 * scale)),
+        "components.optimize": EndpointProfile(LatencyModel(0.15 * scale)),
+        "assets.create": EndpointProfile(LatencyModel(0.0)),
+    }
+
+
+def straggler_profiles(scale: float = 1.0, straggler_rate: float = 0.05, straggler_factor: float = 10.0) -> dict:
+    """
+        Same as default_profiles() but with a heavy tail, for measuring request hedging.
+    """
+    profiles = default_profiles(scale)
+    for endpoint, profile in profiles.items():
+        profile.latency.straggler_rate = straggler_rate
+        profile.latency.straggler_factor = straggler_factor
+    return profiles
+
+
+def default_llm_responder(endpoint: str, prompt: str) -> str:
+    """
+        Answer every prompt with a JSON that has all the keys any of the nodes look for.
+    """
+    return json.dumps({
+        "reasoning": "Fake reasoning.",
+        "updated_text": "Fake updated text.",
+        "merged_text": "Fake merged text.",
+        "list_of_strings": ["fake item 1", "fake item 2", "fake item 3"],
+        "objects": ["a fake red chair", "a fake wooden table", "a fake green lamp"],
+        "description": "A fake object description.",
+        "new_prompt": "A fake improved prompt.",
+        "story": "Once upon a fake time.",
+        "characters": ["Fake Character"],
+        "props": ["fake prop"],
+        "scene_synopses": ["A fake scene."],
+        "image_index": 1,
+        "answers": ["yes", "yes", "yes", "yes"],
+    })
+
+
+def make_fake_png(seed: int, size: int = 64) -> bytes:
+    """
+        A white image with one colored square on it, different for every seed.
+    """
+    rng = random.Random(seed)
+    img = Image.new("RGB", (size, size), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    x0, y0 = rng.randint(size // 8, size // 3), rng.randint(size // 8, size // 3)
+    x1, y1 = rng.randint(2 * size // 3, 7 * size // 8), rng.randint(2 * size // 3, 7 * size // 8)
+    draw.rectangle([x0, y0, x1, y1], fill=(rng.randint(0, 200), rng.randint(0, 200), rng.randint(0, 200)))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+FAKE_MODEL_BYTES = b"glTF" + bytes(1020)
+
+
+class _StorageHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def process_request(self, request, client_address):
+        # named so benchmarks can leave the server's threads out of the node's thread count
+        thread = threading.Thread(target=self.process_request_thread, args=(request, client_address), name="fake-mpx-storage-request", daemon=True)
+        thread.start()
+
+
+class FakeStorageServer():
+    """
+        HTTP server on localhost that stores PUT bodies and serves them back on GET.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: LatencyModel = None, seed: int = 0):
+        self._lock = threading.Lock()
+        self._objects = {}
+        self.latency = latency
+        self._rng = random.Random(seed)
+        self.call_counts = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        storage = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _read_body(self) -> bytes:
+                if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                    body = bytearray()
+                    while True:
+                        chunk_size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                        if chunk_size == 0:
+                            self.rfile.readline()
+                            break
+                        body += self.rfile.read(chunk_size)
+                        self.rfile.readline()
+                    return bytes(body)
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_PUT(self):
+                body = self._read_body()
+                storage._simulate_latency()
+                storage._put(self.path.split("?")[0], body, "PUT")
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                storage._simulate_latency()
+                body = storage._get(self.path.split("?")[0])
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = _StorageHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-mpx-storage", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _simulate_latency(self):
+        if self.latency is not None:
+            with self._lock:
+                latency = self.latency.sample(self._rng)
+            time.sleep(latency)
+
+    def _put(self, path: str, body: bytes, method: str = None):
+        with self._lock:
+            self._objects[path] = body
+            if method is not None:
+                self.call_counts[f"storage.{method}"] += 1
+                self.bytes_in += len(body)
+
+    def _get(self, path: str) -> bytes | None:
+        with self._lock:
+            self.call_counts["storage.GET"] += 1
+            body = self._objects.get(path)
+            if body is not None:
+                self.bytes_out += len(body)
+            return body
+
+    def put_object(self, path: str, body: bytes) -> str:
+        """
+            Store an object without going through HTTP. Returns its URL.
+        """
+        self._put(path, body)
+        return self.base_url + path
+
+    def reset_counts(self):
+        with self._lock:
+            self.call_counts.clear()
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+
+class _Namespace():
+    def __init__(self, **methods):
+        for name, method in methods.items():
+            setattr(self, name, method)
+
+
+class FakeMasterpiecex():
+    """
+        Drop-in replacement for mpx_genai_sdk.Masterpiecex backed by in-memory jobs and a FakeStorageServer.
+    """
+    def __init__(self, storage: FakeStorageServer, profiles: dict = None, llm_responder=default_llm_responder, seed: int = 0):
+        self.storage = storage
+        self.profiles = profiles if profiles is not None else default_profiles()
+        self.llm_responder = llm_responder
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._request_counter = itertools.count(1)
+        self.call_counts = Counter()
+
+        self.llms = _Namespace(call=self._llms_call, image_query=self._llms_image_query)
+        self.components = _Namespace(text2image=self._components_text2image, optimize=self._components_optimize)
+        self.functions = _Namespace(imageto3d=self._functions_imageto3d)
+        self.assets = _Namespace(create=self._assets_create)
+        self.status = _Namespace(retrieve=self._status_retrieve)
+        self.connection_test = _Namespace(retrieve=lambda: SimpleNamespace(status="ok"))
+
+    ### bookkeeping
+
+    def reset_counts(self):
+        with self._lock:
+            self.call_counts.clear()
+        self.storage.reset_counts()
+
+    def all_call_counts(self) -> dict:
+        with self._lock:
+            counts = Counter(self.call_counts)
+        counts.update(self.storage.call_counts)
+        return dict(counts)
+
+    def n_api_calls(self) -> int:
+        with self._lock:
+            return sum(self.call_counts.values())
+
+    def _next_request_id(self) -> str:
+        return f"fake{next(self._request_counter):08d}"
+
+    def _submit(self, endpoint: str, make_outputs) -> SimpleNamespace:
+        profile = self.profiles[endpoint]
+        with self._lock:
+            self.call_counts[endpoint] += 1
+            latency = profile.latency.sample(self._rng)
+            failed = self._rng.random() < profile.failure_rate
+            submit_latency = profile.submit_latency.sample(self._rng) if profile.submit_latency is not None else 0.0
+            request_id = self._next_request_id()
+        if submit_latency > 0:
+            time.sleep(submit_latency)
+
+        # outputs are created up front, they only become visible once the job is complete
+        outputs = None if failed else make_outputs(request_id)
+        with self._lock:
+            self._jobs[request_id] = { "ready_at": time.monotonic() + latency, "latency": latency, "failed": failed, "outputs": outputs }
+        return SimpleNamespace(request_id=request_id, requestId=request_id, status="pending", balance=1000)
+
+    def _status_retrieve(self, request_id: str) -> SimpleNamespace:
+        with self._lock:
+            self.call_counts["status.retrieve"] += 1
+            job = self._jobs.get(request_id)
+        if job is None:
+            raise ValueError(f"Unknown request_id: {request_id}")
+
+        if time.monotonic() < job["ready_at"]:
+            return SimpleNamespace(request_id=request_id, status="pending", outputs=None, output_url=None, processing_time_s=None, progress=None)
+        if job["failed"]:
+            return SimpleNamespace(request_id=request_id, status="failed", outputs=None, output_url=None, processing_time_s=job["latency"], progress=None)
+
+        outputs = job["outputs"]
+        return SimpleNamespace(
+            request_id=request_id,
+            status="complete",
+            outputs=outputs,
+            output_url=getattr(outputs, "output_url", None),
+            processing_time_s=job["latency"],
+            progress=1.0,
+        )
+
+    ### endpoints
+
+    def _llms_call(self, user_prompt="", system_prompt="", **kwargs):
+        return self._submit("llms.call", lambda request_id: SimpleNamespace(output=self.llm_responder("llms.call", f"{system_prompt}\n{user_prompt}")))
+
+    def _llms_image_query(self, user_prompt="", image_urls=(), **kwargs):
+        return self._submit("llms.image_query", lambda request_id: SimpleNamespace(output=self.llm_responder("llms.image_query", user_prompt)))
+
+    def _components_text2image(self, prompt="", num_images=1, seed=1, **kwargs):
+        def make_outputs(request_id):
+            image_urls = []
+            for i in range(num_images):
+                image_seed = zlib.crc32(f"{prompt}|{seed}|{i}".encode("utf-8"))
+                image_urls.append(self.storage.put_object(f"/outputs/{request_id}/image_{i}.png", make_fake_png(image_seed)))
+            return SimpleNamespace(images=image_urls)
+        return self._submit("components.text2image", make_outputs)
+
+    def _functions_imageto3d(self, image_request_id=None, image_url=None, seed=1, texture_size=1024, **kwargs):
+        def make_outputs(request_id):
+            return SimpleNamespace(
+                glb=self.storage.put_object(f"/outputs/{request_id}/model.glb", FAKE_MODEL_BYTES),
+                fbx=self.storage.put_object(f"/outputs/{request_id}/model.fbx", FAKE_MODEL_BYTES),
+                usdz=self.storage.put_object(f"/outputs/{request_id}/model.usdz", FAKE_MODEL_BYTES),
+                thumbnail=self.storage.put_object(f"/outputs/{request_id}/thumbnail.png", make_fake_png(zlib.crc32(request_id.encode("utf-8")))),
+            )
+        return self._submit("functions.imageto3d", make_outputs)
+
+    def _components_optimize(self, asset_request_id=None, target_ratio=0.85, output_file_format="glb", object_type="object", **kwargs):
+        def make_outputs(request_id):
+            return SimpleNamespace(output_url=self.storage.put_object(f"/outputs/{request_id}/optimized.{output_file_format}", FAKE_MODEL_BYTES))
+        return self._submit("components.optimize", make_outputs)
+
+    def _assets_create(self, description="", name="asset", type="application/octet-stream", **kwargs):
+        profile = self.profiles.get("assets.create")
+        with self._lock:
+            self.call_counts["assets.create"] += 1
+            request_id = self._next_request_id()
+            latency = profile.latency.sample(self._rng) if profile is not None else 0.0
+        if latency > 0:
+            time.sleep(latency)
+        asset_url = f"{self.storage.base_url}/assets/{request_id}/{name}?signature=fake"
+        return SimpleNamespace(request_id=request_id, requestId=request_id, asset_url=asset_url, assetUrl=asset_url)
+
+
+def start_fake_mpx(profiles: dict = None, llm_responder=default_llm_responder, storage_latency: LatencyModel = None, seed: int = 0) -> FakeMasterpiecex:
+    """
+        Start a FakeStorageServer and return a FakeMasterpiecex that uses it. Call client.storage.stop() when done.
+    """
+    storage = FakeStorageServer(latency=storage_latency, seed=seed).start()
+    return FakeMasterpiecex(storage, profiles=profiles, llm_responder=llm_responder, seed=seed)
@@ -0,0 +1,135 @@
+import json
+import time
+import threading
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Local stand-in for a shared cache server, speaking the protocol of HTTPSharedCache (src/nodes/sdk/shared_cache.py).
+#
+# Results and claims are kept in memory and leases are timed by the server's clock, like a real deployment.
+# Point the workers at it with MPX_SHARED_CACHE=<base_url> to try out multi-worker setups on one machine.
+
+
+class _SharedCacheHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class FakeSharedCacheServer():
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self._lock = threading.Lock()
+        self._results = {} # (namespace, key) -> (value, expires_at)
+        self._claims = {}  # (namespace, key) -> (owner, expires_at)
+        self.call_counts = Counter()
+
+        cache = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _route(self):
+                url = urlsplit(self.path)
+                parts = [unquote(p) for p in url.path.strip("/").split("/")]
+                if len(parts) != 3 or parts[0] not in ("results", "claims"):
+                    return None, None, parse_qs(url.query)
+                return parts[0], (parts[1], parts[2]), parse_qs(url.query)
+
+            def _read_json(self):
+                return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            def _reply(self, status: int, body=None):
+                payload = b"" if body is None else json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                kind, entry, _ = self._route()
+                if kind != "results":
+                    return self._reply(404)
+                found, value = cache._get(entry)
+                if not found:
+                    return self._reply(404)
+                self._reply(200, { "value": value })
+
+            def do_PUT(self):
+                kind, entry, _ = self._route()
+                if kind != "results":
+                    return self._reply(404)
+                body = self._read_json()
+                cache._put(entry, body["value"], float(body["ttl_s"]))
+                self._reply(204)
+
+            def do_POST(self):
+                kind, entry, _ = self._route()
+                if kind != "claims":
+                    return self._reply(404)
+                body = self._read_json()
+                self._reply(200, { "claimed": cache._claim(entry, body["owner"], float(body["lease_s"])) })
+
+            def do_DELETE(self):
+                kind, entry, query = self._route()
+                if kind != "claims":
+                    return self._reply(404)
+                cache._release(entry, query.get("owner", [""])[0])
+                self._reply(204)
+
+        self._server = _SharedCacheHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-shared-cache", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _get(self, entry: tuple) -> tuple:
+        with self._lock:
+            self.call_counts["results.GET"] += 1
+            value, expires_at = self._results.get(entry, (None, 0.0))
+            return expires_at > time.monotonic(), value
+
+    def _put(self, entry: tuple, value, ttl_s: float):
+        with self._lock:
+            self.call_counts["results.PUT"] += 1
+            self._results[entry] = (value, time.monotonic() + ttl_s)
+
+    def _claim(self, entry: tuple, owner: str, lease_s: float) -> bool:
+        with self._lock:
+            self.call_counts["claims.POST"] += 1
+            now = time.monotonic()
+            current_owner, expires_at = self._claims.get(entry, (None, 0.0))
+            if current_owner is not None and current_owner != owner and expires_at > now:
+                return False
+            self._claims[entry] = (owner, now + lease_s)
+            return True
+
+    def _release(self, entry: tuple, owner: str):
+        with self._lock:
+            self.call_counts["claims.DELETE"] += 1
+            if self._claims.get(entry, (None, 0.0))[0] == owner:
+                del self._claims[entry]
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a local shared cache server for MPX_SHARED_CACHE.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = FakeSharedCacheServer(args.host, args.port)
+    print(f"Shared cache server listening on {server.base_url}")
+    server._server.serve_forever()
@@ -0,0 +1,222 @@
+"""
+    Benchmark the nodes against the fake MPX server at different list sizes.
+
+    Measures, per node and list size: wall time, peak number of threads, peak RSS and the number of API calls.
+
+    Examples (from the repository root):
+        python benchmarks/run_node_benchmarks.py
+        python benchmarks/run_node_benchmarks.py --nodes ImagesTo3DModels --sizes 1,10,100 --num-processes 16
+        python benchmarks/run_node_benchmarks.py --scenario stragglers --hedge --json results.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import contextlib
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import comfy_shims
+import fake_mpx
+
+DEFAULT_SIZES = [1, 10, 100, 1000]
+IMAGE_SIZE = 64
+
+
+class ResourceMonitor():
+    """
+        Samples the number of live threads (leaving out the fake server's own threads) and the RSS of the process.
+    """
+    def __init__(self, interval_s: float = 0.01):
+        self.interval_s = interval_s
+        self.peak_threads = 0
+        self.peak_rss_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fake-mpx-resource-monitor", daemon=True)
+
+    @staticmethod
+    def current_rss_bytes() -> int:
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            # not on Linux, fall back to the peak RSS of the whole process
+            import resource
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+    def _sample(self):
+        n_threads = len([t for t in threading.enumerate() if not t.name.startswith("fake-mpx")])
+        self.peak_threads = max(self.peak_threads, n_threads)
+        self.peak_rss_bytes = max(self.peak_rss_bytes, self.current_rss_bytes())
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval_s)
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def make_images(torch, n_images: int):
+    """
+        n_images distinct (IMAGE_SIZE x IMAGE_SIZE) images in a (B x H x W x C) tensor.
+    """
+    generator = torch.Generator().manual_seed(n_images)
+    images = torch.ones((n_images, IMAGE_SIZE, IMAGE_SIZE, 3))
+    for i in range(n_images):
+        color = torch.rand(3, generator=generator)
+        x0, y0 = [int(v) for v in torch.randint(4, IMAGE_SIZE // 3, (2,), generator=generator)]
+        images[i, y0:y0 + IMAGE_SIZE // 2, x0:x0 + IMAGE_SIZE // 2, :] = color
+    return images
+
+
+def build_scenarios(client, num_processes: int) -> dict:
+    """
+        node name -> function(size) returning (node instance, kwargs for execute())
+    """
+    import torch
+
+    def images_to_3dmodels(size):
+        module = comfy_shims.import_node_module("images_to_3dmodels")
+        return module.ImagesTo3DModels(), dict(images=make_images(torch, size), texture_size=1024, seed=1, num_processes=num_processes)
+
+    def object_list_to_image_list(size):
+        module = comfy_shims.import_node_module("object_list_to_image_list")
+        return module.ObjectListToImageList(), dict(object_list=[f"object number {i}" for i in range(size)], output_folder="", num_processes=num_processes, seed=1)
+
+    def pick_best_image(size):
+        module = comfy_shims.import_node_module("agent_pick_best_image_from_list")
+        return module.Agent_PickBestImageFromList(), dict(images=make_images(torch, size), user_conditions="The best one.", used_for_3D=True, one_object_per_image=True, num_processes=num_processes)
+
+    def reflect_on_images(size):
+        module = comfy_shims.import_node_module("agent_reflect_on_image_list")
+        return module.Agent_ReflectionOnImageList(), dict(
+            text_prompt="A set of props.", custom_user_directions="", images=make_images(torch, size),
+            object_list=[f"object number {i}" for i in range(size)], output_folder="", num_processes=num_processes, seed=1)
+
+    def optimize_models(size):
+        module = comfy_shims.import_node_module("optimize_models")
+        model_urls = [client.storage.put_object(f"/inputs/model_{i}.glb", fake_mpx.FAKE_MODEL_BYTES) for i in range(size)]
+        return module.OptimizeModels(), dict(model_urls=model_urls, num_processes=num_processes)
+
+    def string_list_to_string_list(size):
+        module = comfy_shims.import_node_module("list_to_list")
+        return module.StringListToStringList(), dict(string_list=[f"string number {i}" for i in range(size)], model="gpt-4o-mini", temp=0.5, num_processes=num_processes, custom_instructions="Make it shorter.")
+
+    def transform_object_list(size):
+        module = comfy_shims.import_node_module("transform_object_list")
+        return module.TransformObjectList(), dict(object_list=[f"object number {i}" for i in range(size)], scene_description="A kitchen.", custom_instructions="", temp=0.5, num_processes=num_processes)
+
+    def string_list_to_text(size):
+        module = comfy_shims.import_node_module("list_to_text")
+        return module.StringListToText(), dict(string_list=[f"string number {i}" for i in range(size)], model="gpt-4o-mini", temp=0.5, custom_instructions="Merge them.")
+
+    return {
+        "ImagesTo3DModels": images_to_3dmodels,
+        "ObjectListToImageList": object_list_to_image_list,
+        "Agent_PickBestImageFromList": pick_best_image,
+        "Agent_ReflectionOnImageList": reflect_on_images,
+        "OptimizeModels": optimize_models,
+        "StringListToStringList": string_list_to_string_list,
+        "TransformObjectList": transform_object_list,
+        "StringListToText": string_list_to_text,
+    }
+
+
+def run_benchmark(client, scenario, size: int, verbose: bool = False) -> dict:
+    node, kwargs = scenario(size)
+    client.reset_counts()
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    error = None
+    with output, ResourceMonitor() as monitor:
+        started_at = time.perf_counter()
+        try:
+            getattr(node, node.FUNCTION)(**kwargs)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        wall_time_s = time.perf_counter() - started_at
+
+    call_counts = client.all_call_counts()
+    return {
+        "size": size,
+        "wall_time_s": wall_time_s,
+        "peak_threads": monitor.peak_threads,
+        "peak_rss_mb": monitor.peak_rss_bytes / (1024 * 1024),
+        "api_calls": sum(n for name, n in call_counts.items() if not name.startswith("storage.")),
+        "call_counts": call_counts,
+        "error": error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", default="", help="Comma separated node names, default: all of them.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="Comma separated list sizes.")
+    parser.add_argument("--num-processes", type=int, default=8, help="num_processes input of the nodes.")
+    parser.add_argument("--scenario", choices=["default", "stragglers"], default="default", help="Latency profile of the fake server.")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply all fake job latencies by this.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of fake jobs that fail.")
+    parser.add_argument("--poll-interval", type=float, default=0.02, help="MPX_POLL_INTERVAL_S used by the SDK layer.")
+    parser.add_argument("--hedge", action="store_true", help="Turn request hedging on (MPX_HEDGE_ENABLED=1).")
+    parser.add_argument("--json", default="", help="Also write the results to this file.")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of the nodes.")
+    args = parser.parse_args()
+
+    # the SDK layer reads these when it is imported
+    os.environ["MPX_POLL_INTERVAL_S"] = str(args.poll_interval)
+    os.environ["MPX_JOB_JOURNAL"] = "0" # re-attaching to earlier jobs would skew repeated runs
+    os.environ["MPX_NODE_MEMO_MB"] = "0" # and so would re-using the results of earlier executions
+    os.environ["MPX_HEDGE_ENABLED"] = "1" if args.hedge else "0"
+
+    comfy_shims.install()
+
+    if args.scenario == "stragglers":
+        profiles = fake_mpx.straggler_profiles(args.latency_scale)
+    else:
+        profiles = fake_mpx.default_profiles(args.latency_scale)
+    for profile in profiles.values():
+        profile.failure_rate = args.failure_rate
+
+    client = fake_mpx.start_fake_mpx(profiles=profiles)
+    sdk_client = comfy_shims.import_node_module("sdk.sdk_client")
+    sdk_client.set_client(client)
+
+    scenarios = build_scenarios(client, args.num_processes)
+    node_names = [n.strip() for n in args.nodes.split(",") if n.strip()] or list(scenarios)
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    results = []
+    print(f"{'node':<30} {'size':>6} {'wall [s]':>10} {'threads':>8} {'RSS [MB]':>9} {'API calls':>10}")
+    try:
+        for node_name in node_names:
+            for size in sizes:
+                result = run_benchmark(client, scenarios[node_name], size, args.verbose)
+                result["node"] = node_name
+                results.append(result)
+                line = f"{node_name:<30} {size:>6} {result['wall_time_s']:>10.2f} {result['peak_threads']:>8} {result['peak_rss_mb']:>9.1f} {result['api_calls']:>10}"
+                if result["error"] is not None:
+                    line += f"  ERROR {result['error']}"
+                print(line, flush=True)
+    finally:
+        client.storage.stop()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({ "args": vars(args), "results": results }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,65 @@
 import typing as t
+import functools
 from pathlib import Path
 
+from .nodes.sdk.tracing import trace_node
+from .nodes.utils.profiling import profile_node
+from .nodes.utils.fingerprint import fingerprint, get_memoized_result, memoize_result
+
 STATIC_PATH = Path(__file__).parent.parent / "static"
 
-class BaseNode():
+class FingerprintMixin():
+    """
+    Lets deterministic nodes re-use results across node instances and graph edits.
+    ComfyUI itself only skips a node whose inputs did not change since the previous prompt.
+    """
+    # True for nodes that always give the same outputs for the same inputs (e.g. LLM calls with a fixed temperature of 0)
+    # and have no side effects: a memoized execution does not run at all, so nodes that write files must not set it
+    DETERMINISTIC: bool = False
+    # inputs that change how the node runs but not what it returns
+    FINGERPRINT_IGNORED_INPUTS: tuple = ("num_processes",)
+
+    @classmethod
+    def input_fingerprint(cls, **kwargs) -> str:
+        return fingerprint(cls.__name__, { k: v for k, v in kwargs.items() if k not in cls.FINGERPRINT_IGNORED_INPUTS })
+
+    @classmethod
+    def is_deterministic(cls, **kwargs) -> bool:
+        """
+            Sampling at a temperature above 0 gives different outputs every time. A seed input doesn't make a node
+            repeatable, the LLM calls it makes along the way may still sample.
+        """
+        if kwargs.get("output_folder"):
+            return False
+        for temperature_input in ["temp", "temperature"]:
+            if temperature_input in kwargs:
+                return kwargs[temperature_input] == 0
+        return cls.DETERMINISTIC
+
+
+class BaseNode(FingerprintMixin):
     CATEGORY: str = "MPX"
     FUNCTION: str = "execute"
-    
\ No newline at end of file
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # tag everything the node does in the SDK layer with the node's name in traces
+        # and sample where the CPU time goes when profiling is turned on
+        execute = cls.__dict__.get("execute")
+        if execute is not None:
+            @functools.wraps(execute)
+            def execute_instrumented(self, *args, **kwargs):
+                with trace_node(cls.__name__), profile_node(cls.__name__):
+                    # ComfyUI passes the inputs as keyword arguments
+                    if args or not cls.is_deterministic(**kwargs):
+                        return execute(self, *args, **kwargs)
+
+                    key = cls.input_fingerprint(**kwargs)
+                    found, result = get_memoized_result(key)
+                    if found:
+                        print(f"[mpx] {cls.__name__}: same inputs as an earlier execution, re-using its result")
+                        return result
+                    result = execute(self, **kwargs)
+                    memoize_result(key, result)
+                    return result
+            cls.execute = execute_instrumented
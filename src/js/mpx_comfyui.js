@@ -64,9 +64,86 @@ app.registerExtension({
         window.open(newValue, "_blank");
       },
     });
+
+    app.ui.settings.addSetting({
+      id: "MPX Settings.MPX Profiling",
+      name: "Profile node execution (writes profiles to the user directory):",
+      type: "boolean",
+      defaultValue: false,
+      onChange: (newValue) => {
+        setProfilingEnabled(newValue);
+      },
+    });
+
+    // SDK metrics panel, only on frontends that support sidebar tabs
+    if (app.extensionManager?.registerSidebarTab) {
+      app.extensionManager.registerSidebarTab({
+        id: "mpxMetrics",
+        icon: "pi pi-chart-bar",
+        title: "MPX Metrics",
+        tooltip: "MPX SDK metrics",
+        type: "custom",
+        render: (el) => renderMPXMetrics(el),
+      });
+    }
   },
 });
 
+async function setProfilingEnabled(enabled) {
+  try {
+    await api.fetchApi("/mpx_profiling", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ enabled: !!enabled }),
+    });
+  } catch (error) {
+    console.error(`Error: ${error}`);
+  }
+}
+
+async function fetchMPXMetrics() {
+  const res = await api.fetchApi("/mpx_metrics/json");
+  return await res.json();
+}
+
+async function renderMPXMetrics(el) {
+  const refresh = async () => {
+    // stop refreshing once the panel has been closed
+    if (!el.isConnected && el.dataset.mpxRendered) {
+      clearInterval(timer);
+      return;
+    }
+    el.dataset.mpxRendered = "1";
+    try {
+      const snapshot = await fetchMPXMetrics();
+      el.innerHTML = "";
+      el.style.padding = "8px";
+      el.style.fontSize = "12px";
+      for (const [name, metric] of Object.entries(snapshot.metrics)) {
+        const title = document.createElement("div");
+        title.textContent = name;
+        title.title = metric.help;
+        title.style.fontWeight = "bold";
+        title.style.marginTop = "8px";
+        el.appendChild(title);
+        for (const sample of metric.samples) {
+          const row = document.createElement("div");
+          const labels = Object.entries(sample.labels).map(([k, v]) => `${k}=${v}`).join(" ");
+          const value = metric.type === "histogram"
+            ? `n=${sample.count} mean=${(sample.mean ?? 0).toFixed(2)}s`
+            : `${sample.value}`;
+          row.textContent = `${labels}: ${value}`;
+          el.appendChild(row);
+        }
+      }
+    } catch (error) {
+      el.textContent = `Unable to load MPX metrics: ${error}`;
+    }
+  };
+  const timer = setInterval(refresh, 5000);
+  await refresh();
+}
+
 async function testAPIKeyOnStartup() {
   console.log("Validating API key on startup...");
   const res = await api.fetchApi("/mpx_comfyui_api_key_test");
@@ -1,6 +1,116 @@
 import { app } from "../../../scripts/app.js";
+import { api } from "../../../scripts/api.js";
 import { ComfyWidgets } from "../../../scripts/widgets.js";
 
+// Rows are kept on the server (see src/nodes/utils/list_pages.py), only the rows in view are in the DOM
+// and pages are fetched as the list is scrolled.
+const ROW_HEIGHT = 18;
+const PAGE_SIZE = 200;
+
+function createListView() {
+    const container = document.createElement("div");
+    container.style.overflowY = "auto";
+    container.style.height = "100%";
+    container.style.minHeight = "120px";
+    container.style.fontFamily = "monospace";
+    container.style.fontSize = "12px";
+    container.style.opacity = 0.6;
+    container.style.background = "var(--comfy-input-bg)";
+    container.style.color = "var(--input-text)";
+
+    const spacer = document.createElement("div");
+    spacer.style.position = "relative";
+    container.appendChild(spacer);
+
+    const view = { container, spacer, handle: null, total: 0, firstPage: undefined, pages: new Map(), pending: new Set() };
+    container.addEventListener("scroll", () => renderVisibleRows(view));
+    return view;
+}
+
+function setList(view, handle, total, firstPage) {
+    view.handle = handle;
+    view.total = total;
+    view.firstPage = firstPage;
+    view.pages = new Map();
+    view.pending = new Set();
+    // rows can contain line breaks, so the text of the first page is only used when there is nothing to fetch
+    if (!handle && firstPage !== undefined) {
+        view.pages.set(0, firstPage.split("\n").slice(0, PAGE_SIZE));
+    }
+    view.spacer.style.height = `${total * ROW_HEIGHT}px`;
+    view.container.scrollTop = 0;
+    renderVisibleRows(view);
+}
+
+// The server only keeps a limited number of lists, a cached execution can still show a list that was dropped.
+// Show the first page that came with the execution message instead.
+function showFirstPageOnly(view) {
+    const rows = (view.firstPage ?? "").split("\n").slice(0, PAGE_SIZE);
+    view.handle = null;
+    view.total = rows.length;
+    view.pages = new Map([[0, rows]]);
+    view.spacer.style.height = `${view.total * ROW_HEIGHT}px`;
+    renderVisibleRows(view);
+}
+
+async function fetchPage(view, pageIndex) {
+    const handle = view.handle;
+    if (view.pending.has(pageIndex)) {
+        return;
+    }
+    view.pending.add(pageIndex);
+    try {
+        const res = await api.fetchApi(`/mpx_show_list/${encodeURIComponent(handle)}?offset=${pageIndex * PAGE_SIZE}&limit=${PAGE_SIZE}`);
+        if (res.status === 404 && view.handle === handle) {
+            showFirstPageOnly(view);
+            return;
+        }
+        if (!res.ok) {
+            return;
+        }
+        const page = await res.json();
+        // ignore pages of a list that has been replaced in the meantime
+        if (view.handle === handle) {
+            view.pages.set(pageIndex, page.rows);
+            renderVisibleRows(view);
+        }
+    } catch (error) {
+        console.error(`Error: ${error}`);
+    } finally {
+        view.pending.delete(pageIndex);
+    }
+}
+
+function renderVisibleRows(view) {
+    const first = Math.floor(view.container.scrollTop / ROW_HEIGHT);
+    const count = Math.ceil(view.container.clientHeight / ROW_HEIGHT) + 1;
+    const last = Math.min(view.total, first + count);
+
+    view.spacer.replaceChildren();
+    for (let idx = first; idx < last; idx++) {
+        const pageIndex = Math.floor(idx / PAGE_SIZE);
+        const page = view.pages.get(pageIndex);
+        if (page === undefined && view.handle) {
+            fetchPage(view, pageIndex);
+        }
+        const text = page?.[idx % PAGE_SIZE] ?? `${idx + 1}. ...`;
+
+        const row = document.createElement("div");
+        row.textContent = text;
+        row.title = text;
+        row.style.position = "absolute";
+        row.style.top = `${idx * ROW_HEIGHT}px`;
+        row.style.height = `${ROW_HEIGHT}px`;
+        row.style.lineHeight = `${ROW_HEIGHT}px`;
+        row.style.left = "4px";
+        row.style.right = "4px";
+        row.style.whiteSpace = "nowrap";
+        row.style.overflow = "hidden";
+        row.style.textOverflow = "ellipsis";
+        view.spacer.appendChild(row);
+    }
+}
+
 app.registerExtension({
     name: "mpx_genai_nodes.show_list",
     async beforeRegisterNodeDef(nodeType, nodeData) {
@@ -10,21 +120,31 @@ app.registerExtension({
 
             nodeType.prototype.onNodeCreated = function() {
                 console.log("onNodeCreated");
-                this.showValueWidget = ComfyWidgets["STRING"](this, "preview", ["STRING", { multiline: true }], app).widget;
-                this.showValueWidget.inputEl.readOnly = true;
-                this.showValueWidget.inputEl.style.opacity = 0.6;
+                if (this.addDOMWidget) {
+                    this.listView = createListView();
+                    this.addDOMWidget("preview", "list_view", this.listView.container, { serialize: false });
+                } else {
+                    // older frontends: plain text of the first page
+                    this.showValueWidget = ComfyWidgets["STRING"](this, "preview", ["STRING", { multiline: true }], app).widget;
+                    this.showValueWidget.inputEl.readOnly = true;
+                    this.showValueWidget.inputEl.style.opacity = 0.6;
+                }
             };
 
             const onExecuted = nodeType.prototype.onExecuted;
             nodeType.prototype.onExecuted = function(message) {
                 console.log("onExecuted");
-                console.log(`message: ${message}`);
                 onExecuted?.apply(this, arguments);
-                if (message?.list?.[0] !== undefined) {
+                if (message?.list?.[0] === undefined) {
+                    return;
+                }
+                if (this.listView) {
+                    const total = message.list_total?.[0] ?? message.list[0].split("\n").length;
+                    setList(this.listView, message.list_handle?.[0] ?? null, total, message.list[0]);
+                } else {
                     this.showValueWidget.value = message.list[0];
                 }
             };
         }
     }
 });
-
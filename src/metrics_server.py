@@ -0,0 +1,61 @@
+import os
+import logging
+from aiohttp import web
+from server import PromptServer
+
+from .nodes.sdk.metrics import registry, get_metrics_snapshot
+from .nodes.sdk.tracing import install_prompt_hooks, get_last_trace_path
+from .nodes.utils.profiling import get_profile_summary, set_profiling_enabled, is_profiling_enabled
+
+logger = logging.getLogger(__name__)
+
+# Check if the routes are already registered
+if not hasattr(PromptServer.instance, '_mpx_comfyui_metrics_route_registered'):
+    routes = PromptServer.instance.routes
+
+    # Prometheus scrape target
+    @routes.get('/mpx_metrics')
+    async def get_metrics(request: web.Request) -> web.Response:
+        return web.Response(body=registry.render_prometheus().encode("utf-8"), headers={ "Content-Type": "text/plain; version=0.0.4; charset=utf-8" })
+
+    # Same metrics as JSON for the web extension
+    @routes.get('/mpx_metrics/json')
+    async def get_metrics_json(request: web.Request) -> web.Response:
+        return web.json_response(get_metrics_snapshot())
+
+    # Chrome trace of the last prompt that ran with MPX_TRACE=1, can be opened in https://ui.perfetto.dev
+    @routes.get('/mpx_traces/latest')
+    async def get_latest_trace(request: web.Request) -> web.Response:
+        trace_path = get_last_trace_path()
+        if trace_path is None or not os.path.exists(trace_path):
+            return web.json_response({ "status": "error", "message": "No trace has been written yet, set MPX_TRACE=1 and run a prompt." }, status=404)
+        return web.FileResponse(trace_path, headers={ "Content-Disposition": f'attachment; filename="{os.path.basename(trace_path)}"' })
+
+    # Hot functions of the most recently profiled node executions
+    @routes.get('/mpx_profiling/summary')
+    async def get_profiling_summary(request: web.Request) -> web.Response:
+        try:
+            top_n = int(request.query.get("top", 20))
+        except ValueError:
+            return web.json_response({ "status": "error", "message": "'top' must be a number" }, status=400)
+        return web.json_response(get_profile_summary(top_n))
+
+    # Turn profiling on or off from MPX Settings
+    @routes.post('/mpx_profiling')
+    async def set_profiling(request: web.Request) -> web.Response:
+        try:
+            data = await request.json()
+        except Exception as e:
+            logger.error("Error parsing request payload: %s", e)
+            return web.json_response({ "status": "error", "message": "Failed to parse request payload" }, status=400)
+        # switching it off in the settings falls back to MPX_PROFILE so the environment variable keeps working
+        set_profiling_enabled(True if data.get("enabled", False) else None)
+        return web.json_response({ "status": "success", "enabled": is_profiling_enabled() })
+
+    # write a trace per executed prompt
+    install_prompt_hooks(PromptServer.instance)
+
+    # Mark the routes as registered to avoid duplicate registration
+    PromptServer.instance._mpx_comfyui_metrics_route_registered = True
+else:
+    logger.info("Route '/mpx_metrics' already registered; skipping duplicate initialization.")
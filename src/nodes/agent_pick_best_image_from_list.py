@@ -1,18 +1,42 @@
 import os
 import sys
+import math
 import torch
 
+from joblib import Parallel, delayed, cpu_count
+
+# comfy imports
+import comfy.utils
+
 # MPX imports    
-from .utils.general import hash_node_inputs, image_query_with_with_json_parsing
+from .utils.general import hash_node_inputs, image_query_with_with_json_parsing, image_query_from_urls_with_json_parsing
+from .sdk.llms.image_query import upload_image
 from .sdk.utils.image_helpers import convert_from_torch_to_PIL, convert_from_PIL_to_torch  
 
 from ..base import BaseNode
 
 
+MAX_IMAGES_PER_QUERY = 4
+
+
 def pick_best_image_from_four(generated_images, user_conditions, image_info, style_guide):
-    num_images = len(generated_images)
-    if num_images < 2 or num_images > 4:
-        raise ValueError(f"Number of images must be between 2 and 4, got {num_images}")
+    query = build_pick_best_image_query(len(generated_images), user_conditions, image_info, style_guide)
+    parsed_results = image_query_with_with_json_parsing(query, generated_images)
+    return parsed_results['image_index'], parsed_results['reasoning']
+
+
+def pick_best_image_from_four_urls(image_urls, user_conditions, image_info, style_guide):
+    """
+    Same as pick_best_image_from_four() but for images that have already been uploaded.
+    """
+    query = build_pick_best_image_query(len(image_urls), user_conditions, image_info, style_guide)
+    parsed_results = image_query_from_urls_with_json_parsing(query, image_urls)
+    return parsed_results['image_index'], parsed_results['reasoning']
+
+
+def build_pick_best_image_query(num_images, user_conditions, image_info, style_guide):
+    if num_images < 2 or num_images > MAX_IMAGES_PER_QUERY:
+        raise ValueError(f"Number of images must be between 2 and {MAX_IMAGES_PER_QUERY}, got {num_images}")
         
     query = f"You are given {num_images} images."
     
@@ -39,9 +63,72 @@ def pick_best_image_from_four(generated_images, user_conditions, image_info, sty
         query += "   - Evaluating how well it follows the style guidelines\n"
     query += "   - Explaining why other images were not selected"
     query += "\nNote: When picking the best image, info about the object and conditions are most important and any adherance to style guides are of a lower importance."
+    return query
 
-    parsed_results = image_query_with_with_json_parsing(query, generated_images)
-    return parsed_results['image_index'], parsed_results['reasoning']
+
+def split_into_groups(indices, max_group_size=MAX_IMAGES_PER_QUERY):
+    """
+    Split indices into the fewest groups of at most max_group_size with sizes that differ by at most one,
+    so no group ends up with a single image (which would advance without being judged).
+    """
+    n_groups = math.ceil(len(indices) / max_group_size)
+    base_size, n_larger = divmod(len(indices), n_groups)
+    groups = []
+    start = 0
+    for g in range(n_groups):
+        size = base_size + (1 if g < n_larger else 0)
+        groups.append(indices[start:start+size])
+        start += size
+    return groups
+
+
+def run_image_tournament(image_urls, user_conditions, image_info, style_guide, num_processes=1, progress_bar=None):
+    """
+    Pick the best image out of any number of already uploaded images by judging groups of at most four images
+    in parallel and advancing the group winners until only one image remains.
+
+    Returns:
+        ranking: image indices (0-based) ordered from best to worst, images knocked out in the same round are ordered by index
+        rounds: one list per round of dicts with the keys 'group', 'winner' and 'reasoning'
+    """
+    n_images = len(image_urls)
+    n_rounds = 0 if n_images < 2 else math.ceil(math.log(n_images, MAX_IMAGES_PER_QUERY) - 1e-9)
+    eliminated_in_round = {}
+
+    def judge_group(group):
+        if len(group) == 1:
+            return group[0], "Advanced without being judged since it was the only image in its group."
+        best_idx, reasoning = pick_best_image_from_four_urls([image_urls[i] for i in group], user_conditions, image_info, style_guide)
+        # agent returns index as a number between 1 to len(group) (possibly as a string), anything else falls back to the first image of the group
+        try:
+            best_idx = int(best_idx)
+        except (TypeError, ValueError):
+            pass
+        if best_idx in range(1, len(group) + 1):
+            return group[best_idx - 1], reasoning
+        print(f"Returned index is NOT within range of [1 to {len(group)}]: {best_idx}", file=sys.stderr)
+        return group[0], reasoning
+
+    rounds = []
+    contenders = list(range(n_images))
+    while len(contenders) > 1:
+        groups = split_into_groups(contenders)
+        # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel and causes issue with the comfy progress bar object
+        winners = Parallel(backend="threading", n_jobs=num_processes)(delayed(judge_group)(g) for g in groups)
+
+        round_results = []
+        for group, (winner, reasoning) in zip(groups, winners):
+            round_results.append({ "group": group, "winner": winner, "reasoning": reasoning })
+            for i in group:
+                if i != winner: eliminated_in_round[i] = len(rounds)
+        rounds.append(round_results)
+        contenders = [w for w, _ in winners]
+
+        if progress_bar is not None:
+            progress_bar.update_absolute(len(rounds), max(n_rounds, len(rounds)))
+
+    ranking = contenders + sorted(eliminated_in_round, key=lambda i: (-eliminated_in_round[i], i))
+    return ranking, rounds
 
 
 class Agent_PickBestImageFromList(BaseNode):
@@ -92,18 +179,26 @@ class Agent_PickBestImageFromList(BaseNode):
                     "tooltip": "Guidelines for the visual style and aesthetic qualities to consider.",
                     "agent_description": "Specific style requirements or aesthetic preferences to consider during image selection."
                 }),
+                "num_processes": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": cpu_count(),
+                    "tooltip": "Number of parallel processes for uploading images and judging groups of images. Used when there are more than 4 images.",
+                    "agent_description": "Number of parallel processes for judging groups of images in each tournament round. Default: 1."
+                }),
             }
         }
     
 
-    RETURN_TYPES = ("IMAGE", "STRING")
-    RETURN_NAMES = ("BestImage", "Reasoning_string")
+    RETURN_TYPES = ("IMAGE", "STRING", "LIST")
+    RETURN_NAMES = ("BestImage", "Reasoning_string", "Ranking_list")
     RETURN_AGENT_DESCRIPTIONS = (
         "The selected best image that meets the specified conditions.",
-        "Detailed explanation of why this image was chosen and how it meets the criteria."
+        "Detailed explanation of why this image was chosen and how it meets the criteria.",
+        "Image numbers (starting from 1) ordered from best to worst. Images knocked out in the same round are ordered by number."
     )
 
-    def execute(self, images, user_conditions, used_for_3D, one_object_per_image, image_info="", style_guide=""):
+    def execute(self, images, user_conditions, used_for_3D, one_object_per_image, image_info="", style_guide="", num_processes=1):
         # Define the additional conditions text
         used_for_3D_condition = "Object must be in full view, centered and without any parts of the object cropped by the edge of the photo. Lighting is bright, diffuse, and indirect. Camera angle is a side view. Object must be on a completely blank white background."
 
@@ -133,14 +228,32 @@ class Agent_PickBestImageFromList(BaseNode):
         # If there's only one image, skip the API call and use that image
         if len(image_list) == 1:
             best_img_idx = 0
+            ranking = [0]
             reasoning = "Image 1 is selected because it is the only image"
-        else:
+        elif len(image_list) <= MAX_IMAGES_PER_QUERY:
             best_img_idx, reasoning = pick_best_image_from_four(image_list, user_conditions, image_info, style_guide)
             # agent returns index as a number between 1 to num_images, adjust it to be between 0 to num_images-1
             if best_img_idx in range(1, len(image_list) + 1): 
                 best_img_idx -= 1
             else: 
                 print(f"Returned index is NOT within range of [1 to {len(image_list)}]: {best_img_idx}", file=sys.stderr)
+            ranking = [best_img_idx] + [i for i in range(len(image_list)) if i != best_img_idx]
+        else:
+            # upload every image once, all tournament rounds re-use the same URLs
+            image_urls = Parallel(backend="threading", n_jobs=num_processes)(delayed(upload_image)(img) for img in image_list)
+
+            pbar = comfy.utils.ProgressBar(math.ceil(math.log(len(image_list), MAX_IMAGES_PER_QUERY) - 1e-9))
+            ranking, rounds = run_image_tournament(image_urls, user_conditions, image_info, style_guide, num_processes, pbar)
+            best_img_idx = ranking[0]
+
+            reasoning = ""
+            for round_idx, round_results in enumerate(rounds):
+                reasoning += f"Round {round_idx+1}:\n"
+                for result in round_results:
+                    group_str = ", ".join([f"#{i+1}" for i in result["group"]])
+                    reasoning += f"* Group [{group_str}] -> Image #{result['winner']+1}. Reasoning: {result['reasoning']}\n"
+                reasoning += "\n"
+            reasoning += f"Image #{best_img_idx+1} won the tournament."
 
         print(f"Best Image Index: {best_img_idx}")
         print(f"Best Image Reasoning: {reasoning}")
@@ -149,4 +262,4 @@ class Agent_PickBestImageFromList(BaseNode):
 
         torch_image = convert_from_PIL_to_torch(best_img)
         batch_tensor = torch.stack([torch_image], dim=0)
-        return batch_tensor, reasoning
+        return batch_tensor, reasoning, [i+1 for i in ranking]
@@ -1,7 +1,10 @@
 # system imports
 import os
+import time
 import datetime
+import threading
 import torch
+from concurrent.futures import ThreadPoolExecutor
 
 from joblib import Parallel, delayed, cpu_count
 
@@ -15,17 +18,86 @@ from .utils.general import hash_node_inputs, variable_substitution, llm_call_wit
 
 from .sdk.components.text_to_image import component_text_to_image
 from .sdk.utils.image_helpers import convert_from_torch_to_PIL, convert_from_PIL_to_torch, convert_batch_tensor_to_tensor_list, download_image_from_url_to_PIL
+from .sdk.utils.provenance import register_image_source
+from .sdk.tracing import with_trace_context
+from .agent_pick_best_image_from_list import pick_best_image_from_four
+from .utils.image_prechecks import run_local_prechecks, precheck_failed
 
 from ..base import BaseNode
 
 
+REGENERATION_LORA_SCALE = 0.8
+REGENERATION_LORA_WEIGHTS = "https://huggingface.co/gokaygokay/Flux-Game-Assets-LoRA-v2"
+
+
+def build_regeneration_prompt(obj_descr):
+    return f"wbgmsst. {obj_descr}. Candid, full body view, side camera angle.  White matte background with bright, indirect lighting"
+
+
+def generate_regeneration_candidate(obj_descr, seed_val):
+    """
+    Run text2image for a single object description and download the result.
+    Returns the PIL image and the number of seconds the generation took.
+    """
+    start_time = time.perf_counter()
+    request_results, request_id = component_text_to_image(
+        prompt=build_regeneration_prompt(obj_descr),
+        num_images=1,
+        seed=seed_val,
+        lora_scale=REGENERATION_LORA_SCALE,
+        lora_weights=REGENERATION_LORA_WEIGHTS
+    )
+    PIL_img = download_image_from_url_to_PIL(request_results[0])
+    register_image_source(PIL_img, request_results[0], request_id)
+    return PIL_img, time.perf_counter() - start_time
+
+
+class SpeculationStats():
+    """
+    Thread-safe counters for the speculative regeneration mode so that the extra generation cost
+    can be weighed against the latency it saves.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.launched = 0
+        self.cancelled = 0          # never started on the server because the checklist passed first
+        self.discarded = 0          # generated but thrown away because the original image passed
+        self.failed = 0             # the speculative generation or its checklist raised
+        self.kept_without_regen = 0 # speculative image passed the checklist, transformed regeneration skipped
+        self.kept_over_regen = 0    # speculative image was judged better than the transformed regeneration
+        self.lost_to_regen = 0      # transformed regeneration was judged better
+        self.speculative_seconds = 0.0
+        self.regeneration_seconds = []
+
+    def add(self, **kwargs):
+        with self._lock:
+            for k, v in kwargs.items():
+                if k == "regeneration_seconds":
+                    self.regeneration_seconds.append(v)
+                else:
+                    setattr(self, k, getattr(self, k) + v)
+
+    def summary(self):
+        with self._lock:
+            n_regens = len(self.regeneration_seconds)
+            avg_regen = sum(self.regeneration_seconds) / n_regens if n_regens > 0 else 0.0
+            wasted = self.discarded + self.lost_to_regen
+            ret = "Speculative regeneration summary:\n"
+            ret += f"* speculative jobs launched: {self.launched} (cancelled before start: {self.cancelled}, failed: {self.failed})\n"
+            ret += f"* extra generations paid for and not used: {wasted} ({self.speculative_seconds:.1f}s of speculative generation time in total)\n"
+            ret += f"* speculative images kept: {self.kept_without_regen + self.kept_over_regen} ({self.kept_without_regen} skipped the transformed regeneration, {self.kept_over_regen} beat it)\n"
+            ret += f"* estimated latency saved: {self.kept_without_regen * avg_regen:.1f}s (average transformed regeneration took {avg_regen:.1f}s)\n\n"
+            return ret
+
+
 def convert_checklist_results_to_list_of_issues(checklist_results):
     """
     checklist_results = four bools
         item1_checked = item01_object_is_centered_and_fully_visible(input_image)
         item2_checked = item02_image_has_only_one_object(input_image, input_obj_descr)
-        item3_checked = item03_adheres_to_style_guide(input_image, input_style_guide)
-        item4_checked = item04_has_blank_white_background(input_image)
+        item3_checked = item03_has_blank_white_background(input_image)
+        item4_checked = item04_adheres_to_style_guide(input_image, input_style_guide)
+    in the same order as the questions asked in run_through_check_list_compressed()
     """
     ret = ""
     n_item = 1
@@ -36,10 +108,10 @@ def convert_checklist_results_to_list_of_issues(checklist_results):
         ret += f"({n_item}) There are multiple objects present.\n"
         n_item += 1
     if checklist_results[2] == False: 
-        ret += f"({n_item}) Does not adhere to the custom user rules.\n"
+        ret += f"({n_item}) The background is not blank and white.\n"
         n_item += 1
     if checklist_results[3] == False: 
-        ret += f"({n_item}) The background is not blank and white.\n"
+        ret += f"({n_item}) Does not adhere to the custom user rules.\n"
         n_item += 1
     return ret
 
@@ -48,7 +120,6 @@ def run_prompt_transform(old_prompt, checklist_results, original_theme, custom_u
     llm_params["temperature"] = 0
 
     extra_params = {}
-    extra_params["model"] = "gpt-4o"
 
     sys_prompt = "You are a natural language expert who is specialized with creating new text prompts from existing text prompts. Your job is to take: (1) an existing user provided prompt, (2) a list of issues which detail what is wrong with it, (3) the original theme of the prompt, (4) some custom user directions and then produce a new prompt that addresses the list of issues as well as ensuring that the main subject of the user provided prompt still exists in some form and that the new prompt adheres to both the original theme of the prompt and the given custom user direcitons. It might be that keeping the main subject of the user provided prompt with the original theme and the custom user directions are in conflict with each other. In those cases do your base to balance the three.\n\n"
     sys_prompt += "Return the answer as only a JSON with a two keys 'new_prompt' and 'reasoning'. In the 'new_prompt' key provide an updated prompt with no premable or explanation. Ensure to address all of the issues that are given to you and that you've done your best to balance between the main subject of the user provided prompt, the original theme and the custom user directions. Lean towards keeping the main subject of the user provided prompt with the original theme if the customer user directions does not directly contradict it. In the 'reasoning' key provide an explanation for why the new prompt makes sense, addressses all of the given issues and also follows the custom user directions. Just the JSON only is returned.\n\n"
@@ -68,7 +139,7 @@ def run_prompt_transform(old_prompt, checklist_results, original_theme, custom_u
     sys_prompt = variable_substitution(sys_prompt, prompt_data)
     human_prompt = variable_substitution(human_prompt, prompt_data)
 
-    parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params)
+    parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="transform")
 
     print("run_prompt_transform():")
     print(f"old_prompt = '{old_prompt}'")
@@ -105,6 +176,18 @@ def run_through_check_list_compressed(input_image, input_obj_descr, input_user_d
 
     return query_answers_TorF, query_reasoning
 
+def convert_precheck_to_checklist_results(precheck):
+    """
+    Turn a failed local pre-check into the same (answers, reasoning) shape as run_through_check_list_compressed().
+    Items that were not decided locally are assumed to have passed since the image is regenerated anyway.
+    """
+    not_checked = "Not checked since the image already failed the local pre-check."
+    checklist_results = [precheck["object_is_fully_visible"] != False, True, precheck["has_blank_white_background"] != False, True]
+    checklist_reasoning = [not_checked] * 4
+    if checklist_results[0] == False: checklist_reasoning[0] = f"Local pre-check: {precheck['reasoning']}"
+    if checklist_results[2] == False: checklist_reasoning[2] = f"Local pre-check: {precheck['reasoning']}"
+    return checklist_results, checklist_reasoning
+
 
 class Agent_ReflectionOnImageList(BaseNode):
     """
@@ -164,6 +247,16 @@ class Agent_ReflectionOnImageList(BaseNode):
                     "tooltip": "Random seed for reproducible results. Manually set to 'fixed' to ensure the seed does not change.",
                     "agent_description": "Seed value for reproducible image generation when regenerating images. Default 1."
                 }),
+                "speculative_regeneration": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Start a fresh-seed regeneration of every image while its checklist is still running. Costs extra generations but hides prompt-transform latency for images that fail.",
+                    "agent_description": "When enabled, a fresh-seed image is generated speculatively while each image is checked. Failed images keep whichever candidate is better. Default false."
+                }),
+                "local_prechecks": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Check the white background and cut-off edges from the pixels first. Images that clearly fail are regenerated without asking the vision model.",
+                    "agent_description": "When enabled, images with a non-white border or an object touching the image edge fail without a vision model call. Default false."
+                }),
             }
         }
     
@@ -174,7 +267,7 @@ class Agent_ReflectionOnImageList(BaseNode):
         "Detailed explanation of the reflection process, including which images passed or failed criteria and why."
     )
 
-    def execute(self, text_prompt, custom_user_directions, images, object_list, output_folder, num_processes, seed):
+    def execute(self, text_prompt, custom_user_directions, images, object_list, output_folder, num_processes, seed, speculative_regeneration=False, local_prechecks=False):
 
         if os.path.exists(output_folder) == False:
             print(f"Output folder: {output_folder} DOES NOT EXIST!")
@@ -193,6 +286,20 @@ class Agent_ReflectionOnImageList(BaseNode):
 
         pbar = comfy.utils.ProgressBar(n_objects)
 
+        # decide the pixel-level checklist items for the whole batch at once
+        prechecks = run_local_prechecks(images) if local_prechecks else [None] * n_images
+        n_llm_calls_avoided = 0
+        n_llm_calls_avoided_lock = threading.Lock()
+
+        def run_checklist(img, precheck, obj_descr, custom_instruct):
+            nonlocal n_llm_calls_avoided
+            if precheck is not None and precheck_failed(precheck):
+                # called from the checklist and speculative worker threads
+                with n_llm_calls_avoided_lock:
+                    n_llm_calls_avoided += 1
+                return convert_precheck_to_checklist_results(precheck)
+            return run_through_check_list_compressed(img, obj_descr, custom_instruct)
+
         def checklist_all_good(L):
             res = True
             for item in L: res = res and item
@@ -201,7 +308,31 @@ class Agent_ReflectionOnImageList(BaseNode):
         global num_images_reflected_on
         num_images_reflected_on = 0
 
+        # speculative jobs get their own pool so they never wait behind the checklist workers
+        spec_stats = SpeculationStats()
+        spec_executor = ThreadPoolExecutor(max_workers=num_processes) if speculative_regeneration else None
+
+        def timed_speculative_candidate(obj_descr, seed_val):
+            PIL_img, elapsed = generate_regeneration_candidate(obj_descr, seed_val)
+            spec_stats.add(speculative_seconds=elapsed)
+            return PIL_img
+
+        def count_discarded_speculation(spec_future):
+            if spec_future.cancelled():
+                spec_stats.add(cancelled=1)
+            elif spec_future.exception() is not None:
+                spec_stats.add(failed=1)
+            else:
+                spec_stats.add(discarded=1)
+
+        def check_speculative_candidate(spec_future, obj_descr, custom_instruct):
+            # spec_future was submitted to the same pool before this task so it is already running or done
+            spec_img = spec_future.result()
+            spec_precheck = run_local_prechecks(convert_from_PIL_to_torch(spec_img))[0] if local_prechecks else None
+            return spec_img, run_checklist(spec_img, spec_precheck, obj_descr, custom_instruct)
+
         def reflect_on_image(img, 
+                             precheck: dict,
                              prompt: str, 
                              obj_descr: str, 
                              custom_instruct: str, 
@@ -218,11 +349,24 @@ class Agent_ReflectionOnImageList(BaseNode):
 
             print(f"Reflecting on image [{img_idx}/{n_imgs}] ... ")
 
-            checklist_results, checklist_reasoning = run_through_check_list_compressed(img, obj_descr, custom_instruct)
+            # kick off a fresh-seed generation of the original description before the checklist so it overlaps the vision query
+            spec_future = None
+            if spec_executor is not None:
+                spec_seed = (seed_val + img_idx) % 1000000 + 1
+                spec_future = spec_executor.submit(timed_speculative_candidate, obj_descr, spec_seed)
+                spec_stats.add(launched=1)
+
+            checklist_results, checklist_reasoning = run_checklist(img, precheck, obj_descr, custom_instruct)
             
             print(f"Checklist results: {checklist_results}")
 
             if checklist_all_good(checklist_results):
+                if spec_future is not None:
+                    # a speculative job that already started can't be stopped: component_text_to_image() waits for it
+                    # and the MPX SDK has no cancel endpoint, so it runs to completion on the server and is counted as discarded
+                    if spec_future.cancel(): spec_stats.add(cancelled=1)
+                    else: spec_future.add_done_callback(count_discarded_speculation)
+
                 str_reflection_display += f"Image #{img_idx+1} has PASSED all checklist items.\n\n"
                 num_images_reflected_on += 1
                 progress_bar.update_absolute(num_images_reflected_on, n_objects, ("PNG", img, None))
@@ -235,38 +379,81 @@ class Agent_ReflectionOnImageList(BaseNode):
                 if checklist_results[2] == False: str_reflection_display += f"* FAILED has_blank_white_background. Reasoning: {checklist_reasoning[2]}.\n"
                 if checklist_results[3] == False: str_reflection_display += f"* FAILED adheres_to_user_directions. Reasoning: {checklist_reasoning[3]}.\n"
 
+                # check the speculative candidate while the prompt transform runs
+                spec_img = None
+                spec_check_future = None
+                if spec_future is not None:
+                    spec_check_future = spec_executor.submit(check_speculative_candidate, spec_future, obj_descr, custom_instruct)
+
                 new_prompt, new_prompt_reasoning = run_prompt_transform(obj_descr, checklist_results, prompt, custom_instruct)
 
+                if spec_check_future is not None:
+                    try:
+                        spec_img, (spec_checklist_results, spec_checklist_reasoning) = spec_check_future.result()
+                    except Exception as e:
+                        print(f"Speculative candidate for image #{img_idx+1} failed: {e}")
+                        spec_stats.add(failed=1)
+                        spec_img = None
+
+                    if spec_img is not None and checklist_all_good(spec_checklist_results):
+                        str_reflection_display += f"\nA speculative fresh-seed image PASSED all checklist items and is used instead of regenerating with the new prompt.\n\n"
+                        str_reflection_display += "----\n\n"
+                        spec_stats.add(kept_without_regen=1)
+                        return finalize_regenerated_image(spec_img, img_idx, progress_bar, str_reflection_display)
+
                 str_reflection_display += f"\nRegenerating Image #{img_idx} with new prompt:\n\n\n{new_prompt}\n\n"
                 str_reflection_display += f"Reasoning for new prompt: {new_prompt_reasoning}\n\n"
-                str_reflection_display += "----\n\n"
 
-                desired_n_images = 1 # TODO: determine how to handle multiple images per object
-                request_results, request_id = component_text_to_image(
-                    prompt= f"wbgmsst. {new_prompt}. Candid, full body view, side camera angle.  White matte background with bright, indirect lighting",
-                    num_images= desired_n_images,
-                    seed=seed_val,
-                    lora_scale=0.8,
-                    lora_weights= "https://huggingface.co/gokaygokay/Flux-Game-Assets-LoRA-v2"
-                )
-
-                PIL_img = download_image_from_url_to_PIL(request_results[0])
-                img_torch = convert_from_PIL_to_torch(PIL_img)
-                if output_folder: 
-                    str_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-                    PIL_img.save(f"{output_folder}/reflected_image_{img_idx}_{str_timestamp}.png")
+                # TODO: determine how to handle multiple images per object
+                PIL_img, regen_seconds = generate_regeneration_candidate(new_prompt, seed_val)
+                spec_stats.add(regeneration_seconds=regen_seconds)
+
+                # keep the better of the transformed-prompt image and the speculative candidate
+                if spec_img is not None:
+                    conditions = f"The image must show: {obj_descr}\n"
+                    conditions += "The main object is fully visible (no portion is cut-off) and centered, there is only one main object and the background is blank white.\n"
+                    if custom_instruct: conditions += f"The image adheres to these custom user directions: {custom_instruct}\n"
+                    try:
+                        best_idx, best_reasoning = pick_best_image_from_four([PIL_img, spec_img], conditions, obj_descr, "")
+                    except Exception as e:
+                        print(f"Comparing speculative candidate for image #{img_idx+1} failed: {e}")
+                        best_idx, best_reasoning = 1, ""
+
+                    # the index comes from the LLM's JSON answer and may be a string
+                    try:
+                        best_idx = int(best_idx)
+                    except (TypeError, ValueError):
+                        best_idx = 1
+
+                    # the speculative image finished before the comparison, so the job that loses has nothing left to cancel
+                    if best_idx == 2:
+                        PIL_img = spec_img
+                        spec_stats.add(kept_over_regen=1)
+                        str_reflection_display += f"The speculative fresh-seed image was judged better than the regenerated image. Reasoning: {best_reasoning}\n\n"
+                    else:
+                        spec_stats.add(lost_to_regen=1)
 
-                num_images_reflected_on += 1
-                progress_bar.update_absolute(num_images_reflected_on, n_objects, ("PNG", PIL_img, None))
-                return img_torch, str_reflection_display
+                str_reflection_display += "----\n\n"
+                return finalize_regenerated_image(PIL_img, img_idx, progress_bar, str_reflection_display)
+
+        def finalize_regenerated_image(PIL_img, img_idx, progress_bar, str_reflection_display):
+            global num_images_reflected_on
 
+            img_torch = convert_from_PIL_to_torch(PIL_img)
+            if output_folder: 
+                str_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+                PIL_img.save(f"{output_folder}/reflected_image_{img_idx}_{str_timestamp}.png")
 
+            num_images_reflected_on += 1
+            progress_bar.update_absolute(num_images_reflected_on, n_objects, ("PNG", PIL_img, None))
+            return img_torch, str_reflection_display
 
 
         # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel and causes issue with the comfy progress bar object
-        all_results = Parallel(backend="threading", n_jobs=num_processes)(delayed(reflect_on_image)
+        all_results = Parallel(backend="threading", n_jobs=num_processes)(delayed(with_trace_context(reflect_on_image, item=i))
                                                                             (
                                                                                 image_list[i],
+                                                                                prechecks[i],
                                                                                 text_prompt,
                                                                                 object_list[i],
                                                                                 custom_user_directions,
@@ -275,6 +462,10 @@ class Agent_ReflectionOnImageList(BaseNode):
                                                                                 n_images,
                                                                                 pbar
                                                                             ) for i in range(n_images))
+
+        if spec_executor is not None:
+            # speculative jobs that haven't started are no longer needed by anyone, started ones run to completion (see above)
+            spec_executor.shutdown(wait=False, cancel_futures=True)
         
         # accumulate all results
         updated_images = [] # each element should be a torch.Tensor
@@ -285,6 +476,13 @@ class Agent_ReflectionOnImageList(BaseNode):
             updated_images.append(img_output)
             str_display += str_reflection
 
+        if local_prechecks:
+            str_display += f"Local pre-checks failed {n_llm_calls_avoided} image(s) without a vision model call ({n_llm_calls_avoided} LLM call(s) avoided).\n\n"
+
+        if speculative_regeneration:
+            str_display += spec_stats.summary()
+            print(spec_stats.summary())
+
         batch_updated_images = torch.stack(updated_images, dim=0)
         return (batch_updated_images, str_display)
 
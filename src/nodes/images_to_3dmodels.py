@@ -7,7 +7,8 @@ import comfy.utils   # type: ignore[reportMissingImports]   Note: this is ignore
 # sdk imports
 from .sdk.functions.image_to_3d import function_image_to_3d
 from .sdk.utils.image_helpers import download_image_from_url_to_PIL, convert_from_PIL_to_torch, convert_batch_tensor_to_tensor_list
-from .utils.general import hash_node_inputs
+from .sdk.tracing import with_trace_context
+from .utils.image_hashing import cluster_near_duplicate_images
 from ..base import BaseNode
 
 
@@ -15,10 +16,6 @@ class ImagesTo3DModels(BaseNode):
     """
     The ImageTensorsTo3DModels node processes an image to generate a 3D model. Returns a thumbnail image and 3D model URLs for each processed image.
     """
-    def __init__(self):
-        self._cached_input_hash = None
-        self._cached_output = None
-
     @classmethod
     def INPUT_TYPES(s):
         return {
@@ -47,7 +44,19 @@ class ImagesTo3DModels(BaseNode):
                     "max": cpu_count(),
                     "tooltip": "Number of parallel processes for batch processing.",
                     "agent_description": "Number of parallel processes."
-                })
+                }),
+                "deduplicate_images": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Only generate one 3D model for images that are identical or nearly identical and re-use it for all of them.",
+                    "agent_description": "When enabled, near-duplicate images share a single 3D model generation. Default: false."
+                }),
+                "dedup_hamming_threshold": ("INT", {
+                    "default": 4,
+                    "min": 0,
+                    "max": 64,
+                    "tooltip": "Maximum number of differing bits between the 64 bit perceptual hashes of two images for them to count as duplicates. 0 only merges images that look the same.",
+                    "agent_description": "How different two images may be and still share a 3D model. Range: 0-64, default: 4."
+                }),
             },
         }
 
@@ -61,7 +70,7 @@ class ImagesTo3DModels(BaseNode):
         "A list of request IDs corresponding to each 3D model generation call."
     )
 
-    def execute(self, images, texture_size, seed, num_processes):
+    def execute(self, images, texture_size, seed, num_processes, deduplicate_images=False, dedup_hamming_threshold=4):
         """
             image: batch of torch.Tensors or single torch.Tensor (pixel values ranges from 0.0 to 1.0)
 
@@ -100,60 +109,54 @@ class ImagesTo3DModels(BaseNode):
         if texture_size not in [512, 1024, 2048]:
             raise ValueError(f"texture_size must be one of: 512, 1024, 2048! Got: {texture_size}")
 
-        # check if the inputs have changed
-        input_hash = hash_node_inputs({
-            "image_data": images.tolist(),
-            "texture_size": texture_size,
-            "seed": seed
-        })
-
-        # re-run the function if the hashes differ
-        if input_hash != self._cached_input_hash:
-
-            input_images = convert_batch_tensor_to_tensor_list(images)
-
-            ret_dict = {}
-            ret_dict["thumbnail_images"] = []
-            ret_dict["glb_urls"] = []
-            ret_dict["fbx_urls"] = []
-            ret_dict["usdz_urls"] = []
-            ret_dict["request_ids"] = []
-
-            n_images = len(input_images)
-            pbar = comfy.utils.ProgressBar(n_images)
-
-            if num_processes == 1:
-                for i in range(n_images):
-                    img_thumbnail, glb_url, fbx_url, usdz_url, request_id = genarate_3dmodel_from_image(input_images[i],
-                                                                                                        i,
-                                                                                                        n_images,
-                                                                                                        pbar)
-                    ret_dict["thumbnail_images"].append(img_thumbnail)
-                    ret_dict["glb_urls"].append(glb_url)
-                    ret_dict["fbx_urls"].append(fbx_url)
-                    ret_dict["usdz_urls"].append(usdz_url)
-                    ret_dict["request_ids"].append(request_id)
-
-            else:
-                # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel and causes issue with the comfy progress bar object
-                all_results = Parallel(backend="threading", n_jobs=num_processes)(delayed(genarate_3dmodel_from_image)(
-                    input_images[i],
-                    i,
-                    n_images,
-                    pbar
-                ) for i in range(n_images))
-                
-                # accumulate the results into the returned dictionary
-                for results in all_results:
-                    ret_dict["thumbnail_images"].append(results[0])
-                    ret_dict["glb_urls"].append(results[1])
-                    ret_dict["fbx_urls"].append(results[2])
-                    ret_dict["usdz_urls"].append(results[3])
-                    ret_dict["request_ids"].append(results[4])
-
-
-            self._cached_output = (ret_dict["thumbnail_images"], ret_dict["glb_urls"], ret_dict["fbx_urls"], ret_dict["usdz_urls"], ret_dict["request_ids"])
-            self._cached_input_hash = input_hash
-
-        return self._cached_output
+        input_images = convert_batch_tensor_to_tensor_list(images)
+
+        # only the first image of every cluster of near-duplicates gets sent to imageto3d
+        if deduplicate_images:
+            representatives = cluster_near_duplicate_images(images, dedup_hamming_threshold)
+        else:
+            representatives = list(range(len(input_images)))
+        unique_indices = sorted(set(representatives))
+
+        n_images = len(unique_indices)
+        if n_images < len(input_images):
+            print(f"Deduplicated {len(input_images)} images into {n_images} 3D model generations.")
+        pbar = comfy.utils.ProgressBar(n_images)
+
+        if num_processes == 1:
+            all_results = []
+            for i in range(n_images):
+                all_results.append(genarate_3dmodel_from_image(input_images[unique_indices[i]],
+                                                               i,
+                                                               n_images,
+                                                               pbar))
+
+        else:
+            # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel and causes issue with the comfy progress bar object
+            all_results = Parallel(backend="threading", n_jobs=num_processes)(delayed(with_trace_context(genarate_3dmodel_from_image, item=unique_indices[i]))(
+                input_images[unique_indices[i]],
+                i,
+                n_images,
+                pbar
+            ) for i in range(n_images))
+
+        # fan the results back out to every original image so the outputs line up with the input batch
+        results_by_index = dict(zip(unique_indices, all_results))
+
+        ret_dict = {}
+        ret_dict["thumbnail_images"] = []
+        ret_dict["glb_urls"] = []
+        ret_dict["fbx_urls"] = []
+        ret_dict["usdz_urls"] = []
+        ret_dict["request_ids"] = []
+
+        for rep_idx in representatives:
+            results = results_by_index[rep_idx]
+            ret_dict["thumbnail_images"].append(results[0])
+            ret_dict["glb_urls"].append(results[1])
+            ret_dict["fbx_urls"].append(results[2])
+            ret_dict["usdz_urls"].append(results[3])
+            ret_dict["request_ids"].append(results[4])
+
+        return ret_dict["thumbnail_images"], ret_dict["glb_urls"], ret_dict["fbx_urls"], ret_dict["usdz_urls"], ret_dict["request_ids"]
 
@@ -1,8 +1,31 @@
-from .utils.general import hash_node_inputs, variable_substitution, llm_call_with_json_parsing
+# system imports
+from joblib import Parallel, delayed, cpu_count
+
+# MPX imports
+from .utils.general import hash_node_inputs, variable_substitution, llm_call_with_json_parsing, estimate_tokens
+from .utils.progress import StepProgress
+from .sdk.tracing import with_trace_context
 
 from ..base import BaseNode
 
 
+def pack_groups(token_estimates: list, max_group_tokens: int) -> list:
+    """
+        Split consecutive strings into groups of at most max_group_tokens tokens in total, returned as lists of indices.
+        A string that doesn't fit in a group with its neighbour is a group of its own.
+    """
+    groups = []
+    group_tokens = 0
+    for idx, n_tokens in enumerate(token_estimates):
+        if groups and group_tokens + n_tokens <= max_group_tokens:
+            groups[-1].append(idx)
+            group_tokens += n_tokens
+        else:
+            groups.append([idx])
+            group_tokens = n_tokens
+    return groups
+
+
 class StringListToText(BaseNode):
     """
     The StringListToText node combines a list of strings into a single text output based on custom instructions.
@@ -22,7 +45,7 @@ class StringListToText(BaseNode):
             },
             "optional":
             {
-                "model": (["gpt-4o", "gpt-4o-mini"], "COMBO"),
+                "model": (["gpt-4o", "gpt-4o-mini", "auto"], "COMBO"),
                 "temp": ("FLOAT", {
                     "default": 0.0,
                     "min": 0.0,
@@ -39,6 +62,26 @@ class StringListToText(BaseNode):
                     "tooltip": "Custom instructions for how the text should be transformed. Examples: 'Make this more formal', 'Rewrite in a friendly tone', 'Summarize this text'.",
                     "agent_description": "Instructions for how to combine and transform the list of strings."
                 }),
+                "tree_reduce": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "For long lists: merge groups of strings in parallel, then merge the partial results level by level, before the final merge with the custom instructions.",
+                    "agent_description": "When enabled, large lists are merged in groups in parallel and the partial results are merged level by level. Default false."
+                }),
+                "max_group_tokens": ("INT", {
+                    "default": 6000,
+                    "min": 500,
+                    "max": 100000,
+                    "step": 500,
+                    "tooltip": "Approximate number of tokens of strings merged in one request in tree reduce mode.",
+                    "agent_description": "Approximate token budget of the strings in one merge request. Default: 6000."
+                }),
+                "num_processes": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": cpu_count(),
+                    "tooltip": "Number of groups merged in parallel in tree reduce mode.",
+                    "agent_description": "Number of parallel processes for merging groups. Default: 1."
+                }),
             }
         }
     
@@ -53,7 +96,13 @@ class StringListToText(BaseNode):
     __DEFAULT_PROMPT_HUMAN = "### Here is the given block of text:\n{string_list}\n\n### Here are the custom user instructions:\n{custom_instructions}"
 
 
-    def execute(self, string_list, model, temp, custom_instructions):
+    __PARTIAL_PROMPT_SYS = "You are an expert natural language editor who is tasked with combining a given list of strings into a single block of text. The list is one part of a much longer list, and your result will later be combined with the results for the other parts according to some custom user given instructions. Combine the strings so that everything that could matter for those instructions is kept: do not drop facts, names or details, only remove repetition. Do not apply the instructions yet.\n\nReturn the answer as only a JSON with a two keys 'merged_text' and 'reasoning'.\nIn the 'merged_text' key provide the combined text with no premable or explanation.\nIn the 'reasoning' key provide a short explaination of what you combined.\n\nEnsure you return a valid JSON string. It needs to have the keys on seperate lines with the ```json and ``` markers around everything. Ensure that the two keys have double quotes around them (e.g.: the \" character) and the the values for those keys also have have double quotes around them."
+
+    def execute(self, string_list, model, temp, custom_instructions, tree_reduce=False, max_group_tokens=6000, num_processes=1):
+        n_levels = 0
+        if tree_reduce:
+            string_list, n_levels = self.reduce_to_fit(string_list, model, temp, custom_instructions, max_group_tokens, num_processes)
+
         llm_params = {}
         llm_params["temperature"] = temp
 
@@ -67,9 +116,73 @@ class StringListToText(BaseNode):
         sys_prompt = variable_substitution(StringListToText.__DEFAULT_PROMPT_SYS, prompt_data)
         human_prompt = variable_substitution(StringListToText.__DEFAULT_PROMPT_HUMAN, prompt_data)
 
-        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params)
+        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="transform")
 
         merged_text = parsed_response['merged_text']
         reasoning = parsed_response['reasoning']
+        if n_levels > 0:
+            reasoning += f"\n\nThe list was too long to merge at once, so it was first merged in groups over {n_levels} level(s) into {len(string_list)} partial texts."
 
         return (merged_text, reasoning, )
+
+    def merge_group(self, group, model, temp, custom_instructions, progress):
+        if len(group) == 1:
+            # a string that didn't fit in a group with its neighbour has nothing to be merged with
+            merged_text = group[0]
+        else:
+            merged_text = self.merge_strings(group, model, temp, custom_instructions)
+
+        progress.step_done()
+        return merged_text
+
+    def merge_strings(self, group, model, temp, custom_instructions):
+        llm_params = {}
+        llm_params["temperature"] = temp
+
+        extra_params = {}
+        extra_params["model"] = model
+
+        prompt_data = {}
+        prompt_data['string_list'] = group
+        prompt_data['custom_instructions'] = custom_instructions
+
+        sys_prompt = variable_substitution(StringListToText.__PARTIAL_PROMPT_SYS, prompt_data)
+        human_prompt = variable_substitution(StringListToText.__DEFAULT_PROMPT_HUMAN, prompt_data)
+
+        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="transform")
+        return parsed_response['merged_text']
+
+    def reduce_to_fit(self, string_list, model, temp, custom_instructions, max_group_tokens, num_processes):
+        """
+            Merge groups of strings level by level until the whole list fits in one request of max_group_tokens.
+        """
+        items = [str(s) for s in string_list]
+        level = 0
+        while len(items) > 1:
+            token_estimates = [estimate_tokens(item) for item in items]
+            if sum(token_estimates) <= max_group_tokens:
+                break
+
+            groups = [[items[i] for i in group] for group in pack_groups(token_estimates, max_group_tokens)]
+            if len(groups) == len(items):
+                # no two neighbouring strings fit in one request together, merging further can't stay within the budget
+                break
+            level += 1
+            n_groups = len(groups)
+            print(f"Tree reduce level {level}: merging {len(items)} strings (~{sum(token_estimates)} tokens) in {n_groups} groups ...")
+
+            progress = StepProgress(n_groups)
+
+            # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel and causes issue with the comfy progress bar object
+            items = Parallel(backend="threading", n_jobs=num_processes)(delayed(with_trace_context(self.merge_group, item=i))(
+                groups[i],
+                model,
+                temp,
+                custom_instructions,
+                progress
+            ) for i in range(n_groups))
+
+        n_tokens = sum(estimate_tokens(item) for item in items)
+        if n_tokens > max_group_tokens:
+            print(f"Warning: after {level} tree reduce level(s) the list is still ~{n_tokens} tokens long, more than max_group_tokens ({max_group_tokens}), merging it in one request anyway")
+        return items, level
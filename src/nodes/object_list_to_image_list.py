@@ -12,6 +12,9 @@ from folder_paths import get_output_directory
 # MPX imports
 from .sdk.components.text_to_image import component_text_to_image
 from .sdk.utils.image_helpers import download_image_from_url_to_PIL, convert_from_PIL_to_torch
+from .sdk.utils.provenance import register_image_source
+from .sdk.tracing import with_trace_context
+from .utils.text_similarity import find_near_duplicates, NEAR_DUPLICATE_THRESHOLD
 
 from ..base import BaseNode
 
@@ -61,7 +64,20 @@ class ObjectListToImageList(BaseNode):
                     "default": True,
                     "tooltip": "When enabled, ensures each generated image contains only one object, which is ideal for creating individual 3D models.",
                     "agent_description": "Each description in the object list has only one object in it. Useful for creating single 3D objects. Default: true."
-                })
+                }),
+                "deduplicate_descriptions": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Only generate one image for object descriptions that are identical or nearly identical (e.g. 'wooden chair' and 'A wooden chair.') and re-use it for all of them.",
+                    "agent_description": "When enabled, near-duplicate object descriptions share a single image generation. Default: false."
+                }),
+                "dedup_similarity_threshold": ("FLOAT", {
+                    "default": NEAR_DUPLICATE_THRESHOLD,
+                    "min": 0.5,
+                    "max": 1.0,
+                    "step": 0.05,
+                    "tooltip": "How similar two descriptions have to be (estimated Jaccard similarity of their character shingles) to count as duplicates. 1.0 only merges descriptions that are the same apart from case, punctuation and numbering.",
+                    "agent_description": "How similar two object descriptions must be to share an image. Range: 0.5-1.0, default: 0.8."
+                }),
             }
         }
 
@@ -71,7 +87,7 @@ class ObjectListToImageList(BaseNode):
         "Generated images from the input object list.",
     )
 
-    def execute(self, object_list, output_folder, num_processes, seed, used_for_3D=True, only_one_object_per_desc=True):
+    def execute(self, object_list, output_folder, num_processes, seed, used_for_3D=True, only_one_object_per_desc=True, deduplicate_descriptions=False, dedup_similarity_threshold=NEAR_DUPLICATE_THRESHOLD):
 
         if os.path.exists(output_folder) == False:
             print(f"Output folder: {output_folder} DOES NOT EXIST!")
@@ -112,6 +128,7 @@ class ObjectListToImageList(BaseNode):
 
             # download results and save to disk if an output folder is given
             PIL_img = download_image_from_url_to_PIL(image_urls[0])
+            register_image_source(PIL_img, image_urls[0], request_id)
             torch_img = convert_from_PIL_to_torch(PIL_img)
 
             if output_folder: 
@@ -126,14 +143,23 @@ class ObjectListToImageList(BaseNode):
             return torch_img
 
 
-        n_objects = len(object_list)
+        # only the first description of every group of near-duplicates gets sent to text2image
+        if deduplicate_descriptions:
+            representatives = find_near_duplicates(object_list, dedup_similarity_threshold)
+        else:
+            representatives = list(range(len(object_list)))
+        unique_indices = sorted(set(representatives))
+
+        n_objects = len(unique_indices)
+        if n_objects < len(object_list):
+            print(f"Deduplicated {len(object_list)} object descriptions into {n_objects} image generations.")
         pbar = comfy.utils.ProgressBar(n_objects)
 
         image_tensors = []
 
         if num_processes == 1:
             for i in range(n_objects):
-                img_tensor = generate_image_from_object_description(object_list[i],
+                img_tensor = generate_image_from_object_description(object_list[unique_indices[i]],
                                                                     seed,
                                                                     i,
                                                                     n_objects,
@@ -141,13 +167,15 @@ class ObjectListToImageList(BaseNode):
                 image_tensors.append(img_tensor)
 
         else:
-            image_tensors = Parallel(backend="threading", n_jobs=num_processes)(delayed(generate_image_from_object_description)(
-                object_list[i], 
+            image_tensors = Parallel(backend="threading", n_jobs=num_processes)(delayed(with_trace_context(generate_image_from_object_description, item=unique_indices[i]))(
+                object_list[unique_indices[i]], 
                 seed,
                 i, 
                 n_objects,
                 pbar
             ) for i in range(n_objects))
 
-        batch_tensor = torch.stack(image_tensors, dim=0)
+        # fan the images back out to every original description so the batch lines up with the object list
+        images_by_index = dict(zip(unique_indices, image_tensors))
+        batch_tensor = torch.stack([images_by_index[rep_idx] for rep_idx in representatives], dim=0)
         return (batch_tensor, )
@@ -0,0 +1,197 @@
+# system imports
+import json
+from joblib import Parallel, delayed, cpu_count
+
+# comfyui imports 
+import comfy.utils
+
+# sdk imports
+from .sdk.components.optimizer import component_optimizer, component_optimizer_lod_chains
+from .sdk.tracing import with_trace_context
+from ..base import BaseNode
+
+
+class OptimizeModels(BaseNode):
+    """
+    The OptimizeModels node reduces the polygon count of a list of 3D models. Returns the optimized model URLs and request IDs.
+    """
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "model_urls": ("LIST", {
+                    "default": [],
+                    "forceInput": True,
+                    "tooltip": "List of URLs of the 3D models to optimize.",
+                    "agent_description": "A list of model URLs to be optimized."
+                }),
+            },
+            "optional": {
+                "request_ids": ("LIST", {
+                    "default": [],
+                    "forceInput": True,
+                    "tooltip": "Request IDs of models that already live in MPX (e.g. from Image(s) to 3D Model(s)). These are used directly instead of uploading the model again.",
+                    "agent_description": "Optional list of MPX request IDs matching the model URLs, which skips re-uploading the models."
+                }),
+                "target_ratio": ("FLOAT", {
+                    "default": 0.85,
+                    "min": 0.01,
+                    "max": 1.0,
+                    "step": 0.01,
+                    "tooltip": "Fraction of the original polygons to keep.",
+                    "agent_description": "Fraction of the original polygons to keep. Range: 0.01-1.0, default: 0.85."
+                }),
+                "output_format": (["glb", "fbx", "usdz"], {
+                    "default": "glb",
+                    "tooltip": "File format of the optimized models.",
+                    "agent_description": "File format of the optimized models. Default: glb."
+                }),
+                "object_type": ("STRING", {
+                    "default": "object",
+                    "tooltip": "Type of the models being optimized.",
+                    "agent_description": "Type of the models being optimized. Default: object."
+                }),
+                "num_processes": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": cpu_count(),
+                    "tooltip": "Number of parallel processes for batch processing.",
+                    "agent_description": "Number of parallel processes."
+                }),
+            },
+        }
+
+    RETURN_TYPES = ("LIST", "LIST")
+    RETURN_NAMES = ("OptimizedModelUrls_list", "RequestIDs_list")
+    RETURN_AGENT_DESCRIPTIONS = (
+        "A list of URLs to the optimized 3D models.",
+        "A list of request IDs corresponding to each optimize call."
+    )
+
+    def execute(self, model_urls, request_ids=[], target_ratio=0.85, output_format="glb", object_type="object", num_processes=1):
+        n_models = len(model_urls)
+        if len(request_ids) not in [0, n_models]:
+            raise ValueError(f"request_ids must be empty or have one entry per model URL! Got {len(request_ids)} request IDs for {n_models} model URLs.")
+
+        pbar = comfy.utils.ProgressBar(n_models)
+
+        global num_models_optimized
+        num_models_optimized = 0
+
+        def optimize_model(model_url: str, model_request_id: str, model_idx: int, progress_bar: comfy.utils.ProgressBar):
+            global num_models_optimized
+
+            print(f"Optimizing 3D Model [{model_idx}/{n_models}] ... ")
+
+            optimize_response = component_optimizer(
+                mesh_url=model_url,
+                mesh_request_id=model_request_id,
+                target_ratio=target_ratio,
+                output_format=output_format,
+                object_type=object_type
+            )
+
+            num_models_optimized += 1
+            progress_bar.update_absolute(num_models_optimized, n_models)
+            return optimize_response["model_url"], optimize_response["request_id"]
+
+        # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel and causes issue with the comfy progress bar object
+        all_results = Parallel(backend="threading", n_jobs=num_processes)(delayed(with_trace_context(optimize_model, item=i))(
+            model_urls[i],
+            request_ids[i] if len(request_ids) > 0 else None,
+            i,
+            pbar
+        ) for i in range(n_models))
+
+        optimized_model_urls = [results[0] for results in all_results]
+        optimized_request_ids = [results[1] for results in all_results]
+        return (optimized_model_urls, optimized_request_ids)
+
+
+class OptimizeModelsToLODChains(BaseNode):
+    """
+    The OptimizeModelsToLODChains node builds several levels of detail for every 3D model in a list in one pass. Returns one LOD manifest per model.
+    """
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "model_urls": ("LIST", {
+                    "default": [],
+                    "forceInput": True,
+                    "tooltip": "List of URLs of the 3D models to build LOD chains for.",
+                    "agent_description": "A list of model URLs to build levels of detail for."
+                }),
+                "target_ratios": ("STRING", {
+                    "default": "0.75, 0.5, 0.25, 0.1",
+                    "tooltip": "Comma separated fractions of the original polygons to keep, one per level of detail. The largest becomes LOD0.",
+                    "agent_description": "Comma separated polygon ratios, one per level of detail. Default: '0.75, 0.5, 0.25, 0.1'."
+                }),
+                "output_formats": ("STRING", {
+                    "default": "glb",
+                    "tooltip": "Comma separated file formats to export every level of detail in (glb, fbx, usdz).",
+                    "agent_description": "Comma separated output file formats. Default: 'glb'."
+                }),
+            },
+            "optional": {
+                "request_ids": ("LIST", {
+                    "default": [],
+                    "forceInput": True,
+                    "tooltip": "Request IDs of models that already live in MPX (e.g. from Image(s) to 3D Model(s)). These are used directly instead of uploading the model again.",
+                    "agent_description": "Optional list of MPX request IDs matching the model URLs, which skips re-uploading the models."
+                }),
+                "object_type": ("STRING", {
+                    "default": "object",
+                    "tooltip": "Type of the models being optimized.",
+                    "agent_description": "Type of the models being optimized. Default: object."
+                }),
+                "num_processes": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": cpu_count(),
+                    "tooltip": "Number of parallel processes for uploading models and submitting optimize jobs.",
+                    "agent_description": "Number of parallel processes."
+                }),
+            },
+        }
+
+    RETURN_TYPES = ("LIST", "STRING")
+    RETURN_NAMES = ("LODManifests_list", "LODManifests_string")
+    RETURN_AGENT_DESCRIPTIONS = (
+        "One LOD manifest per input model with the URLs and request IDs of every level of detail and output format.",
+        "The LOD manifests as a JSON string."
+    )
+
+    def execute(self, model_urls, target_ratios, output_formats, request_ids=[], object_type="object", num_processes=1):
+        n_models = len(model_urls)
+        if len(request_ids) not in [0, n_models]:
+            raise ValueError(f"request_ids must be empty or have one entry per model URL! Got {len(request_ids)} request IDs for {n_models} model URLs.")
+
+        ratios = [float(r) for r in target_ratios.split(",") if r.strip()]
+        formats = [f.strip().lower() for f in output_formats.split(",") if f.strip()]
+        if len(ratios) == 0: raise ValueError("At least one target ratio is required!")
+        if len(formats) == 0: raise ValueError("At least one output format is required!")
+        for r in ratios:
+            if r <= 0.0 or r > 1.0: raise ValueError(f"Target ratios must be between 0 and 1! Got: {r}")
+
+        meshes = []
+        for i in range(n_models):
+            meshes.append({
+                "mesh_url": model_urls[i],
+                "mesh_request_id": request_ids[i] if len(request_ids) > 0 else None,
+            })
+
+        pbar = comfy.utils.ProgressBar(n_models * len(set(ratios)) * len(set(formats)))
+
+        manifests = component_optimizer_lod_chains(
+            meshes,
+            ratios,
+            formats,
+            object_type=object_type,
+            num_processes=num_processes,
+            on_job_done=lambda n_done, n_jobs: pbar.update_absolute(n_done, n_jobs)
+        )
+
+        return (manifests, json.dumps(manifests, indent=2))
@@ -1,4 +1,3 @@
-from .utils.general import hash_node_inputs
 from ..base import BaseNode
 
 
@@ -6,10 +5,6 @@ class PickFromListOfStrings(BaseNode):
     """
     The PickFromListOfStrings node selects a single item from a list of strings at the specified index.
     """
-    
-    def __init__(self):
-        self._cached_input_hash = None
-        self._cached_output = None
 
     @classmethod
     def INPUT_TYPES(s):
@@ -50,17 +45,6 @@ class PickFromListOfStrings(BaseNode):
         if index < 0: raise ValueError("The desired index number cannot be negative!")
         if index > n_elements: raise ValueError(f"Desired index number {index} is too large! The list only has {n_elements} elements.")
 
-        # check if the inputs have changed
-        input_hash = hash_node_inputs({
-            "input_list": input_list,
-            "index": index,
-        })
-
-        # re-run the function if the hashes differ
-        if input_hash != self._cached_input_hash:
-            actual_index = index - 1
-            self._cached_output = (input_list[actual_index],)
-            self._cached_input_hash = input_hash
-
-        return self._cached_output
+        actual_index = index - 1
+        return (input_list[actual_index],)
 
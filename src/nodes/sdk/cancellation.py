@@ -0,0 +1,119 @@
+import time
+import threading
+
+from .sdk_client import get_client
+
+try:
+    import comfy.model_management as model_management
+    _CancelledBase = model_management.InterruptProcessingException
+except ImportError:
+    model_management = None
+    _CancelledBase = Exception
+
+# Cooperative cancellation tied to ComfyUI's interrupt flag.
+# A watcher thread mirrors the flag into a process wide token. Everything in the SDK layer that sleeps waits on
+# the token instead of time.sleep(), and everything that submits work checks it first, so when the user hits
+# Cancel the pollers wake up immediately, no new MPX jobs are submitted and joblib stops scheduling new items.
+# The token stays cancelled until ComfyUI starts executing a different prompt, because ComfyUI clears its own
+# flag as soon as any one thread has raised the interrupt.
+
+WATCH_INTERVAL_S = 0.1
+
+
+class OperationCancelled(_CancelledBase):
+    pass
+
+
+class CancellationToken():
+    def __init__(self):
+        self._event = threading.Event()
+        self.cancelled_prompt_id = None
+
+    def cancel(self, prompt_id=None):
+        self.cancelled_prompt_id = prompt_id
+        self._event.set()
+
+    def reset(self):
+        self.cancelled_prompt_id = None
+        self._event.clear()
+
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise OperationCancelled("MPX operation cancelled by the user")
+
+    def sleep(self, seconds: float):
+        """
+            Sleep for the given number of seconds, raising OperationCancelled as soon as the token is cancelled.
+        """
+        if self._event.wait(seconds):
+            raise OperationCancelled("MPX operation cancelled by the user")
+
+
+_token = CancellationToken()
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def _current_prompt_id():
+    try:
+        from server import PromptServer
+        return getattr(PromptServer.instance, "last_prompt_id", None)
+    except Exception:
+        return None
+
+
+def _reset_for_new_prompt():
+    # a cancel only applies to the prompt that was running when it happened
+    if _token.is_cancelled() and not model_management.processing_interrupted() and _current_prompt_id() != _token.cancelled_prompt_id:
+        _token.reset()
+
+
+def _watch_comfy_interrupts():
+    while True:
+        if model_management.processing_interrupted():
+            if not _token.is_cancelled():
+                _token.cancel(_current_prompt_id())
+        else:
+            _reset_for_new_prompt()
+        time.sleep(WATCH_INTERVAL_S)
+
+
+def get_cancellation_token() -> CancellationToken:
+    global _watcher
+    if model_management is not None:
+        with _watcher_lock:
+            if _watcher is None:
+                _watcher = threading.Thread(target=_watch_comfy_interrupts, name="mpx-interrupt-watcher", daemon=True)
+                _watcher.start()
+        # checked here too so the first calls of a new prompt don't have to wait for the watcher's next poll
+        _reset_for_new_prompt()
+    return _token
+
+
+def raise_if_cancelled():
+    get_cancellation_token().raise_if_cancelled()
+
+
+def cancellable_sleep(seconds: float):
+    get_cancellation_token().sleep(seconds)
+
+
+def cancel_server_jobs(request_ids):
+    """
+        Best-effort cancellation of server side jobs. The MPX SDK does not expose a cancel endpoint (yet), in which case
+        the jobs are left running; they are in the job journal so re-running the same inputs re-attaches to them.
+    """
+    mpx_client = get_client()
+    cancel = getattr(getattr(mpx_client, "status", None), "cancel", None)
+    for request_id in request_ids:
+        if cancel is None:
+            print(f"[mpx_sdk] {request_id} is no longer waited for, it is left running on the server")
+            continue
+        try:
+            cancel(request_id)
+            print(f"[mpx_sdk] cancelled {request_id}")
+        except Exception as e:
+            print(f"[mpx_sdk] unable to cancel {request_id}: {e}")
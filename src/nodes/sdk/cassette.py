@@ -0,0 +1,283 @@
+import os
+import re
+import json
+import gzip
+import time
+import base64
+import atexit
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import httpx
+
+# Record-and-replay of MPX API and storage traffic to a gzipped JSON-lines cassette, with secrets redacted.
+# Replayed jobs finish with their recorded timing. Set with MPX_CASSETTE_MODE, MPX_CASSETTE_PATH and MPX_REPLAY_SPEED.
+
+CASSETTE_VERSION = 1
+REDACTED = "<redacted>"
+
+SECRET_QUERY_PARAMS = re.compile(r"(sig|signature|token|key|credential|x-goog-|x-amz-|auth)", re.IGNORECASE)
+SECRET_JSON_KEYS = re.compile(r"(authorization|bearer|token|api_key|apikey|secret|password)", re.IGNORECASE)
+RECORDED_RESPONSE_HEADERS = ["content-type"]
+URL_IN_TEXT = re.compile(r"https?://[^\s\"'<>]+")
+BEARER_IN_TEXT = re.compile(r"(bearer\s+)[\w\-\.=~+/]+", re.IGNORECASE)
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(k, REDACTED if SECRET_QUERY_PARAMS.search(k) else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query, safe="<>"), parts.fragment))
+
+
+def redact_json(data):
+    if isinstance(data, dict):
+        return { k: REDACTED if SECRET_JSON_KEYS.search(k) else redact_json(v) for k, v in data.items() }
+    if isinstance(data, list):
+        return [redact_json(v) for v in data]
+    if isinstance(data, str) and data.startswith("http"):
+        return redact_url(data)
+    return data
+
+
+def redact_text(text: str) -> str:
+    """
+        Redact the URLs and bearer tokens in a body that isn't JSON (e.g. an HTML or plain text error page).
+    """
+    text = URL_IN_TEXT.sub(lambda m: redact_url(m.group(0)), text)
+    return BEARER_IN_TEXT.sub(lambda m: m.group(1) + REDACTED, text)
+
+
+def _redact_body(body: bytes) -> str | None:
+    if not body:
+        return None
+    try:
+        return json.dumps(redact_json(json.loads(body)), sort_keys=True)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _find_request_id(body_text: str | None) -> str | None:
+    if not body_text:
+        return None
+    try:
+        data = json.loads(body_text)
+    except ValueError:
+        return None
+    if isinstance(data, dict):
+        return data.get("requestId") or data.get("request_id")
+    return None
+
+
+class Cassette():
+    def __init__(self, path: str, mode: str, speed: float = 1.0):
+        if mode not in ["record", "replay"]:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+
+        if mode == "record":
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+            self._blobs_written = set()
+            self._write({ "type": "header", "version": CASSETTE_VERSION, "created_at": time.time() })
+            atexit.register(self.close)
+        else:
+            self._load(path)
+
+    ### recording
+
+    def _write(self, entry: dict):
+        with self._lock:
+            self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._file.flush()
+
+    def _offset(self, t: float) -> float:
+        return t - self._started_at
+
+    def record_api(self, request: httpx.Request, response: httpx.Response, started_at: float, finished_at: float):
+        body_text = _redact_body(response.content)
+        if body_text is None and response.content:
+            body_text = redact_text(response.content.decode("utf-8", errors="replace"))
+        self._write({
+            "type": "api",
+            "t": self._offset(started_at),
+            "duration": finished_at - started_at,
+            "method": request.method,
+            "path": request.url.path,
+            "request_digest": hashlib.sha256(request.content or b"").hexdigest()[:16],
+            "request_body": _redact_body(request.content),
+            "status": response.status_code,
+            "headers": { k: v for k, v in response.headers.items() if k.lower() in RECORDED_RESPONSE_HEADERS },
+            "body": body_text,
+        })
+
+    def record_storage(self, method: str, url: str, status: int, size: int, body: bytes | None, started_at: float, finished_at: float):
+        blob = None
+        if body is not None:
+            blob = hashlib.sha256(body).hexdigest()
+            with self._lock:
+                already_written = blob in self._blobs_written
+                self._blobs_written.add(blob)
+            if not already_written:
+                self._write({ "type": "blob", "sha256": blob, "data": base64.b64encode(body).decode("ascii") })
+        self._write({
+            "type": "storage",
+            "t": self._offset(started_at),
+            "duration": finished_at - started_at,
+            "method": method,
+            "url": redact_url(url),
+            "path": urlsplit(url).path,
+            "status": status,
+            "size": size,
+            "blob": blob,
+        })
+
+    def close(self):
+        if self.mode == "record":
+            with self._lock:
+                if not self._file.closed:
+                    self._file.close()
+
+    ### replay
+
+    def _load(self, path: str):
+        self._api_entries = {}       # (method, path) -> list of entries in recorded order
+        self._storage_entries = {}   # path -> list of entries in recorded order
+        self._blobs = {}
+        self._submitted_at = {}      # request_id -> recorded offset of its submit
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["type"] == "api":
+                    self._api_entries.setdefault((entry["method"], entry["path"]), []).append(entry)
+                    request_id = _find_request_id(entry["body"])
+                    if entry["method"] == "POST" and request_id is not None:
+                        self._submitted_at.setdefault(request_id, entry["t"])
+                elif entry["type"] == "storage":
+                    self._storage_entries.setdefault(entry["path"], []).append(entry)
+                elif entry["type"] == "blob":
+                    self._blobs[entry["sha256"]] = entry["data"]
+        self._next_index = {}
+        self._replay_submitted_at = {} # request_id -> when the replayed submit happened
+
+    def _replay_delay(self, entry: dict):
+        time.sleep(entry["duration"] / self.speed)
+
+    def _pick_api_entry(self, request: httpx.Request) -> dict | None:
+        key = (request.method, request.url.path)
+        entries = self._api_entries.get(key)
+        if not entries:
+            return None
+
+        # polls for a job follow the job's recorded timeline relative to when it was submitted in this replay
+        path_segments = request.url.path.split("/")
+        polled_request_id = next((rid for rid in path_segments if rid in self._replay_submitted_at), None)
+        if polled_request_id is not None:
+            elapsed = (time.monotonic() - self._replay_submitted_at[polled_request_id]) * self.speed
+            recorded_elapsed_at = self._submitted_at.get(polled_request_id, entries[0]["t"])
+            due = [e for e in entries if e["t"] - recorded_elapsed_at <= elapsed]
+            return due[-1] if due else entries[0]
+
+        # submits with the same inputs are served in recorded order, anything else in the order it was recorded for the endpoint
+        digest = hashlib.sha256(request.content or b"").hexdigest()[:16]
+        with self._lock:
+            matching = [i for i, e in enumerate(entries) if e["request_digest"] == digest]
+            candidates = matching if matching else list(range(len(entries)))
+            used = self._next_index.setdefault((key, digest if matching else None), 0)
+            self._next_index[(key, digest if matching else None)] = used + 1
+        return entries[candidates[min(used, len(candidates) - 1)]]
+
+    def replay_api(self, request: httpx.Request) -> httpx.Response:
+        entry = self._pick_api_entry(request)
+        if entry is None:
+            return httpx.Response(404, json={ "message": f"No recorded response for {request.method} {request.url.path}" }, request=request)
+        self._replay_delay(entry)
+
+        request_id = _find_request_id(entry["body"])
+        if request.method == "POST" and request_id is not None:
+            with self._lock:
+                self._replay_submitted_at.setdefault(request_id, time.monotonic())
+
+        return httpx.Response(entry["status"], headers=entry["headers"], content=(entry["body"] or "").encode("utf-8"), request=request)
+
+    def replay_storage(self, method: str, url: str):
+        """
+            Returns (status, body) for a storage request. Uploads always succeed, downloads return the recorded body.
+        """
+        entries = self._storage_entries.get(urlsplit(url).path, [])
+        entry = next((e for e in entries if e["method"] == method), None)
+        if entry is not None:
+            self._replay_delay(entry)
+        if method != "GET":
+            return 200, b""
+        if entry is None:
+            return 404, b""
+        if entry["blob"] is not None and entry["blob"] in self._blobs:
+            return entry["status"], base64.b64decode(self._blobs[entry["blob"]])
+        # streamed downloads are recorded without their body
+        return entry["status"], bytes(entry["size"])
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """
+        httpx transport for the SDK client that records through to the network, or replays from the cassette.
+    """
+    def __init__(self, cassette: Cassette, wrapped: httpx.BaseTransport = None):
+        self._cassette = cassette
+        self._wrapped = wrapped if wrapped is not None else httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self._cassette.mode == "replay":
+            return self._cassette.replay_api(request)
+
+        started_at = time.monotonic()
+        response = self._wrapped.handle_request(request)
+        content = response.read()
+        finished_at = time.monotonic()
+        self._cassette.record_api(request, response, started_at, finished_at)
+
+        # the content has already been decoded, so the encoding headers don't apply to it anymore
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in ["content-encoding", "content-length", "transfer-encoding"]]
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request, extensions=response.extensions)
+
+    def close(self):
+        self._wrapped.close()
+
+
+def get_cassette() -> Cassette | None:
+    """
+        The cassette configured by MPX_CASSETTE_MODE / MPX_CASSETTE_PATH, or None if recording and replay are off.
+    """
+    global _cassette
+    mode = os.getenv("MPX_CASSETTE_MODE", "")
+    if mode not in ["record", "replay"]:
+        return None
+
+    with _cassette_lock:
+        if _cassette is None:
+            path = os.getenv("MPX_CASSETTE_PATH", "")
+            if not path:
+                path = time.strftime("mpx_%Y%m%d-%H%M%S.mpxcassette.gz")
+            try:
+                _cassette = Cassette(path, mode, float(os.getenv("MPX_REPLAY_SPEED", 1.0)))
+                print(f"mpx-comfyui-nodes: {'recording MPX traffic to' if mode == 'record' else 'replaying MPX traffic from'} {path}")
+            except Exception as e:
+                print(f"mpx-comfyui-nodes: Unable to open the cassette {path}: {e}")
+                return None
+        return _cassette
+
+
+def get_cassette_http_client() -> httpx.Client | None:
+    """
+        httpx client to hand to the SDK client when recording or replaying, otherwise None.
+    """
+    cassette = get_cassette()
+    if cassette is None:
+        return None
+    return httpx.Client(transport=CassetteTransport(cassette), timeout=httpx.Timeout(600.0, connect=30.0))
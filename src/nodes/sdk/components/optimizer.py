@@ -1,7 +1,15 @@
 from ..sdk_client import get_client 
-from ..get_status import get_status 
-from io import BytesIO
+from ..get_status import get_status, get_status_many
+from ..cancellation import raise_if_cancelled
+from ..job_journal import run_journaled_job, get_job_journal, fingerprint_job_inputs
+from ..metrics import count_bytes, count_cache_lookup, count_request, observe_phase, observe_server_time, IN_FLIGHT
+from ..utils.http_helpers import http_get, http_put
+from ..tracing import span
+import time
 import requests
+from joblib import Parallel, delayed
+
+RELAY_CHUNK_SIZE = 1024 * 1024
 
 # This function takes either a request_id, an image url or an image object and returns a 3d model
 def component_optimizer(
@@ -11,24 +19,23 @@ def component_optimizer(
                             output_format="glb",
                             object_type="object"
                            ):
-  client = get_client()
-     
-  # if mesh_url is provided, we upload the glb file and get the request_id
-  if mesh_url:
-    mesh_request_id = upload_glb(mesh_url)
-  
-  if mesh_request_id is None:
+  if mesh_request_id is None and not mesh_url:
     raise ValueError("mesh_request_id or mesh_url is required")
-  
-  optimze_glb = client.components.optimize(
-    asset_request_id= mesh_request_id,
-    target_ratio= target_ratio,
-    output_file_format= output_format,
-    object_type= object_type
+
+  def submit():
+    # if only mesh_url is provided, we upload the glb file and get the request_id
+    # meshes that already live in MPX (known request_id) are used as-is
+    source_request_id = mesh_request_id if mesh_request_id is not None else upload_glb(mesh_url)
+    optimze_glb = submit_optimize(source_request_id, target_ratio, output_format, object_type)
+    print(optimze_glb)
+    return optimze_glb.request_id
+
+  # wait for the request to complete, re-attaching to an earlier job for the same mesh if there is one
+  optimize_request_id, optimze_glb_response = run_journaled_job(
+    "optimize",
+    optimize_job_inputs(mesh_url, mesh_request_id, target_ratio, output_format, object_type),
+    submit
   )
-  print(optimze_glb)
-      # wait for the request to complete
-  optimze_glb_response = get_status(optimze_glb.request_id)
   print(f'status_response: {optimze_glb_response}')
 
   if optimze_glb_response.status != 'complete':
@@ -44,33 +51,206 @@ def component_optimizer(
   # return the glb url
   return {
     "model_url": optimze_glb_response.output_url,
-    "request_id": optimze_glb_response.request_id
+    "request_id": optimize_request_id
   }
 
+class GLBStreamingRelay():
+  """
+    Iterable request body that hands a streaming download to requests.put() chunk by chunk,
+    so the upload starts with the first chunk and at most one chunk of the mesh is held in memory.
+  """
+  def __init__(self, source_response: requests.Response, chunk_size: int = RELAY_CHUNK_SIZE):
+    self._source_response = source_response
+    self._chunk_size = chunk_size
+    self.bytes_relayed = 0
+
+    # iter_content() decodes compressed bodies so the length on the wire can't be trusted in that case
+    self.content_length = 0
+    if "Content-Encoding" not in source_response.headers:
+      self.content_length = int(source_response.headers.get("Content-Length", 0))
+
+  def __len__(self):
+    # requests sends a Content-Length header with this
+    return self.content_length
+
+  def __bool__(self):
+    # requests replaces falsy bodies with an empty one, which an object with a length of 0 would be
+    return True
+
+  def __iter__(self):
+    for chunk in self._source_response.iter_content(chunk_size=self._chunk_size):
+      if chunk:
+        self.bytes_relayed += len(chunk)
+        yield chunk
+
+  def body(self):
+    """
+      The request body to upload: the relay itself when the size is known,
+      otherwise a generator so requests sends it with chunked transfer encoding.
+    """
+    if self.content_length > 0:
+      return self
+    return iter(self)
+
+  def check_complete(self):
+    if self.bytes_relayed == 0:
+      raise ValueError("glb relay failed: no bytes were relayed")
+    if self.content_length > 0 and self.bytes_relayed != self.content_length:
+      raise ValueError(f"glb relay failed: relayed {self.bytes_relayed} of {self.content_length} bytes")
+
+def optimize_job_inputs(mesh_url, mesh_request_id, target_ratio, output_format, object_type):
+  source = { "mesh_request_id": mesh_request_id } if mesh_request_id is not None else { "mesh_url": mesh_url }
+  return { **source, "target_ratio": target_ratio, "output_format": output_format, "object_type": object_type }
+
+def submit_optimize(mesh_request_id, target_ratio, output_format, object_type):
+  client = get_client()
+  return client.components.optimize(
+    asset_request_id= mesh_request_id,
+    target_ratio= target_ratio,
+    output_file_format= output_format,
+    object_type= object_type
+  )
+
+def component_optimizer_lod_chains(
+                            meshes,
+                            target_ratios,
+                            output_formats=("glb",),
+                            object_type="object",
+                            num_processes=1,
+                            on_job_done=None
+                           ):
+  """
+    Build a chain of levels of detail for every mesh in one pass.
+
+    meshes is a list of dicts with either a 'mesh_url' or a 'mesh_request_id' (or both).
+    Every source mesh is uploaded at most once, then one optimize job per (mesh, target_ratio, output_format)
+    is submitted concurrently and all jobs are awaited together in a single polling loop.
+    Jobs found in the job journal are re-attached to instead of being submitted again.
+    on_job_done(n_done, n_jobs) is called whenever one of the jobs finishes, n_jobs counting every distinct request once.
+
+    Returns one LOD manifest per mesh, LOD0 being the largest target_ratio:
+      { "source_url": ..., "source_request_id": ...,
+        "lods": [ { "lod": 0, "target_ratio": 0.75, "model_urls": { "glb": ... }, "request_ids": { "glb": ... }, "failed": [] }, ... ] }
+  """
+  target_ratios = sorted(set(target_ratios), reverse=True)
+  output_formats = list(dict.fromkeys(output_formats))
+
+  journal = get_job_journal()
+
+  jobs = []
+  for mesh_idx, mesh in enumerate(meshes):
+    if not mesh.get("mesh_request_id") and not mesh.get("mesh_url"):
+      raise ValueError("mesh_request_id or mesh_url is required")
+    for lod_idx, target_ratio in enumerate(target_ratios):
+      for output_format in output_formats:
+        inputs = optimize_job_inputs(mesh.get("mesh_url"), mesh.get("mesh_request_id") or None, target_ratio, output_format, object_type)
+        fingerprint = fingerprint_job_inputs("optimize", inputs)
+        # re-attach to earlier jobs for the same mesh and settings if there are any
+        request_id = journal.find_reusable("optimize", fingerprint) if journal is not None else None
+        if journal is not None:
+          count_cache_lookup("job_journal", request_id is not None)
+        jobs.append({ "mesh_idx": mesh_idx, "lod_idx": lod_idx, "target_ratio": target_ratio, "output_format": output_format, "fingerprint": fingerprint, "request_id": request_id })
+
+  # only meshes that still have jobs to submit need to be uploaded, and each of them only once
+  def resolve_source(mesh):
+    if mesh.get("mesh_request_id"):
+      return mesh["mesh_request_id"]
+    return upload_glb(mesh["mesh_url"])
+
+  meshes_to_resolve = sorted(set(job["mesh_idx"] for job in jobs if job["request_id"] is None))
+  # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel
+  resolved = Parallel(backend="threading", n_jobs=num_processes)(delayed(resolve_source)(meshes[i]) for i in meshes_to_resolve)
+  source_request_ids = [mesh.get("mesh_request_id") or None for mesh in meshes]
+  for mesh_idx, source_request_id in zip(meshes_to_resolve, resolved):
+    source_request_ids[mesh_idx] = source_request_id
+
+  submitted_at = {}
+  def submit_job(job):
+    raise_if_cancelled()
+    with observe_phase("optimize", "submit"):
+      optimize_resp = submit_optimize(source_request_ids[job["mesh_idx"]], job["target_ratio"], job["output_format"], object_type)
+    submitted_at[optimize_resp.request_id] = time.monotonic()
+    if journal is not None:
+      journal.record_submitted("optimize", job["fingerprint"], optimize_resp.request_id)
+    return optimize_resp.request_id
+
+  jobs_to_submit = [job for job in jobs if job["request_id"] is None]
+  submitted = Parallel(backend="threading", n_jobs=num_processes)(delayed(submit_job)(job) for job in jobs_to_submit)
+  for job, request_id in zip(jobs_to_submit, submitted):
+    job["request_id"] = request_id
+  # jobs for identical meshes can re-attach to the same request, which is only polled (and reported as done) once
+  job_request_ids = list(dict.fromkeys(job["request_id"] for job in jobs))
+  IN_FLIGHT.inc(len(job_request_ids), endpoint="optimize")
+  print(f">> submitted {len(jobs_to_submit)} optimize jobs and re-attached to {len(jobs) - len(jobs_to_submit)} for {len(meshes)} meshes")
+
+  n_done = 0
+  def job_done(request_id, status_resp):
+    nonlocal n_done
+    n_done += 1
+    IN_FLIGHT.dec(endpoint="optimize")
+    count_request("optimize", status_resp.status)
+    if status_resp.status == "complete" and request_id in submitted_at:
+      observe_server_time("optimize", time.monotonic() - submitted_at[request_id], status_resp)
+    if journal is not None:
+      journal.record_finished(request_id, status_resp.status)
+    if on_job_done is not None:
+      on_job_done(n_done, len(job_request_ids))
+
+  try:
+    statuses = get_status_many(job_request_ids, on_done=job_done)
+  finally:
+    IN_FLIGHT.dec(len(job_request_ids) - n_done, endpoint="optimize")
+
+  manifests = []
+  for mesh, source_request_id in zip(meshes, source_request_ids):
+    manifests.append({
+      "source_url": mesh.get("mesh_url"),
+      "source_request_id": source_request_id,
+      "lods": [{ "lod": lod_idx, "target_ratio": r, "model_urls": {}, "request_ids": {}, "failed": [] } for lod_idx, r in enumerate(target_ratios)]
+    })
+
+  for job in jobs:
+    lod = manifests[job["mesh_idx"]]["lods"][job["lod_idx"]]
+    lod["request_ids"][job["output_format"]] = job["request_id"]
+    status_resp = statuses[job["request_id"]]
+    if status_resp.status == "complete":
+      lod["model_urls"][job["output_format"]] = status_resp.output_url
+    else:
+      print(f"optimize request {job['request_id']} (mesh {job['mesh_idx']}, LOD{job['lod_idx']}, {job['output_format']}) failed with status: {status_resp.status}")
+      lod["failed"].append(job["output_format"])
+
+  return manifests
+
 def upload_glb(glb_url: str):
+  raise_if_cancelled()
   mpx_client = get_client()
   print(f">> uploading glb file to mpx: {glb_url}")
   print(f">> getting asset ID for the glb file")
   # create asset ID for the glb file
-  asset_resp = mpx_client.assets.create(
-      description="User uploaded glb.",
-      name=f"model.glb",
-      type="model/glb",
-  )
+  with span("assets.create"):
+    asset_resp = mpx_client.assets.create(
+        description="User uploaded glb.",
+        name=f"model.glb",
+        type="model/glb",
+    )
   print(f">> asset_resp: {asset_resp}")
-  print(f">> downloading the glb file")
-  # download the glb file
-  glb_resp = requests.get(glb_url)
-  glb_byte_arr = BytesIO(glb_resp.content)
-  glb_byte_arr.seek(0)
-  glb_byte_arr = glb_byte_arr.getvalue()
+  print(f">> relaying the glb file")
   headers = {
       'Content-Type': 'model/glb',  # Usually not needed with `files`
   }
-  print(f"Uploading glb file to: {asset_resp.asset_url}")
-  # actually upload the glb file
-  # TODO: do error handling here for upload_response.status_code
-  upload_response = requests.put(asset_resp.asset_url, data=glb_byte_arr, headers=headers)
-  print(f">> upload_response: {upload_response}")
+  # stream the glb file straight from the source into the asset upload
+  with http_get(glb_url, stream=True) as glb_resp:
+    glb_resp.raise_for_status()
+    relay = GLBStreamingRelay(glb_resp)
+    print(f"Uploading glb file to: {asset_resp.asset_url}")
+    upload_response = http_put(asset_resp.asset_url, relay.body(), headers=headers)
+  print(f">> upload_response: {upload_response} ({relay.bytes_relayed} bytes)")
+  # the relay passes every downloaded byte straight on to the upload
+  count_bytes("download", relay.bytes_relayed)
+  count_bytes("upload", relay.bytes_relayed)
+
+  if not upload_response.ok:
+    raise ValueError(f'glb upload failed with status code: {upload_response.status_code}')
+  relay.check_complete()
 
-  return asset_resp.request_id   
\ No newline at end of file
+  return asset_resp.request_id
@@ -1,19 +1,35 @@
 from ..sdk_client import get_client 
 from ..get_status import get_status 
+from ..job_journal import run_journaled_job
+from ..single_flight import run_single_flight
+from ..shared_cache import run_shared
 
 def component_text_to_image(prompt, num_images, seed, lora_scale, lora_weights):
     client = get_client()
-    images_from_text = client.components.text2image(
-        prompt=prompt,
-        num_images=num_images,
-        num_steps= 4,
-        seed=seed,
-        lora_scale= lora_scale,
-        lora_weights= lora_weights
-    )
-    print(images_from_text)
-    images_from_text_resp = get_status(images_from_text.request_id)
+
+    def submit():
+        images_from_text = client.components.text2image(
+            prompt=prompt,
+            num_images=num_images,
+            num_steps= 4,
+            seed=seed,
+            lora_scale= lora_scale,
+            lora_weights= lora_weights
+        )
+        print(images_from_text)
+        return images_from_text.request_id
+
+    # re-attach to an earlier job with the same inputs if there is one,
+    # or wait for the identical job another thread or worker is running right now
+    inputs = { "prompt": prompt, "num_images": num_images, "num_steps": 4, "seed": seed, "lora_scale": lora_scale, "lora_weights": lora_weights }
+    request_id, images_from_text_resp = run_single_flight("text2image", inputs, lambda: run_shared(
+        "text2image",
+        inputs,
+        lambda: run_journaled_job("text2image", inputs, submit),
+        # other workers fetch the outputs of the finished job themselves
+        to_cached=lambda result: result[0] if result[1].status == "complete" else None,
+        from_cached=lambda request_id: (request_id, get_status(request_id))
+    ))
     print(f"images_from_text_resp: {images_from_text_resp}")
     image_list = images_from_text_resp.outputs.images
-    return (image_list, images_from_text.request_id)
-
+    return (image_list, request_id)
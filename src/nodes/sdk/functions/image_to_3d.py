@@ -1,6 +1,5 @@
 import os
 from io import BytesIO
-import requests
 from urllib.parse import urlparse
 
 import torch
@@ -8,8 +7,12 @@ from PIL import Image
 
 from ..sdk_client import get_client 
 from ..get_status import get_status 
+from ..job_journal import run_journaled_job
 
 from ..utils.image_helpers import convert_from_torch_to_PIL
+from ..utils.provenance import lookup_image_source, hash_image_content
+from ..utils.http_helpers import http_put
+from ..tracing import span
 
 
 def function_image_to_3d(image: Image.Image | torch.Tensor | str, 
@@ -23,10 +26,19 @@ def function_image_to_3d(image: Image.Image | torch.Tensor | str,
             1) a single PIL image which will be uploaded to the MPX servers for processing
             2) a filepath to an image which will be loaded from disk and then turned into a single PIL in which (1) will then apply
             3) a url which can then be passed to the function directly
+
+        PIL images and tensors that are pixel-identical to an image downloaded from MPX storage are passed by URL
+        instead of being re-encoded and uploaded again.
     """
 
     image_data = None
 
+    if isinstance(image, (Image.Image, torch.Tensor)):
+        image_source = lookup_image_source(image)
+        if image_source is not None:
+            print(f"[mpx_sdk] imageto3d: re-using the existing image at {image_source['url']}")
+            return _function_imageto3d__image_url(image_source["url"], seed, texture_size)
+
     if isinstance(image, Image.Image):
         image_data = image
 
@@ -73,39 +85,47 @@ def _function_imageto3d__PIL_image(image: Image.Image,
         Upload the given image and run the imageto3d function.
     """
     mpx_client = get_client()
-    
-    image_upload_headers = {
-        'Authorization': f'Bearer {os.environ.get("MPX_SDK_BEARER_TOKEN")}',
-        'Content-Type': 'image/png',
-    }
-
-    # create asset ID for the image
-    asset_resp = mpx_client.assets.create(
-        description=image_description,
-        name=f"image.png",
-        type="image/png",
-    )
 
-    # convert the PIL image object into a standard PNG byte array to upload
-    img_byte_arr = BytesIO()
-    image.save(img_byte_arr, format='PNG')
-    img_byte_arr.seek(0)
-    img_byte_arr = img_byte_arr.getvalue()
-
-    # actually upload the image
-    # TODO: do error handling here for upload_response.status_code
-    upload_response = requests.put(asset_resp.asset_url, data=img_byte_arr, headers=image_upload_headers)
-
-    # call imageto3d endpoint with the image asset ID
-    imageto3d_resp = mpx_client.functions.imageto3d(
-        image_request_id = asset_resp.request_id,
-        seed=seed,
-        texture_size=texture_size
+    def upload_and_submit():
+        image_upload_headers = {
+            'Authorization': f'Bearer {os.environ.get("MPX_SDK_BEARER_TOKEN")}',
+            'Content-Type': 'image/png',
+        }
+
+        # create asset ID for the image
+        with span("assets.create"):
+            asset_resp = mpx_client.assets.create(
+                description=image_description,
+                name=f"image.png",
+                type="image/png",
+            )
+
+        # convert the PIL image object into a standard PNG byte array to upload
+        with span("png_encode", category="cpu"):
+            img_byte_arr = BytesIO()
+            image.save(img_byte_arr, format='PNG')
+            img_byte_arr.seek(0)
+            img_byte_arr = img_byte_arr.getvalue()
+
+        # actually upload the image
+        # TODO: do error handling here for upload_response.status_code
+        upload_response = http_put(asset_resp.asset_url, img_byte_arr, headers=image_upload_headers)
+
+        # call imageto3d endpoint with the image asset ID
+        imageto3d_resp = mpx_client.functions.imageto3d(
+            image_request_id = asset_resp.request_id,
+            seed=seed,
+            texture_size=texture_size
+        )
+        print(f'[mpx_sdk] imageto3d.request_id: {imageto3d_resp.request_id}')
+        return imageto3d_resp.request_id
+
+    # wait for the endpoint to complete, re-attaching to an earlier job for the same image if there is one
+    imageto3d_request_id, endpoint_response = run_journaled_job(
+        "imageto3d",
+        { "image_hash": hash_image_content(image), "seed": seed, "texture_size": texture_size },
+        upload_and_submit
     )
-    print(f'[mpx_sdk] imageto3d.request_id: {imageto3d_resp.request_id}')
-
-    # wait for the endpoint to complete
-    endpoint_response = get_status(imageto3d_resp.request_id)
 
     print(f'[mpx_sdk] imageto3d.status_response: {endpoint_response}')
 
@@ -118,7 +138,7 @@ def _function_imageto3d__PIL_image(image: Image.Image,
     ret_data["fbx_url"] = endpoint_response.outputs.fbx
     ret_data["usdz_url"] = endpoint_response.outputs.usdz
     ret_data["thumbnail_url"] = endpoint_response.outputs.thumbnail
-    ret_data["request_id"] = imageto3d_resp.request_id
+    ret_data["request_id"] = imageto3d_request_id
     return ret_data
 
 
@@ -130,25 +150,36 @@ def _function_imageto3d__image_url(image_url: str,
     """
     mpx_client = get_client()
 
-    # use request_id as image source
-    imageto3d_resp = mpx_client.functions.imageto3d(
-        image_url=image_url,
-        seed=seed,
-        texture_size=texture_size,
+    def submit():
+        # use request_id as image source
+        imageto3d_resp = mpx_client.functions.imageto3d(
+            image_url=image_url,
+            seed=seed,
+            texture_size=texture_size,
+        )
+        print(imageto3d_resp)
+        print(f'mesh genrequest_id: {imageto3d_resp.request_id}')
+        return imageto3d_resp.request_id
+
+    # wait for the request to complete, re-attaching to an earlier job for the same image if there is one
+    imageto3d_request_id, imageto3d_response = run_journaled_job(
+        "imageto3d",
+        { "image_url": image_url, "seed": seed, "texture_size": texture_size },
+        submit
     )
-    print(imageto3d_resp)
-    imageto3d_request_id = imageto3d_resp.request_id
-    print(f'mesh genrequest_id: {imageto3d_request_id}')
-
-    # wait for the request to complete
-    imageto3d_response = get_status(imageto3d_request_id)
     print(f'status_response: {imageto3d_response}')
 
     if imageto3d_response.status != 'complete':
         raise ValueError(f'imageto3d request failed with status: {imageto3d_response.status}')
   
-    # Retrieve the generated 3D object urls
-
+    # return a dict with the URLs and the request_id
+    ret_data = {}
+    ret_data["glb_url"] = imageto3d_response.outputs.glb
+    ret_data["fbx_url"] = imageto3d_response.outputs.fbx
+    ret_data["usdz_url"] = imageto3d_response.outputs.usdz
+    ret_data["thumbnail_url"] = imageto3d_response.outputs.thumbnail
+    ret_data["request_id"] = imageto3d_request_id
+    return ret_data
 
 
 def __is_valid_url(url: str) -> bool:
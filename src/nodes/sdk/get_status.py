@@ -1,18 +1,69 @@
-import time
+import os
 from .sdk_client import get_client
+from .tracing import span
+from .cancellation import cancellable_sleep, raise_if_cancelled, cancel_server_jobs, OperationCancelled
+
+POLL_INTERVAL_S = float(os.getenv("MPX_POLL_INTERVAL_S", 10))
 
 def get_status(request_id):
     mpx_client = get_client()
     if not mpx_client:
         return None
 
-    status_resp = mpx_client.status.retrieve(request_id)
+    raise_if_cancelled()
+    with span("status.retrieve", category="poll", request_id=request_id):
+        status_resp = mpx_client.status.retrieve(request_id)
     print(status_resp)
     # Wait until the object has been generated (status = 'complete')
     while status_resp.status not in ["complete", "failed"]:
-        time.sleep(10)
-        status_resp = mpx_client.status.retrieve(request_id)
+        try:
+            with span("poll_wait", category="sleep"):
+                cancellable_sleep(POLL_INTERVAL_S)
+        except OperationCancelled:
+            cancel_server_jobs([request_id])
+            raise
+        with span("status.retrieve", category="poll", request_id=request_id):
+            status_resp = mpx_client.status.retrieve(request_id)
         print ('*', end='')
     print('') # clears waiting indicators
     print(status_resp)
     return status_resp
+
+def get_status_many(request_ids, on_done=None):
+    """
+        Wait for several requests in a single polling loop instead of one sleeping loop per request.
+        on_done(request_id, status_resp) is called once for every request as soon as it completes or fails.
+        Returns a dict of request_id -> final status response.
+    """
+    mpx_client = get_client()
+    if not mpx_client:
+        # unlike get_status() there is no single status to hand back, callers index the result by request id
+        raise RuntimeError("No MPX client - MPX_SDK_BEARER_TOKEN is not set, please set it in the ComfyUI Settings")
+
+    raise_if_cancelled()
+    pending = list(dict.fromkeys(request_ids))
+    finished = {}
+    while True:
+        still_pending = []
+        for request_id in pending:
+            with span("status.retrieve", category="poll", request_id=request_id):
+                status_resp = mpx_client.status.retrieve(request_id)
+            if status_resp.status in ["complete", "failed"]:
+                finished[request_id] = status_resp
+                if on_done is not None:
+                    on_done(request_id, status_resp)
+            else:
+                still_pending.append(request_id)
+        pending = still_pending
+
+        if len(pending) == 0:
+            break
+        try:
+            with span("poll_wait", category="sleep"):
+                cancellable_sleep(POLL_INTERVAL_S)
+        except OperationCancelled:
+            cancel_server_jobs(pending)
+            raise
+        print ('*', end='')
+    print('') # clears waiting indicators
+    return finished
@@ -0,0 +1,179 @@
+import os
+import time
+import threading
+from collections import deque
+
+from .sdk_client import get_client
+from .get_status import POLL_INTERVAL_S
+from .tracing import span
+from .metrics import observe_phase, observe_server_time, count_request, IN_FLIGHT
+from .cancellation import cancellable_sleep, raise_if_cancelled, cancel_server_jobs, OperationCancelled
+
+# Opt-in request hedging: a job that runs longer than its endpoint's latency percentile gets one duplicate,
+# the first to finish wins and the other is cancelled. Off unless MPX_HEDGE_ENABLED=1, and only for HEDGED_ENDPOINTS.
+
+LATENCY_WINDOW = 500
+HEDGED_POLL_INTERVAL_S = 1.0 # once a job is hedged the first one to finish should be noticed quickly
+# endpoints whose submit() is cheap to repeat, a duplicate imageto3d or optimize job would upload its input again
+HEDGED_ENDPOINTS = ("text2image", "llms.call", "llms.image_query")
+
+
+class HedgingPolicy():
+    def __init__(self, enabled=False, percentile=95.0, budget_ratio=0.1, min_samples=20, endpoints=HEDGED_ENDPOINTS):
+        self.enabled = enabled
+        self.endpoints = tuple(endpoints)
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.min_samples = min_samples
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            enabled=os.getenv("MPX_HEDGE_ENABLED", "0") == "1",
+            percentile=float(os.getenv("MPX_HEDGE_PERCENTILE", 95)),
+            budget_ratio=float(os.getenv("MPX_HEDGE_BUDGET_RATIO", 0.1)),
+            min_samples=int(os.getenv("MPX_HEDGE_MIN_SAMPLES", 20)),
+        )
+
+
+class EndpointLatencyTracker():
+    """
+        Rolling window of observed job latencies (submit to complete, in seconds) plus hedging counters for one endpoint.
+    """
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.n_requests = 0
+        self.n_hedges = 0
+        self.n_hedge_wins = 0
+
+    def record_latency(self, latency_s: float):
+        with self._lock:
+            self._latencies.append(latency_s)
+
+    def percentile(self, p: float) -> float | None:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) == 0:
+            return None
+        k = min(len(latencies) - 1, max(0, int(round(p / 100.0 * (len(latencies) - 1)))))
+        return latencies[k]
+
+    def n_samples(self) -> int:
+        with self._lock:
+            return len(self._latencies)
+
+    def try_reserve_hedge(self, budget_ratio: float) -> bool:
+        with self._lock:
+            if self.n_hedges + 1 > budget_ratio * self.n_requests:
+                return False
+            self.n_hedges += 1
+            return True
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.n_requests,
+            "hedges": self.n_hedges,
+            "hedge_wins": self.n_hedge_wins,
+            "samples": self.n_samples(),
+            "p50_s": self.percentile(50),
+            "p95_s": self.percentile(95),
+            "p99_s": self.percentile(99),
+        }
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(endpoint: str) -> EndpointLatencyTracker:
+    with _trackers_lock:
+        if endpoint not in _trackers:
+            _trackers[endpoint] = EndpointLatencyTracker()
+        return _trackers[endpoint]
+
+
+def get_hedging_stats() -> dict:
+    with _trackers_lock:
+        endpoints = list(_trackers.items())
+    return { endpoint: tracker.stats() for endpoint, tracker in endpoints }
+
+
+def run_hedged(endpoint: str, submit, on_submitted=None, policy: HedgingPolicy = None) -> tuple:
+    """
+        Submit a job through submit() (which returns the request_id) and wait for it, submitting one duplicate
+        if the job runs longer than the endpoint's latency percentile and the hedging budget allows it.
+        on_submitted(request_id) is called for every submitted request before it is polled.
+        Returns (request_id, final status response) of the request that finished first.
+    """
+    if policy is None:
+        policy = HedgingPolicy.from_env()
+    may_hedge = policy.enabled and endpoint in policy.endpoints
+    tracker = get_latency_tracker(endpoint)
+    mpx_client = get_client()
+
+    with tracker._lock:
+        tracker.n_requests += 1
+
+    def submit_one():
+        raise_if_cancelled()
+        with observe_phase(endpoint, "submit"):
+            request_id = submit()
+        IN_FLIGHT.inc(endpoint=endpoint)
+        if on_submitted is not None:
+            on_submitted(request_id)
+        return request_id
+
+    def finish(request_id, status_resp):
+        count_request(endpoint, status_resp.status)
+        if status_resp.status == "complete":
+            observe_server_time(endpoint, time.monotonic() - submitted_at[request_id], status_resp)
+        return request_id, status_resp
+
+    primary_id = submit_one()
+    submitted_at = { primary_id: time.monotonic() }
+    outstanding = [primary_id]
+    hedged = False
+    last_failure = None
+
+    try:
+        while True:
+            for request_id in list(outstanding):
+                with span("status.retrieve", category="poll", endpoint=endpoint, request_id=request_id):
+                    status_resp = mpx_client.status.retrieve(request_id)
+                if status_resp.status == "complete":
+                    tracker.record_latency(time.monotonic() - submitted_at[request_id])
+                    if request_id != primary_id:
+                        with tracker._lock:
+                            tracker.n_hedge_wins += 1
+                        print(f"[mpx_sdk] {endpoint}: hedged request {request_id} beat {primary_id}")
+                    # the duplicate that lost would otherwise keep running (and be billed) for nothing
+                    cancel_server_jobs([r for r in outstanding if r != request_id])
+                    return finish(request_id, status_resp)
+                elif status_resp.status == "failed":
+                    outstanding.remove(request_id)
+                    IN_FLIGHT.dec(endpoint=endpoint)
+                    last_failure = (request_id, status_resp)
+
+            if len(outstanding) == 0:
+                return finish(*last_failure)
+
+            if may_hedge and not hedged and tracker.n_samples() >= policy.min_samples:
+                threshold = tracker.percentile(policy.percentile)
+                if time.monotonic() - submitted_at[primary_id] > threshold and tracker.try_reserve_hedge(policy.budget_ratio):
+                    hedged = True
+                    hedge_id = submit_one()
+                    submitted_at[hedge_id] = time.monotonic()
+                    outstanding.append(hedge_id)
+                    print(f"[mpx_sdk] {endpoint}: {primary_id} is slower than p{policy.percentile:g} ({threshold:.1f}s), hedging with {hedge_id}")
+
+            try:
+                with span("poll_wait", category="sleep", endpoint=endpoint):
+                    cancellable_sleep(HEDGED_POLL_INTERVAL_S if hedged else POLL_INTERVAL_S)
+            except OperationCancelled:
+                cancel_server_jobs(outstanding)
+                raise
+            print ('*', end='')
+    finally:
+        # whatever is still outstanding (the winner, abandoned hedges or cancelled jobs) is no longer waited on
+        IN_FLIGHT.dec(len(outstanding), endpoint=endpoint)
@@ -0,0 +1,128 @@
+import os
+import time
+import json
+import hashlib
+import sqlite3
+import threading
+
+from .sdk_client import get_user_data_path
+from .get_status import get_status
+from .hedging import run_hedged
+from .metrics import count_cache_lookup
+from .cancellation import OperationCancelled
+
+# Durable record of submitted MPX jobs so that a restart, crash or interrupt doesn't throw away paid, in-progress work.
+# Every job is recorded with a fingerprint of its inputs before polling starts. Running the same job again
+# re-attaches to the recorded request (or fetches its finished outputs) instead of submitting a new one.
+
+JOURNAL_FILENAME = "job_journal.sqlite3"
+JOURNAL_MAX_AGE_S = 7 * 24 * 60 * 60 # outputs on the MPX servers are not kept forever
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+class JobJournal():
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    request_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    submitted_at REAL NOT NULL,
+                    finished_at REAL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_fingerprint ON jobs (kind, fingerprint)")
+
+    def find_reusable(self, kind: str, fingerprint: str) -> str | None:
+        """
+            Return the request_id of the newest job with the same inputs that is still running or has completed.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT request_id FROM jobs WHERE kind = ? AND fingerprint = ? AND status != 'failed' AND submitted_at > ? ORDER BY submitted_at DESC LIMIT 1",
+                (kind, fingerprint, time.time() - JOURNAL_MAX_AGE_S)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_submitted(self, kind: str, fingerprint: str, request_id: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (request_id, kind, fingerprint, status, submitted_at) VALUES (?, ?, ?, 'submitted', ?)",
+                (request_id, kind, fingerprint, time.time())
+            )
+
+    def record_finished(self, request_id: str, status: str):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE request_id = ?", (status, time.time(), request_id))
+
+
+def get_job_journal() -> JobJournal | None:
+    """
+        Return the journal stored in the user directory, or None if it is disabled (MPX_JOB_JOURNAL=0) or can't be created.
+    """
+    global _journal
+    if os.getenv("MPX_JOB_JOURNAL", "1") == "0":
+        return None
+
+    with _journal_lock:
+        if _journal is None:
+            user_data_path = get_user_data_path()
+            if user_data_path is None:
+                return None
+            try:
+                _journal = JobJournal(os.path.join(user_data_path, JOURNAL_FILENAME))
+            except Exception as e:
+                print(f"mpx-comfyui-nodes: Unable to open the job journal: {e}")
+                return None
+        return _journal
+
+
+def fingerprint_job_inputs(kind: str, inputs: dict) -> str:
+    inputs_serialized = json.dumps({ "kind": kind, "inputs": inputs }, sort_keys=True)
+    return hashlib.sha256(inputs_serialized.encode('utf-8')).hexdigest()
+
+
+def run_journaled_job(kind: str, inputs: dict, submit) -> tuple:
+    """
+        Submit a job through submit() (which returns the request_id) and wait for it, unless a job with the same kind
+        and inputs is already in the journal, in which case that job is re-attached to instead.
+        Returns (request_id, final status response).
+    """
+    journal = get_job_journal()
+    fingerprint = fingerprint_job_inputs(kind, inputs)
+
+    if journal is not None:
+        request_id = journal.find_reusable(kind, fingerprint)
+        count_cache_lookup("job_journal", request_id is not None)
+        if request_id is not None:
+            print(f"[mpx_sdk] {kind}: re-attaching to journaled request {request_id}")
+            try:
+                status_resp = get_status(request_id)
+            except OperationCancelled:
+                # the journaled job is still good, a later run re-attaches to it
+                raise
+            except Exception as e:
+                print(f"[mpx_sdk] {kind}: unable to re-attach to {request_id}: {e}")
+                status_resp = None
+
+            if status_resp is not None and status_resp.status == "complete":
+                journal.record_finished(request_id, status_resp.status)
+                return request_id, status_resp
+            journal.record_finished(request_id, "failed")
+
+    def record_submitted(request_id):
+        if journal is not None:
+            journal.record_submitted(kind, fingerprint, request_id)
+
+    # hedged duplicates are journaled too, any of them can be re-attached to later
+    request_id, status_resp = run_hedged(kind, submit, on_submitted=record_submitted)
+    if journal is not None:
+        journal.record_finished(request_id, status_resp.status)
+    return request_id, status_resp
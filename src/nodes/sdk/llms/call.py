@@ -1,53 +1,102 @@
+import time
+
 from .constants import *
+from .routing import AUTO_MODEL, choose_model, record_model_call
 
 from ..sdk_client import get_client 
 from ..get_status import get_status 
+from ..hedging import run_hedged
+from ..metrics import count_retry
+from ..cancellation import OperationCancelled
+from ..single_flight import run_single_flight
+from ..shared_cache import run_shared, LLM_TTL_S
 
 def llm_call(sys_prompt: str,
              human_prompt: str,
              params: dict = None,
              extra_params: dict = None,
-             max_retry_attempts: int = 3):
-    
-    mpx_client = get_client()
-
+             max_retry_attempts: int = 3,
+             call_class: str = None,
+             is_valid=None):
+    """
+        A model set in extra_params["model"] is used for every attempt. Without one (or with "auto") the model is
+        picked per attempt by the router for the call class (see routing.py), so a retry goes to another model
+        when the previous one failed.
+        is_valid(output) tells whether the caller can use the output, outputs it rejects are not shared with the
+        other workers (a retry would get the same unusable output back).
+    """
     if params == None: params = {}
     if "temperature" not in params: params["temperature"] = DEFAULT_TEMPERATURE
     if "max_tokens" not in params: params["max_tokens"] = DEFAULT_MAX_TOKENS
 
-    if extra_params == None: extra_params = {}
-    if "model" not in params: params["model "] = DEFAULT_MODEL
+    extra_params = dict(extra_params) if extra_params is not None else {}
+    pinned_model = extra_params.get("model")
+    if pinned_model == AUTO_MODEL: pinned_model = None
+
+    # identical calls that are running at the same time share one request, unless sampling makes every answer different
+    if params["temperature"] != 0:
+        return _llm_call_with_retries(sys_prompt, human_prompt, params, extra_params, pinned_model, max_retry_attempts, call_class)
+    # and their results are shared with the other workers when a shared cache is configured
+    inputs = { "system_prompt": sys_prompt, "user_prompt": human_prompt, "params": params, "extra_params": extra_params, "call_class": call_class }
+    return run_single_flight("llms.call", inputs, lambda: run_shared(
+        "llms.call",
+        inputs,
+        lambda: _llm_call_with_retries(sys_prompt, human_prompt, params, extra_params, pinned_model, max_retry_attempts, call_class),
+        to_cached=lambda output: output if is_valid is None or is_valid(output) else None,
+        ttl_s=LLM_TTL_S
+    ))
+
+def _llm_call_with_retries(sys_prompt, human_prompt, params, extra_params, pinned_model, max_retry_attempts, call_class):
+    mpx_client = get_client()
+    failed_models = []
 
     call_success = False
     attempt = 1
     while (call_success == False) and (attempt <= max_retry_attempts):
+        model = pinned_model if pinned_model is not None else choose_model(call_class, exclude=failed_models)
+        extra_params["model"] = model
+        started_at = time.monotonic()
         try:
-            llm_request = mpx_client.llms.call(
-                user_prompt=human_prompt,
-                system_prompt=sys_prompt,
-                data_parms=params,
-                extra_body=extra_params
-            )
-            llm_response = get_status(llm_request.request_id)
+            def submit():
+                llm_request = mpx_client.llms.call(
+                    user_prompt=human_prompt,
+                    system_prompt=sys_prompt,
+                    data_parms=params,
+                    extra_body=extra_params
+                )
+                return llm_request.request_id
+
+            request_id, llm_response = run_hedged("llms.call", submit)
 
             if llm_response.status == "failed":
-                print("llm_call() returned with failed status - retrying...")
+                print(f"llm_call() returned with failed status from {model} - retrying...")
+                record_model_call(model, call_class, False)
+                failed_models.append(model)
+                count_retry("llm_call")
                 continue
 
             elif llm_response.status == "complete":
-                print("llm_call() - complete!")
+                record_model_call(model, call_class, True, time.monotonic() - started_at)
+                print(f"llm_call() - complete! ({model})")
                 print("Results:")
                 print(llm_response.outputs.output)
                 print()
                 call_success = True
                 return llm_response.outputs.output
             
+        except OperationCancelled:
+            raise
+
         except Exception as e:
-            print(f"llm_call() -- Error:\n{e}\nwhen trying to obtain a response - retrying...")
+            print(f"llm_call() -- Error:\n{e}\nwhen trying to obtain a response from {model} - retrying...")
+            record_model_call(model, call_class, False)
+            failed_models.append(model)
+            count_retry("llm_call")
             continue
 
         finally:
             attempt += 1
-            if attempt > max_retry_attempts:
-                raise Exception(f"llm_call() -- Failed to get a valid response after {max_retry_attempts} attempts!")
+
+    raise Exception(f"llm_call() -- Failed to get a valid response after {max_retry_attempts} attempts!")
+
 
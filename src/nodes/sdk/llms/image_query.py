@@ -1,54 +1,69 @@
 import os
-import requests
 from io import BytesIO
 
 from .constants import *
 
 from ..sdk_client import get_client 
 from ..get_status import get_status 
+from ..hedging import run_hedged
+from ..cancellation import raise_if_cancelled
+from ..utils.provenance import lookup_image_source
+from ..utils.http_helpers import http_put
+from ..tracing import span
+from ..single_flight import run_single_flight
+from ..shared_cache import run_shared, LLM_TTL_S
 
 def image_query(query, images, **kwargs):
     return_image_urls = kwargs.get("return_image_urls", False)
 
+    # upload all the given images 
+    input_image_urls = [upload_image(img) for img in images]
+
+    query_response = image_query_from_urls(query, input_image_urls, **kwargs)
+
+    if return_image_urls: 
+        return query_response, input_image_urls
+    
+    return query_response
+
+def upload_image(img):
+    """
+        Upload a single PIL image to the MPX servers and return its public URL so it can be re-used across queries.
+        Images that were downloaded unmodified from MPX storage are not uploaded again, their existing URL is returned.
+    """
+    image_source = lookup_image_source(img)
+    if image_source is not None:
+        return image_source["url"]
+
     mpx_client = get_client()
+    raise_if_cancelled()
 
     image_upload_headers = {
         'Authorization': f'Bearer {os.environ.get("MPX_SDK_BEARER_TOKEN")}',
         'Content-Type': 'image/png',
     }
 
-    # upload all the given images 
-    input_image_urls = []
-    for img in images:
-
-        # create asset ID for the image
+    # create asset ID for the image
+    with span("assets.create"):
         asset_id_response = mpx_client.assets.create(
             description="User uploaded image",
             name=f"image.png",
             type="image/png",
         )
 
-        # convert the PIL image object into a standard PNG byte array to upload
+    # convert the PIL image object into a standard PNG byte array to upload
+    with span("png_encode", category="cpu"):
         img_byte_arr = BytesIO()
         img.save(img_byte_arr, format='PNG')
         img_byte_arr.seek(0)
         img_byte_arr = img_byte_arr.getvalue()
 
-        # actually upload the image
-        # TODO: do error handling here for upload_response.status_code
-        upload_response = requests.put(asset_id_response.asset_url, data=img_byte_arr, headers=image_upload_headers)
-
-        # parse asset_url to obtain public url
-        asset_url = asset_id_response.asset_url.split("?")[0]
-        input_image_urls.append(asset_url)
-
+    # actually upload the image
+    # TODO: do error handling here for upload_response.status_code
+    upload_response = http_put(asset_id_response.asset_url, img_byte_arr, headers=image_upload_headers)
 
-    query_response = image_query_from_urls(query, input_image_urls, **kwargs)
-
-    if return_image_urls: 
-        return query_response, input_image_urls
-    
-    return query_response
+    # parse asset_url to obtain public url
+    return asset_id_response.asset_url.split("?")[0]
 
 def image_query_from_urls(query, images_urls, **kwargs):
     extra_params = {}
@@ -56,15 +71,34 @@ def image_query_from_urls(query, images_urls, **kwargs):
     extra_params["max_tokens"] = kwargs.get("max_tokens", DEFAULT_MAX_TOKENS)
 
     mpx_client = get_client()
-    image_query_request = mpx_client.llms.image_query(
-        user_prompt=query,
-        image_urls=images_urls,
-        extra_body=extra_params
-    )
-
-    print(image_query_request)
-    image_query_response = get_status(image_query_request.request_id)
-    print(image_query_response)
-
-    # TODO: do retry attempts if it status == failed
-    return image_query_response.outputs.output
+
+    def submit():
+        image_query_request = mpx_client.llms.image_query(
+            user_prompt=query,
+            image_urls=images_urls,
+            extra_body=extra_params
+        )
+        print(image_query_request)
+        return image_query_request.request_id
+
+    def run():
+        request_id, image_query_response = run_hedged("llms.image_query", submit)
+        print(image_query_response)
+
+        # TODO: do retry attempts if it status == failed
+        return image_query_response.outputs.output
+
+    # identical queries that are running at the same time share one request, unless sampling makes every answer different,
+    # and their results are shared with the other workers when a shared cache is configured
+    if extra_params["temperature"] != 0:
+        return run()
+    # outputs the caller can't use (see is_valid in llm_call()) are not shared with the other workers
+    is_valid = kwargs.get("is_valid")
+    inputs = { "user_prompt": query, "image_urls": list(images_urls), "extra_params": extra_params }
+    return run_single_flight("llms.image_query", inputs, lambda: run_shared(
+        "llms.image_query",
+        inputs,
+        run,
+        to_cached=lambda output: output if is_valid is None or is_valid(output) else None,
+        ttl_s=LLM_TTL_S
+    ))
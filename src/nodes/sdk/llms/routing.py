@@ -0,0 +1,153 @@
+import os
+import time
+import threading
+from collections import deque
+
+from .constants import DEFAULT_MODEL
+from ..metrics import LLM_MODEL_SECONDS, LLM_MODEL_CALLS
+
+# Model routing for llm_call(): callers describe their call class and get the cheapest model that is good enough
+# for it, where slow and failing models cost more. A model that keeps failing is skipped until its cooldown ends.
+# MPX_LLM_ROUTING=0 always uses the default model, MPX_LLM_FAILOVER_RATE and MPX_LLM_FAILOVER_COOLDOWN_S tune the failover.
+
+AUTO_MODEL = "auto" # model choice of the nodes that lets the router decide
+
+MODELS = {
+    # quality tier (higher is stronger), price relative to gpt-4o
+    "gpt-4o":      { "tier": 2, "relative_cost": 1.0 },
+    "gpt-4o-mini": { "tier": 1, "relative_cost": 0.06 },
+}
+
+CALL_CLASSES = {
+    # short JSON answers: checklists, yes/no decisions, tie-breaks
+    "checklist":  { "min_tier": 1, "latency_budget_s": 20.0 },
+    # rewriting or merging short texts
+    "transform":  { "min_tier": 1, "latency_budget_s": 30.0 },
+    # pulling lists of items out of longer texts
+    "extraction": { "min_tier": 2, "latency_budget_s": 60.0 },
+    # stories, script breakdowns and other long or demanding generations
+    "long_form":  { "min_tier": 2, "latency_budget_s": 180.0 },
+    # calls that don't say what they are get the default model's tier
+    "default":    { "min_tier": MODELS[DEFAULT_MODEL]["tier"], "latency_budget_s": 120.0 },
+}
+
+ROLLING_WINDOW = 50
+FAILOVER_MIN_CALLS = 4
+
+
+class ModelStats():
+    """
+        Rolling outcomes and latencies of the calls made to one model.
+    """
+    def __init__(self, window=ROLLING_WINDOW):
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)  # True for calls that completed
+        self._latencies = deque(maxlen=window) # seconds, of the calls that completed
+        self.n_calls = 0
+        self.n_failures = 0
+        self.n_failovers = 0
+        self.skipped_until = 0.0
+
+    def record(self, success: bool, latency_s: float = None):
+        failover_rate = float(os.getenv("MPX_LLM_FAILOVER_RATE", 0.5))
+        cooldown_s = float(os.getenv("MPX_LLM_FAILOVER_COOLDOWN_S", 60))
+        with self._lock:
+            self.n_calls += 1
+            self._outcomes.append(success)
+            if success:
+                self._latencies.append(latency_s)
+                self.skipped_until = 0.0
+                return
+            self.n_failures += 1
+            n_recent = len(self._outcomes)
+            if n_recent >= FAILOVER_MIN_CALLS and self._outcomes.count(False) / n_recent >= failover_rate:
+                if self.skipped_until <= time.monotonic():
+                    self.n_failovers += 1
+                self.skipped_until = time.monotonic() + cooldown_s
+
+    def is_available(self) -> bool:
+        with self._lock:
+            return self.skipped_until <= time.monotonic()
+
+    def failure_rate(self) -> float:
+        with self._lock:
+            if len(self._outcomes) == 0:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+    def percentile(self, p: float) -> float | None:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) == 0:
+            return None
+        k = min(len(latencies) - 1, max(0, int(round(p / 100.0 * (len(latencies) - 1)))))
+        return latencies[k]
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.n_calls,
+            "failures": self.n_failures,
+            "recent_failure_rate": self.failure_rate(),
+            "failovers": self.n_failovers,
+            "available": self.is_available(),
+            "p50_s": self.percentile(50),
+            "p95_s": self.percentile(95),
+        }
+
+
+_model_stats = {}
+_model_stats_lock = threading.Lock()
+
+
+def get_model_stats(model: str) -> ModelStats:
+    with _model_stats_lock:
+        if model not in _model_stats:
+            _model_stats[model] = ModelStats()
+        return _model_stats[model]
+
+
+def get_routing_stats() -> dict:
+    with _model_stats_lock:
+        models = list(_model_stats.items())
+    return { model: stats.stats() for model, stats in models }
+
+
+def is_routing_enabled() -> bool:
+    return os.getenv("MPX_LLM_ROUTING", "1") != "0"
+
+
+def _expected_cost(model: str, call_class: dict) -> float:
+    stats = get_model_stats(model)
+    cost = MODELS[model]["relative_cost"]
+    p50 = stats.percentile(50)
+    if p50 is not None and p50 > call_class["latency_budget_s"]:
+        cost *= p50 / call_class["latency_budget_s"]
+    # failed calls are paid for again by the retry
+    return cost / max(0.05, 1.0 - stats.failure_rate())
+
+
+def choose_model(call_class: str = None, exclude: list = ()) -> str:
+    """
+        The model to use for a call of the given class, leaving out the models in exclude (e.g. ones that just failed).
+    """
+    if not is_routing_enabled():
+        return DEFAULT_MODEL
+    route = CALL_CLASSES.get(call_class or "default", CALL_CLASSES["default"])
+
+    models = [m for m in MODELS if m not in exclude] or list(MODELS)
+    available = [m for m in models if get_model_stats(m).is_available()]
+    if not available:
+        # every model is failing, try the one that comes out of its cooldown first
+        return min(models, key=lambda m: get_model_stats(m).skipped_until)
+
+    # a weaker model is better than a model that is failing
+    good_enough = [m for m in available if MODELS[m]["tier"] >= route["min_tier"]] or available
+    return min(good_enough, key=lambda m: _expected_cost(m, route))
+
+
+def record_model_call(model: str, call_class: str, success: bool, latency_s: float = None):
+    # models pinned by the caller that the router doesn't know are tracked too, but never routed to
+    get_model_stats(model).record(success, latency_s)
+    LLM_MODEL_CALLS.inc(model=model, call_class=call_class or "default", status="complete" if success else "failed")
+    if success:
+        LLM_MODEL_SECONDS.observe(latency_s, model=model, call_class=call_class or "default")
@@ -0,0 +1,245 @@
+import time
+import math
+import threading
+from contextlib import contextmanager
+
+from .tracing import span, instant
+
+# In-process counters, gauges and latency histograms of the SDK layer, served at /mpx_metrics (see src/metrics_server.py).
+
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(label_names, label_values, extra=None) -> str:
+    pairs = list(zip(label_names, label_values))
+    if extra is not None:
+        pairs.append(extra)
+    if len(pairs) == 0:
+        return ""
+    return "{" + ",".join([f'{name}="{_escape_label_value(value)}"' for name, value in pairs]) + "}"
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric():
+    kind = None
+
+    def __init__(self, name: str, help_text: str, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render_prometheus(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            items = sorted(self._values.items())
+        return {
+            "type": self.kind,
+            "help": self.help_text,
+            "samples": [{ "labels": dict(zip(self.label_names, key)), "value": value } for key, value in items],
+        }
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = { "bucket_counts": [0] * len(self.buckets), "count": 0, "sum": 0.0 }
+                self._values[key] = series
+            for i, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    series["bucket_counts"][i] += 1
+                    break
+            series["count"] += 1
+            series["sum"] += value
+
+    def render_prometheus(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, dict(series, bucket_counts=list(series["bucket_counts"]))) for key, series in self._values.items())
+        for key, series in items:
+            cumulative = 0
+            for upper_bound, n in zip(self.buckets, series["bucket_counts"]):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, ('le', _format_value(upper_bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {series['count']}")
+        return lines
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            items = sorted((key, dict(series)) for key, series in self._values.items())
+        samples = []
+        for key, series in items:
+            samples.append({
+                "labels": dict(zip(self.label_names, key)),
+                "count": series["count"],
+                "sum": series["sum"],
+                "mean": series["sum"] / series["count"] if series["count"] else None,
+            })
+        return { "type": self.kind, "help": self.help_text, "buckets": [b for b in self.buckets if b != math.inf], "samples": samples }
+
+
+class MetricsRegistry():
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self.started_at = time.time()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                return self._metrics[metric.name]
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, label_names=()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names=()) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names=(), buckets=DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render_prometheus()
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.items())
+        return {
+            "uptime_s": time.time() - self.started_at,
+            "metrics": { name: metric.to_dict() for name, metric in metrics },
+        }
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter("mpx_requests_total", "MPX jobs that finished, by endpoint and final status.", ("endpoint", "status"))
+PHASE_SECONDS = registry.histogram("mpx_phase_seconds", "Time spent per phase of an MPX call: submit, server_queue, server_processing, upload, download.", ("endpoint", "phase"))
+RETRIES = registry.counter("mpx_retries_total", "Retried attempts, by operation.", ("operation",))
+CACHE_LOOKUPS = registry.counter("mpx_cache_lookups_total", "Cache lookups, by cache and result (hit or miss).", ("cache", "result"))
+IN_FLIGHT = registry.gauge("mpx_in_flight", "MPX jobs that have been submitted and are not finished yet, by endpoint.", ("endpoint",))
+BYTES = registry.counter("mpx_bytes_total", "Bytes transferred to and from MPX storage, by direction (upload or download).", ("direction",))
+SINGLE_FLIGHT = registry.counter("mpx_single_flight_total", "Requests by operation and role: leader (submitted), joined (waited for an identical request in flight in this process), joined_worker (waited for one running on another worker) or lease_lost (ran while another worker could take the request over).", ("operation", "role"))
+LLM_MODEL_CALLS = registry.counter("mpx_llm_model_calls_total", "LLM call attempts, by model, call class and status (complete or failed).", ("model", "call_class", "status"))
+LLM_MODEL_SECONDS = registry.histogram("mpx_llm_model_seconds", "Latency of the LLM calls that completed, by model and call class.", ("model", "call_class"))
+
+
+@contextmanager
+def observe_phase(endpoint: str, phase: str):
+    """
+        Time the body of the with-statement as one phase of an MPX call. The phase is traced as a span too.
+    """
+    started_at = time.perf_counter()
+    try:
+        with span(f"{endpoint}.{phase}", category=phase):
+            yield
+    finally:
+        PHASE_SECONDS.observe(time.perf_counter() - started_at, endpoint=endpoint, phase=phase)
+
+
+def observe_server_time(endpoint: str, elapsed_s: float, status_resp):
+    """
+        Split the time between submit and completion into server queueing and processing,
+        using the processing time reported by the status response when there is one.
+    """
+    processing_s = getattr(status_resp, "processing_time_s", None)
+    if isinstance(processing_s, (int, float)) and 0 <= processing_s <= elapsed_s:
+        PHASE_SECONDS.observe(processing_s, endpoint=endpoint, phase="server_processing")
+        PHASE_SECONDS.observe(elapsed_s - processing_s, endpoint=endpoint, phase="server_queue")
+    else:
+        PHASE_SECONDS.observe(elapsed_s, endpoint=endpoint, phase="server_processing")
+
+
+def count_request(endpoint: str, status: str):
+    REQUESTS.inc(endpoint=endpoint, status=status)
+
+
+def count_retry(operation: str):
+    RETRIES.inc(operation=operation)
+    instant("retry", operation=operation)
+
+
+def count_cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def count_single_flight(operation: str, role: str):
+    SINGLE_FLIGHT.inc(operation=operation, role=role)
+
+
+def count_bytes(direction: str, n_bytes: int):
+    BYTES.inc(n_bytes, direction=direction)
+
+
+def get_metrics_snapshot() -> dict:
+    # the hedging and routing modules keep their own rolling latency windows, report them next to the registry
+    from .hedging import get_hedging_stats
+    from .llms.routing import get_routing_stats
+    snapshot = registry.to_dict()
+    snapshot["hedging"] = get_hedging_stats()
+    snapshot["llm_models"] = get_routing_stats()
+    return snapshot
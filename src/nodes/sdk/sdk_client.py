@@ -2,9 +2,30 @@ from dotenv import load_dotenv
 import os
 from mpx_genai_sdk import Masterpiecex  
 
+from .cassette import get_cassette, get_cassette_http_client
+
+_mpx_client = None
+
 def get_client():
     return _mpx_client
 
+def set_client(mpx_client):
+    """
+    Replace the client used by the SDK layer, e.g. with the fake client in benchmarks/. Returns the previous client.
+    """
+    global _mpx_client
+    previous_client = _mpx_client
+    _mpx_client = mpx_client
+    return previous_client
+
+def get_user_data_path():
+    """
+    Directory of the user's mpx-comfyui-nodes configuration (where the .env file lives), or None if it can't be found.
+    """
+    if _user_env_path is None:
+        return None
+    return os.path.dirname(_user_env_path)
+
 def _get_user_env_path():
     # get the path to the user's mpx-comfyui-nodes configuration directory
     # this is the directory where the user's .env file is stored
@@ -36,10 +57,23 @@ def _get_user_env_path():
     return os.path.join(mpx_comfyui_nodes_path, ".env")
 
 
-load_dotenv(dotenv_path=_get_user_env_path())
+_user_env_path = _get_user_env_path()
+load_dotenv(dotenv_path=_user_env_path)
+
+def _create_client(bearer_token: str):
+    # when recording or replaying MPX traffic all requests go through the cassette
+    http_client = get_cassette_http_client()
+    if http_client is not None:
+        return Masterpiecex(bearer_token = bearer_token, http_client = http_client)
+    return Masterpiecex(bearer_token = bearer_token)
 
 bearer_token = os.getenv("MPX_SDK_BEARER_TOKEN")
-if not bearer_token:
+_cassette = get_cassette()
+if _cassette is not None and _cassette.mode == "replay":
+    # replay never talks to the MPX servers so no token is needed
+    print(f"mpx-comfyui-nodes: Replaying MPX traffic from {_cassette.path}")
+    _mpx_client = _create_client(bearer_token or "replay")
+elif not bearer_token:
     # raise ValueError("MPX_SDK_BEARER_TOKEN is not set - please set it in the .env file ")
     # Print a warning instead of raising an exception to avoid breaking the entire node
     print("-" * 80)
@@ -52,7 +86,7 @@ elif bearer_token == "<your_bearer_token_here>":
 else:
     print("mpx-comfyui-nodes: Got MPX SDK Bearer Token")
     try:
-        _mpx_client = Masterpiecex(bearer_token = bearer_token)
+        _mpx_client = _create_client(bearer_token)
         print(f"mpx-comfyui-nodes: MPX Connection test result: {_mpx_client.connection_test.retrieve()}")
     except Exception as e:
         print("-" * 150)
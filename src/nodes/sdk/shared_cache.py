@@ -0,0 +1,315 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from urllib.parse import quote
+
+import requests
+
+from .sdk_client import get_user_data_path
+from .metrics import count_cache_lookup, count_single_flight
+from .cancellation import cancellable_sleep
+from .single_flight import request_key
+
+# Results and in-flight work shared between ComfyUI processes through MPX_SHARED_CACHE (sqlite, sqlite:<path> or
+# the URL of a shared cache server). A worker claims a request before running it and renews the claim while it
+# runs, the other workers wait for its stored result. Results have to be JSON serializable.
+
+SHARED_CACHE_FILENAME = "shared_cache.sqlite3"
+DEFAULT_TTL_S = 7 * 24 * 60 * 60 # outputs on the MPX servers are not kept forever
+LLM_TTL_S = 60 * 60              # answers to the same prompt can change when the models are updated
+DEFAULT_LEASE_S = 60.0
+WAIT_INTERVAL_S = 0.5
+
+# identifies this process in claims
+_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_shared_cache = None
+_shared_cache_config = None
+_shared_cache_lock = threading.Lock()
+
+
+class SharedCacheBackend(ABC):
+    """
+        Storage for results and claims, keyed by namespace (e.g. the endpoint) and key (a fingerprint of the request).
+    """
+    @abstractmethod
+    def get(self, namespace: str, key: str):
+        """
+            The stored value, or None if there is none (or it expired).
+        """
+
+    @abstractmethod
+    def put(self, namespace: str, key: str, value, ttl_s: float):
+        """
+            Store value (JSON serializable) for ttl_s seconds.
+        """
+
+    @abstractmethod
+    def claim(self, namespace: str, key: str, owner: str, lease_s: float) -> bool:
+        """
+            Claim the request for owner for lease_s seconds. Succeeds when it isn't claimed, when the claim expired
+            or when owner already holds it (which renews the lease).
+        """
+
+    @abstractmethod
+    def release(self, namespace: str, key: str, owner: str):
+        """
+            Drop the claim if owner holds it.
+        """
+
+
+class SQLiteSharedCache(SharedCacheBackend):
+    """
+        Backend for the processes on one host. SQLite's file locks make claims atomic across processes.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # transactions are started explicitly
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS claims (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+
+    def get(self, namespace: str, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM results WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, namespace: str, key: str, value, ttl_s: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), time.time() + ttl_s)
+            )
+
+    def claim(self, namespace: str, key: str, owner: str, lease_s: float) -> bool:
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the database's write lock, so checking and taking the claim can't interleave with another process
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT owner, expires_at FROM claims WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+                claimed = row is None or row[0] == owner or row[1] <= now
+                if claimed:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO claims (namespace, key, owner, expires_at) VALUES (?, ?, ?, ?)",
+                        (namespace, key, owner, now + lease_s)
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def release(self, namespace: str, key: str, owner: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM claims WHERE namespace = ? AND key = ? AND owner = ?", (namespace, key, owner))
+
+
+class HTTPSharedCache(SharedCacheBackend):
+    """
+        Backend for workers on several hosts, talking to a shared cache server:
+            GET    {base_url}/results/{namespace}/{key}              200 {"value": ...} or 404
+            PUT    {base_url}/results/{namespace}/{key}              {"value": ..., "ttl_s": ...}
+            POST   {base_url}/claims/{namespace}/{key}               {"owner": ..., "lease_s": ...} -> 200 {"claimed": true|false}
+            DELETE {base_url}/claims/{namespace}/{key}?owner=...
+        Leases are timed by the server's clock.
+    """
+    def __init__(self, base_url: str, token: str = None, timeout_s: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_s
+        self._session = requests.Session()
+        if token:
+            self._session.headers["Authorization"] = f"Bearer {token}"
+
+    def _url(self, kind: str, namespace: str, key: str) -> str:
+        return f"{self.base_url}/{kind}/{quote(namespace, safe='')}/{quote(key, safe='')}"
+
+    def get(self, namespace: str, key: str):
+        response = self._session.get(self._url("results", namespace, key), timeout=self.timeout_s)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()["value"]
+
+    def put(self, namespace: str, key: str, value, ttl_s: float):
+        response = self._session.put(self._url("results", namespace, key), json={ "value": value, "ttl_s": ttl_s }, timeout=self.timeout_s)
+        response.raise_for_status()
+
+    def claim(self, namespace: str, key: str, owner: str, lease_s: float) -> bool:
+        response = self._session.post(self._url("claims", namespace, key), json={ "owner": owner, "lease_s": lease_s }, timeout=self.timeout_s)
+        response.raise_for_status()
+        return bool(response.json()["claimed"])
+
+    def release(self, namespace: str, key: str, owner: str):
+        response = self._session.delete(self._url("claims", namespace, key), params={ "owner": owner }, timeout=self.timeout_s)
+        response.raise_for_status()
+
+
+def _open_shared_cache(config: str) -> SharedCacheBackend | None:
+    if config.startswith("http://") or config.startswith("https://"):
+        return HTTPSharedCache(config, token=os.getenv("MPX_SHARED_CACHE_TOKEN"))
+
+    if config == "sqlite":
+        user_data_path = get_user_data_path()
+        if user_data_path is None:
+            return None
+        return SQLiteSharedCache(os.path.join(user_data_path, SHARED_CACHE_FILENAME))
+    if config.startswith("sqlite:"):
+        return SQLiteSharedCache(config[len("sqlite:"):])
+
+    print(f"mpx-comfyui-nodes: Unknown MPX_SHARED_CACHE value '{config}', results are not shared between processes")
+    return None
+
+
+def get_shared_cache() -> SharedCacheBackend | None:
+    """
+        Return the backend configured with MPX_SHARED_CACHE, or None if there is none or it can't be opened.
+    """
+    global _shared_cache, _shared_cache_config
+    config = os.getenv("MPX_SHARED_CACHE", "")
+    if config == "":
+        return None
+
+    with _shared_cache_lock:
+        if config != _shared_cache_config:
+            _shared_cache_config = config
+            try:
+                _shared_cache = _open_shared_cache(config)
+            except Exception as e:
+                print(f"mpx-comfyui-nodes: Unable to open the shared cache: {e}")
+                _shared_cache = None
+        return _shared_cache
+
+
+class _LeaseKeeper():
+    """
+        Renews a claim in the background while the request it covers is running. lost is set when the claim could
+        not be renewed before it expired, another worker may have taken the request over since.
+    """
+    def __init__(self, backend: SharedCacheBackend, namespace: str, key: str, lease_s: float):
+        self._backend = backend
+        self._namespace = namespace
+        self._key = key
+        self._lease_s = lease_s
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mpx-shared-cache-lease", daemon=True)
+        self.lost = False
+
+    def _run(self):
+        renewed_at = time.monotonic()
+        while not self._stopped.wait(self._lease_s / 3):
+            try:
+                claimed = self._backend.claim(self._namespace, self._key, _OWNER, self._lease_s)
+            except Exception as e:
+                print(f"[mpx_sdk] shared cache: unable to renew the claim on {self._namespace}: {e}")
+                claimed = time.monotonic() - renewed_at < self._lease_s
+            if not claimed:
+                self.lost = True
+                print(f"[mpx_sdk] shared cache: the claim on {self._namespace} expired while the request was running, another worker may run it too")
+                return
+            renewed_at = time.monotonic()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+
+def run_shared(operation: str, inputs: dict, fn, to_cached=None, from_cached=None, ttl_s: float = None):
+    """
+        Return the stored result of the request with the given inputs, wait for the worker that is running it, or run
+        fn() and store its result for the other workers.
+        to_cached / from_cached convert between fn()'s result and the JSON serializable value that is stored,
+        results that to_cached turns into None (e.g. failed jobs) are not stored.
+        Results are kept for ttl_s seconds, MPX_SHARED_CACHE_TTL_S (DEFAULT_TTL_S) when it isn't given.
+        Only requests that give the same result every time may be shared (e.g. LLM calls at temperature 0).
+    """
+    backend = get_shared_cache()
+    if backend is None:
+        return fn()
+    to_cached = to_cached or (lambda result: result)
+    from_cached = from_cached or (lambda value: value)
+
+    if ttl_s is None:
+        ttl_s = float(os.getenv("MPX_SHARED_CACHE_TTL_S", DEFAULT_TTL_S))
+    lease_s = float(os.getenv("MPX_SHARED_CACHE_LEASE_S", DEFAULT_LEASE_S))
+    key = request_key(inputs)
+
+    waiting = False
+    while True:
+        try:
+            value = backend.get(operation, key)
+            claimed = value is None and backend.claim(operation, key, _OWNER, lease_s)
+        except Exception as e:
+            # the shared cache is an optimization, an unreachable backend doesn't fail the request
+            print(f"[mpx_sdk] {operation}: shared cache unavailable, running the request here: {e}")
+            return fn()
+
+        if value is not None:
+            count_cache_lookup("shared_cache", True)
+            return from_cached(value)
+        if claimed:
+            break
+        if not waiting:
+            waiting = True
+            count_single_flight(operation, "joined_worker")
+            print(f"[mpx_sdk] {operation}: same request in flight on another worker, waiting for its result")
+        cancellable_sleep(WAIT_INTERVAL_S)
+
+    try:
+        # the worker that held the claim may have stored its result and released the claim since the lookup above
+        try:
+            value = backend.get(operation, key)
+        except Exception:
+            value = None
+        count_cache_lookup("shared_cache", value is not None)
+        if value is not None:
+            return from_cached(value)
+
+        with _LeaseKeeper(backend, operation, key, lease_s) as lease:
+            result = fn()
+        if lease.lost:
+            # the worker that took the request over stores its own result
+            count_single_flight(operation, "lease_lost")
+            return result
+        try:
+            value = to_cached(result)
+            if value is not None:
+                backend.put(operation, key, value, ttl_s)
+        except Exception as e:
+            print(f"[mpx_sdk] {operation}: unable to store the result in the shared cache: {e}")
+        return result
+    finally:
+        try:
+            backend.release(operation, key, _OWNER)
+        except Exception as e:
+            print(f"[mpx_sdk] {operation}: unable to release the claim in the shared cache: {e}")
@@ -0,0 +1,77 @@
+import os
+import json
+import hashlib
+import threading
+
+from .metrics import count_single_flight
+from .cancellation import raise_if_cancelled
+
+# In-process deduplication of identical concurrent requests: later callers wait for the result (or the error) of
+# the request that is already in flight instead of submitting their own job. Off with MPX_SINGLE_FLIGHT=0.
+
+WAIT_INTERVAL_S = 0.1
+
+
+class _Flight():
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight():
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def run(self, operation: str, key: str, fn):
+        """
+            Return fn(), or the result of the call with the same operation and key that is already running.
+        """
+        with self._lock:
+            flight = self._flights.get((operation, key))
+            is_leader = flight is None
+            if is_leader:
+                flight = _Flight()
+                self._flights[(operation, key)] = flight
+        count_single_flight(operation, "leader" if is_leader else "joined")
+
+        if not is_leader:
+            print(f"[mpx_sdk] {operation}: same request already in flight, waiting for its result")
+            while not flight.done.wait(WAIT_INTERVAL_S):
+                raise_if_cancelled()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[(operation, key)]
+            flight.done.set()
+
+
+_single_flight = SingleFlight()
+
+
+def request_key(inputs: dict) -> str:
+    """
+        Canonical fingerprint of the inputs of a request: the same for dicts that only differ in key order.
+    """
+    inputs_serialized = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(inputs_serialized.encode('utf-8')).hexdigest()
+
+
+def run_single_flight(operation: str, inputs: dict, fn):
+    """
+        Run fn() for the request with the given inputs, unless the same request is already running in this
+        process, in which case its result is waited for and returned instead.
+    """
+    if os.getenv("MPX_SINGLE_FLIGHT", "1") == "0":
+        return fn()
+    return _single_flight.run(operation, request_key(inputs), fn)
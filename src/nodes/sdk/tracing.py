@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import threading
+import tempfile
+from contextlib import contextmanager
+
+# Span based tracing of the SDK layer, written per executed prompt as a Chrome trace (open in ui.perfetto.dev)
+# to <ComfyUI output directory>/mpx_traces/. Off unless MPX_TRACE=1.
+
+TRACES_SUBFOLDER = "mpx_traces"
+MAX_EVENTS_PER_TRACE = 500000 # keeps a runaway prompt from eating all the memory
+
+_context = threading.local()
+_active_node = None # nodes execute one at a time so this is shared by all joblib worker threads
+
+_recorder = None
+_recorder_lock = threading.Lock()
+_last_trace_path = None
+
+
+def is_tracing_enabled() -> bool:
+    return os.getenv("MPX_TRACE", "0") == "1"
+
+
+class TraceRecorder():
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+        self._thread_names = {}
+        self.started_at = time.perf_counter()
+        self.started_at_wall = time.time()
+        self.n_dropped = 0
+
+    def _timestamp_us(self, t: float) -> float:
+        return (t - self.started_at) * 1e6
+
+    def _append(self, event: dict):
+        thread = threading.current_thread()
+        with self._lock:
+            if len(self._events) >= MAX_EVENTS_PER_TRACE:
+                self.n_dropped += 1
+                return
+            self._thread_names[thread.ident] = thread.name
+            self._events.append(event)
+
+    def add_span(self, name: str, category: str, start: float, end: float, args: dict):
+        self._append({
+            "name": name, "cat": category, "ph": "X",
+            "ts": self._timestamp_us(start), "dur": (end - start) * 1e6,
+            "pid": os.getpid(), "tid": threading.get_ident(), "args": args,
+        })
+
+    def add_instant(self, name: str, category: str, args: dict):
+        self._append({
+            "name": name, "cat": category, "ph": "i", "s": "t",
+            "ts": self._timestamp_us(time.perf_counter()),
+            "pid": os.getpid(), "tid": threading.get_ident(), "args": args,
+        })
+
+    def n_events(self) -> int:
+        with self._lock:
+            return len(self._events)
+
+    def to_chrome_trace(self, prompt_id=None) -> dict:
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        metadata = [{ "name": "process_name", "ph": "M", "pid": os.getpid(), "args": { "name": "ComfyUI (mpx-comfyui-nodes)" } }]
+        for tid, thread_name in thread_names.items():
+            metadata.append({ "name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": { "name": thread_name } })
+        return {
+            "traceEvents": metadata + events,
+            "displayTimeUnit": "ms",
+            "otherData": { "prompt_id": prompt_id, "started_at": self.started_at_wall, "dropped_events": self.n_dropped },
+        }
+
+
+def _get_recorder() -> TraceRecorder:
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = TraceRecorder()
+        return _recorder
+
+
+def _current_tags() -> dict:
+    tags = {}
+    if _active_node is not None:
+        tags["node"] = _active_node
+    tags.update(getattr(_context, "tags", {}))
+    return tags
+
+
+@contextmanager
+def trace_context(**tags):
+    """
+        Tag every span opened by this thread within the with-statement, e.g. trace_context(item=3).
+    """
+    previous = getattr(_context, "tags", {})
+    _context.tags = { **previous, **tags }
+    try:
+        yield
+    finally:
+        _context.tags = previous
+
+
+def with_trace_context(fn, **tags):
+    """
+        Wrap fn so it runs within trace_context(**tags), for handing work items to joblib worker threads.
+    """
+    def fn_with_trace_context(*args, **kwargs):
+        with trace_context(**tags):
+            return fn(*args, **kwargs)
+    return fn_with_trace_context
+
+
+@contextmanager
+def trace_node(node_name: str):
+    """
+        Mark node_name as the node that is executing, spans on all threads are tagged with it.
+    """
+    global _active_node
+    previous = _active_node
+    _active_node = node_name
+    try:
+        with span(f"node:{node_name}", category="node"):
+            yield
+    finally:
+        _active_node = previous
+
+
+@contextmanager
+def span(name: str, category: str = "mpx", **args):
+    if not is_tracing_enabled():
+        yield
+        return
+    recorder = _get_recorder()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_span(name, category, start, time.perf_counter(), { **_current_tags(), **args })
+
+
+def instant(name: str, category: str = "mpx", **args):
+    """
+        Record a point in time without a duration, e.g. a retry.
+    """
+    if not is_tracing_enabled():
+        return
+    _get_recorder().add_instant(name, category, { **_current_tags(), **args })
+
+
+def _get_traces_directory() -> str:
+    try:
+        import folder_paths
+        output_directory = folder_paths.get_output_directory()
+    except ImportError:
+        output_directory = tempfile.gettempdir()
+    return os.path.join(output_directory, TRACES_SUBFOLDER)
+
+
+def discard_trace():
+    global _recorder
+    with _recorder_lock:
+        _recorder = None
+
+
+def finish_trace(prompt_id=None) -> str | None:
+    """
+        Write everything recorded since the last call to a Chrome trace .json file and start a new trace.
+        Returns the file path, or None if nothing was recorded.
+    """
+    global _recorder, _last_trace_path
+    with _recorder_lock:
+        recorder = _recorder
+        _recorder = None
+    if recorder is None or recorder.n_events() == 0:
+        return None
+
+    traces_directory = _get_traces_directory()
+    os.makedirs(traces_directory, exist_ok=True)
+    timestamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(recorder.started_at_wall))
+    trace_path = os.path.join(traces_directory, f"trace_{timestamp}_{prompt_id or 'unknown'}.json")
+    with open(trace_path, "w") as trace_file:
+        json.dump(recorder.to_chrome_trace(prompt_id), trace_file)
+    _last_trace_path = trace_path
+    print(f"[mpx_sdk] trace written to {trace_path}")
+    return trace_path
+
+
+def get_last_trace_path() -> str | None:
+    return _last_trace_path
+
+
+def install_prompt_hooks(prompt_server):
+    """
+        Start a new trace when ComfyUI starts executing a prompt and write it out when the prompt is done,
+        by watching the execution events that are sent to the frontend.
+    """
+    send_sync = prompt_server.send_sync
+
+    def send_sync_with_tracing(event, data, sid=None):
+        try:
+            if is_tracing_enabled() and isinstance(data, dict):
+                if event == "execution_start":
+                    discard_trace()
+                elif event in ["execution_success", "execution_error", "execution_interrupted"] or (event == "executing" and data.get("node") is None):
+                    finish_trace(data.get("prompt_id"))
+        except Exception as e:
+            print(f"[mpx_sdk] unable to write trace: {e}")
+        return send_sync(event, data, sid)
+
+    prompt_server.send_sync = send_sync_with_tracing
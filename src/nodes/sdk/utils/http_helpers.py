@@ -0,0 +1,65 @@
+import time
+import requests
+
+from ..metrics import observe_phase, count_bytes
+from ..cassette import get_cassette
+
+# Thin wrappers around requests for transfers to and from MPX storage so they show up in the metrics
+# and are recorded / replayed together with the API traffic when a cassette is active.
+
+
+def _replayed_response(url: str, status: int, body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response._content = body
+    response._content_consumed = True # lets iter_content() serve the body for streamed downloads
+    response.headers["Content-Length"] = str(len(body))
+    return response
+
+
+def http_get(url: str, endpoint: str = "storage", **kwargs) -> requests.Response:
+    """
+        Download url. The download is timed as the 'download' phase of the given endpoint.
+    """
+    cassette = get_cassette()
+    with observe_phase(endpoint, "download"):
+        if cassette is not None and cassette.mode == "replay":
+            status, body = cassette.replay_storage("GET", url)
+            response = _replayed_response(url, status, body)
+        else:
+            started_at = time.monotonic()
+            response = requests.get(url, **kwargs)
+            if cassette is not None:
+                # streamed bodies are handed on without being read, only their size is known
+                streamed = kwargs.get("stream", False)
+                body = None if streamed else response.content
+                size = int(response.headers.get("Content-Length", 0)) if streamed else len(body)
+                cassette.record_storage("GET", url, response.status_code, size, body, started_at, time.monotonic())
+        if not kwargs.get("stream", False):
+            count_bytes("download", len(response.content))
+    return response
+
+
+def http_put(url: str, data, endpoint: str = "storage", **kwargs) -> requests.Response:
+    """
+        Upload data to url. The upload is timed as the 'upload' phase of the given endpoint.
+    """
+    cassette = get_cassette()
+    with observe_phase(endpoint, "upload"):
+        if cassette is not None and cassette.mode == "replay":
+            status, body = cassette.replay_storage("PUT", url)
+            response = _replayed_response(url, status, body)
+            if not isinstance(data, (bytes, bytearray)):
+                # drain streamed uploads so their source is consumed the same way as in a real upload
+                for chunk in data:
+                    pass
+        else:
+            started_at = time.monotonic()
+            response = requests.put(url, data=data, **kwargs)
+            if cassette is not None:
+                size = len(data) if isinstance(data, (bytes, bytearray)) else getattr(data, "bytes_relayed", 0)
+                cassette.record_storage("PUT", url, response.status_code, size, None, started_at, time.monotonic())
+    if isinstance(data, (bytes, bytearray)):
+        count_bytes("upload", len(data))
+    return response
@@ -1,11 +1,13 @@
 
 from io import BytesIO
 from copy import deepcopy
-import requests
 import torch
 import numpy as np
 from PIL import Image
 
+from .http_helpers import http_get
+from ..tracing import span
+
 ### Data conversions
 
 def convert_from_torch_to_PIL(img_torch: torch.Tensor) -> Image.Image:
@@ -13,6 +15,10 @@ def convert_from_torch_to_PIL(img_torch: torch.Tensor) -> Image.Image:
         Take a torch tensor whose pixel values range from (0.0 to 1.0) and 
         return a single PIL image which has pixels in range (0 to 255) and of type uint8
     """
+    with span("torch_to_PIL", category="cpu"):
+        return _convert_from_torch_to_PIL(img_torch)
+
+def _convert_from_torch_to_PIL(img_torch: torch.Tensor) -> Image.Image:
     # use a deepcopy to avoid modifying the input tensor since we're removing the batch dimension
     img_tmp = deepcopy(img_torch)
     if img_torch.ndim == 4: # img_torch has dimensions: B x C x H x W
@@ -22,7 +28,8 @@ def convert_from_torch_to_PIL(img_torch: torch.Tensor) -> Image.Image:
     if img_tmp.ndim == 3 and img_tmp.shape[0] == 3:
         img_tmp = img_tmp.permute(1, 2, 0)
 
-    img_tmp = (img_tmp*255).clamp(0, 255).byte() # TODO: how to handle tensors that range beyond 0 to 1
+    # round instead of truncating so that a PIL -> torch -> PIL round trip gives back the exact same pixels
+    img_tmp = (img_tmp*255).round().clamp(0, 255).byte() # TODO: how to handle tensors that range beyond 0 to 1
     pil_image = Image.fromarray(img_tmp.numpy())
     return pil_image
 
@@ -30,7 +37,8 @@ def convert_from_PIL_to_torch(img_PIL: Image.Image):
     """
         Ensure pixels are in the range (0.0 to 1.0) otherwise image previews will not render properly.
     """
-    return torch.from_numpy(np.array(img_PIL, dtype=np.float32) / 255.0) 
+    with span("PIL_to_torch", category="cpu"):
+        return torch.from_numpy(np.array(img_PIL, dtype=np.float32) / 255.0) 
 
 def convert_from_numpy_to_PIL(img_np: np.ndarray):
     return Image.fromarray(img_np)
@@ -65,7 +73,10 @@ def download_image_from_url_to_PIL(img_url: str):
     """
         Assume img_url is a valid URL to an image that can be accessed by this client.
     """
-    img_downloaded = Image.open(BytesIO(requests.get(img_url).content))
+    img_downloaded = Image.open(BytesIO(http_get(img_url).content))
+    # PIL decodes lazily, do it here so the decode shows up in traces instead of wherever the pixels are first used
+    with span("image_decode", category="cpu"):
+        img_downloaded.load()
     return img_downloaded
 
 def download_image_from_url_to_torch(img_url: str):
@@ -0,0 +1,67 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import torch
+import numpy as np
+from PIL import Image
+
+from ..metrics import count_cache_lookup
+
+
+# Side-channel that remembers where IMAGE tensors originally came from.
+#
+# Nodes that download generated images from MPX storage register each image with its URL (and request_id).
+# Downstream SDK calls look the pixels up again by content hash so that an image which reaches them
+# unmodified can be passed to the API by URL instead of being re-encoded to PNG and uploaded again.
+# Any change to the pixels changes the hash, so modified images always take the upload path.
+
+MAX_TRACKED_IMAGES = 4096
+
+_sources = OrderedDict()
+_sources_lock = threading.Lock()
+
+
+def hash_image_content(img: Image.Image | torch.Tensor | np.ndarray) -> str:
+    """
+        Hash the 8-bit pixel data of an image.
+        A tensor with values from 0.0 to 1.0 hashes the same as the PIL image it was converted from.
+    """
+    if isinstance(img, Image.Image):
+        pixels = np.asarray(img)
+    elif isinstance(img, torch.Tensor):
+        pixels = (img.detach().cpu() * 255).round().clamp(0, 255).to(torch.uint8).numpy()
+    else:
+        pixels = np.asarray(img)
+
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(str(pixels.shape).encode("utf-8"))
+    hasher.update(pixels.data)
+    return hasher.hexdigest()
+
+
+def register_image_source(img: Image.Image | torch.Tensor, url: str, request_id: str = None) -> str:
+    """
+        Remember that img was obtained unmodified from url. Returns the content hash.
+    """
+    content_hash = hash_image_content(img)
+    with _sources_lock:
+        _sources[content_hash] = { "url": url, "request_id": request_id }
+        _sources.move_to_end(content_hash)
+        while len(_sources) > MAX_TRACKED_IMAGES:
+            _sources.popitem(last=False)
+    return content_hash
+
+
+def lookup_image_source(img: Image.Image | torch.Tensor) -> dict | None:
+    """
+        Return { "url": ..., "request_id": ... } if img is pixel-identical to a registered image, otherwise None.
+    """
+    content_hash = hash_image_content(img)
+    with _sources_lock:
+        source = _sources.get(content_hash)
+        if source is not None:
+            _sources.move_to_end(content_hash)
+    count_cache_lookup("image_provenance", source is not None)
+    return dict(source) if source is not None else None
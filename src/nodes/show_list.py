@@ -3,12 +3,14 @@ import torch
 import numpy as np
 
 from ..base import BaseNode
+from .utils.fingerprint import fingerprint
+from .utils.list_pages import register_list, DEFAULT_PAGE_SIZE
 
 class ShowList(BaseNode):
     """
     The ShowList node displays a list input but does not return any values. Used for visualization purposes.
     """
-    
+
     def __init__(self):
         self.version = "1.0"
 
@@ -23,6 +25,9 @@ class ShowList(BaseNode):
                     "agent_description": "The list to be displayed."
                 }),
             },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
+            },
         }
 
     RETURN_TYPES = ()
@@ -30,27 +35,24 @@ class ShowList(BaseNode):
     RETURN_AGENT_DESCRIPTIONS = ()
     OUTPUT_NODE = True
 
-    def execute(self, list_in = []):
+    @staticmethod
+    def _display_row(idx, item):
         # change how the display is constructed per data type
-        n_elements = len(list_in)
-        list_display = ""
-        for idx in range(n_elements):
-            item_display = f"{idx+1}. "
-
-            item = list_in[idx]
-
-            if isinstance(item, Image.Image): 
-                item_display += f"{item}: Image ({item.format}, {item.mode}, {item.size})"
-            elif isinstance(item, (torch.Tensor, np.ndarray)): 
-                item_display += f"{item.shape}, {item.dtype}"
-            else: 
-                item_display += f"{item}"
-                
-            list_display += (item_display + "\n")
+        if isinstance(item, Image.Image):
+            return f"{idx+1}. {item}: Image ({item.format}, {item.mode}, {item.size})"
+        elif isinstance(item, (torch.Tensor, np.ndarray)):
+            return f"{idx+1}. {item.shape}, {item.dtype}"
+        else:
+            return f"{idx+1}. {item}"
+
+    def execute(self, list_in = [], unique_id = None):
+        rows = [self._display_row(idx, item) for idx, item in enumerate(list_in)]
+
+        # the widget fetches the rows page by page, only the first page goes out with the execution message
+        handle = register_list(str(unique_id), fingerprint(list_in), rows)
+        first_page = "\n".join(rows[:DEFAULT_PAGE_SIZE])
+        if len(rows) > DEFAULT_PAGE_SIZE:
+            first_page += f"\n... ({len(rows) - DEFAULT_PAGE_SIZE} more)"
 
         # If the UI widget exists, update its text content.
-        return {"ui": {"list": (list_display,)}, "result": (list_in,)}
-    
-    @classmethod
-    def IS_CHANGED(s, list_in):
-        return float("NaN")
+        return {"ui": {"list": (first_page,), "list_handle": (handle,), "list_total": (len(rows),)}, "result": (list_in,)}
@@ -2,6 +2,7 @@ import torch
 
 from .sdk.components.text_to_image import component_text_to_image
 from .sdk.utils.image_helpers import download_image_from_url_to_PIL, convert_from_PIL_to_torch
+from .sdk.utils.provenance import register_image_source
 
 from ..base import BaseNode
 
@@ -77,6 +78,7 @@ class TextToImage(BaseNode):
         image_tensors = []
         for img_url in image_urls:
             PIL_image = download_image_from_url_to_PIL(img_url)
+            register_image_source(PIL_image, img_url, request_id)
             torch_image = convert_from_PIL_to_torch(PIL_image)
             image_tensors.append(torch_image)
             
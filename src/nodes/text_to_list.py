@@ -1,4 +1,12 @@
+# system imports
+from joblib import Parallel, delayed, cpu_count
+
+# MPX imports
 from .utils.general import hash_node_inputs, variable_substitution, llm_call_with_json_parsing
+from .utils.script_chunking import split_text_with_overlap
+from .utils.text_similarity import dedupe_texts
+from .utils.progress import StepProgress
+from .sdk.tracing import with_trace_context
 
 from ..base import BaseNode
 
@@ -39,6 +47,31 @@ class TextToList(BaseNode):
                     "tooltip": "User instructions for how to break down the text into a list of strings.",
                     "agent_description": "Instructions specifying how to break down the text into a list."
                 }),
+                "chunked_extraction": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "For long documents: split the text into overlapping chunks at paragraph boundaries, extract from the chunks in parallel and remove duplicates.",
+                    "agent_description": "When enabled, long texts are split into overlapping chunks that are processed in parallel, and duplicate items are removed. Default false."
+                }),
+                "max_chunk_words": ("INT", {
+                    "default": 1500,
+                    "min": 200,
+                    "max": 20000,
+                    "step": 100,
+                    "tooltip": "Maximum number of words in a chunk in chunked extraction mode.",
+                    "agent_description": "Maximum number of words per chunk. Default: 1500."
+                }),
+                "consolidate": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "In chunked extraction mode, let the LLM clean up the combined items of all chunks in one final request.",
+                    "agent_description": "When enabled, a final LLM request consolidates the items extracted from all chunks. Default false."
+                }),
+                "num_processes": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": cpu_count(),
+                    "tooltip": "Number of chunks processed in parallel in chunked extraction mode.",
+                    "agent_description": "Number of parallel processes for chunked extraction. Default: 1."
+                }),
             }
         }
     
@@ -52,12 +85,21 @@ class TextToList(BaseNode):
     __DEFAULT_PROMPT_SYS = "You are an expert natural language editor who is tasked with breaking down a block of text into a list of strings based on some custom user given instructions. Read the given block of text and reason about what's important and needs to be extracted into a seperate string based on the custom user given instructions. If no custom instructions are given then just split it however you want in a way that makes sense.\n\nReturn the answer as only a JSON with a two keys 'list_of_strings' and 'reasoning'.\nIn the 'list_of_strings' key provide the list of strings that were extracted from the block of text according to the custom user instructions with no premable or explanation.\nIn the 'reasoning' key provide an explaination for why the merged version makes sense how it correlates to the given custom user instructions."
     __DEFAULT_PROMPT_HUMAN = "### Here is the block of text:\n{user_input}\n\n### Here are the custom user instructions:\n{custom_instructions}"
 
-    def execute(self, input_text, temp, custom_instructions):
+    __CHUNK_PROMPT_HUMAN = "### Here is part {chunk_number} of {n_chunks} of a longer block of text, only extract from this part:\n{user_input}\n\n### Here are the custom user instructions:\n{custom_instructions}"
+
+    __CONSOLIDATE_PROMPT_SYS = "You are an expert natural language editor. A long block of text was broken down into a list of strings part by part based on some custom user given instructions, and the lists of all parts were combined. Consolidate the combined list: merge items that describe the same thing, remove items that do not follow the custom user instructions and keep the order of the remaining items. Do not add new items.\n\nReturn the answer as only a JSON with a two keys 'list_of_strings' and 'reasoning'.\nIn the 'list_of_strings' key provide the consolidated list of strings with no premable or explanation.\nIn the 'reasoning' key provide an explaination for what was merged or removed and why."
+    __CONSOLIDATE_PROMPT_HUMAN = "### Here is the combined list of strings:\n{list_of_strings}\n\n### Here are the custom user instructions:\n{custom_instructions}"
+
+    def execute(self, input_text, temp, custom_instructions, chunked_extraction=False, max_chunk_words=1500, consolidate=False, num_processes=1):
+        if chunked_extraction:
+            chunks = split_text_with_overlap(input_text, max_chunk_words)
+            if len(chunks) > 1:
+                return self.extract_in_chunks(chunks, temp, custom_instructions, consolidate, num_processes)
+
         llm_params = {}
         llm_params["temperature"] = temp
 
         extra_params = {}
-        extra_params["model"] = "gpt-4o"
 
         prompt_data = {}
         prompt_data['user_input'] = input_text
@@ -66,9 +108,73 @@ class TextToList(BaseNode):
         sys_prompt = variable_substitution(TextToList.__DEFAULT_PROMPT_SYS, prompt_data)
         human_prompt = variable_substitution(TextToList.__DEFAULT_PROMPT_HUMAN, prompt_data)
 
-        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params)
+        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="extraction")
         
         updated_text = parsed_response['list_of_strings']
         llm_reasoning = parsed_response['reasoning']
 
         return updated_text, llm_reasoning
+
+    def extract_from_chunk(self, chunk_text, chunk_idx, n_chunks, temp, custom_instructions, progress_bar):
+        llm_params = {}
+        llm_params["temperature"] = temp
+
+        extra_params = {}
+
+        prompt_data = {}
+        prompt_data['user_input'] = chunk_text
+        prompt_data['custom_instructions'] = custom_instructions
+        prompt_data['chunk_number'] = chunk_idx + 1
+        prompt_data['n_chunks'] = n_chunks
+
+        print(f"Extracting from chunk [{chunk_idx+1}/{n_chunks}] ... ")
+
+        sys_prompt = variable_substitution(TextToList.__DEFAULT_PROMPT_SYS, prompt_data)
+        human_prompt = variable_substitution(TextToList.__CHUNK_PROMPT_HUMAN, prompt_data)
+
+        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="extraction")
+        progress_bar.step_done()
+        return parsed_response['list_of_strings'], parsed_response['reasoning']
+
+    def extract_in_chunks(self, chunks, temp, custom_instructions, consolidate, num_processes):
+        n_chunks = len(chunks)
+        print(f"Extracting a list from {n_chunks} chunks ...")
+
+        pbar = StepProgress(n_chunks + (1 if consolidate else 0))
+
+        # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel and causes issue with the comfy progress bar object
+        chunk_results = Parallel(backend="threading", n_jobs=num_processes)(delayed(with_trace_context(self.extract_from_chunk, item=i))(
+            chunks[i],
+            i,
+            n_chunks,
+            temp,
+            custom_instructions,
+            pbar
+        ) for i in range(n_chunks))
+
+        # items in document order, the chunks overlap so items at chunk boundaries are usually found twice
+        all_items = [item for chunk_items, _ in chunk_results for item in chunk_items]
+        list_of_strings = dedupe_texts(all_items)
+
+        llm_reasoning = "".join(f"Part {idx+1}/{n_chunks}: {reasoning}\n\n" for idx, (_, reasoning) in enumerate(chunk_results))
+        llm_reasoning += f"Removed {len(all_items) - len(list_of_strings)} duplicates from the {len(all_items)} items found in the {n_chunks} parts."
+
+        if consolidate:
+            llm_params = {}
+            llm_params["temperature"] = temp
+
+            extra_params = {}
+
+            prompt_data = {}
+            prompt_data['list_of_strings'] = list_of_strings
+            prompt_data['custom_instructions'] = custom_instructions
+
+            sys_prompt = variable_substitution(TextToList.__CONSOLIDATE_PROMPT_SYS, prompt_data)
+            human_prompt = variable_substitution(TextToList.__CONSOLIDATE_PROMPT_HUMAN, prompt_data)
+
+            parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="transform")
+            list_of_strings = parsed_response['list_of_strings']
+            llm_reasoning += f"\n\nConsolidation: {parsed_response['reasoning']}"
+            pbar.step_done()
+
+        return list_of_strings, llm_reasoning
@@ -1,4 +1,12 @@
+# system imports
+from joblib import Parallel, delayed, cpu_count
+
+# MPX imports
 from .utils.general import hash_node_inputs, variable_substitution, llm_call_with_json_parsing
+from .utils.script_chunking import split_text_with_overlap
+from .utils.text_similarity import dedupe_texts
+from .utils.progress import StepProgress
+from .sdk.tracing import with_trace_context
 
 from ..base import BaseNode
 
@@ -35,9 +43,40 @@ class TextToObjectList(BaseNode):
                     "tooltip": "Maximum number of objects to extract. The node will stop at this number even if more objects could be identified.",
                     "agent_description": "The maximum number of objects to generate. Default: 4."
                 })
+            },
+            "optional":
+            {
+                "chunked_extraction": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "For long documents: split the text into overlapping chunks at paragraph boundaries, extract from the chunks in parallel and remove duplicates.",
+                    "agent_description": "When enabled, long texts are split into overlapping chunks that are processed in parallel, and duplicate objects are removed. Default false."
+                }),
+                "max_chunk_words": ("INT", {
+                    "default": 1500,
+                    "min": 200,
+                    "max": 20000,
+                    "step": 100,
+                    "tooltip": "Maximum number of words in a chunk in chunked extraction mode.",
+                    "agent_description": "Maximum number of words per chunk. Default: 1500."
+                }),
+                "consolidate": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "In chunked extraction mode, let the LLM clean up the combined objects of all chunks in one final request.",
+                    "agent_description": "When enabled, a final LLM request consolidates the objects extracted from all chunks. Default false."
+                }),
+                "num_processes": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": cpu_count(),
+                    "tooltip": "Number of chunks processed in parallel in chunked extraction mode.",
+                    "agent_description": "Number of parallel processes for chunked extraction. Default: 1."
+                }),
             }
         }
 
+    # the LLM is always called with a temperature of 0
+    DETERMINISTIC = True
+
     RETURN_TYPES = ("LIST", )
     RETURN_NAMES = ("ObjectDescriptions_list",)
     RETURN_AGENT_DESCRIPTIONS = (
@@ -48,12 +87,19 @@ class TextToObjectList(BaseNode):
     __DEFAULT_PROMPT_HUMAN = "Here is the block of text: {user_input}"
 
 
-    def execute(self, text_prompt, min_objects, max_objects):
+    __CONSOLIDATE_PROMPT_SYS = "You are a natural language expert who is an expert at breaking down a block of text into a list of objects. A long block of text was broken down into objects part by part and the objects of all parts were combined. Consolidate the combined list: merge objects that are the same object described differently, and keep the objects that best fit the whole description. Keep the descriptions of the objects.\n\nReturn the answer as only a JSON with a two keys 'objects' and 'reasoning'. In the 'objects' key provide the consolidated list of objects with no premable or explanation. Ensure the list has a minimum of {min_objects} items and at most {max_objects} items. In the 'reasoning' key provide an explanation for what was merged or left out. Just the JSON only is returned."
+    __CONSOLIDATE_PROMPT_HUMAN = "Here is the combined list of objects: {objects}"
+
+    def execute(self, text_prompt, min_objects, max_objects, chunked_extraction=False, max_chunk_words=1500, consolidate=False, num_processes=1):
+        if chunked_extraction:
+            chunks = split_text_with_overlap(text_prompt, max_chunk_words)
+            if len(chunks) > 1:
+                return self.extract_in_chunks(chunks, min_objects, max_objects, consolidate, num_processes)
+
         llm_params = {}
         llm_params["temperature"] = 0.0
 
         extra_params = {}
-        extra_params["model"] = "gpt-4o"
 
         prompt_data = {}
         prompt_data['min_objects'] = min_objects
@@ -63,7 +109,7 @@ class TextToObjectList(BaseNode):
         sys_prompt = variable_substitution(TextToObjectList.__DEFAULT_PROMPT_SYS, prompt_data)
         human_prompt = variable_substitution(TextToObjectList.__DEFAULT_PROMPT_HUMAN, prompt_data)
 
-        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params)
+        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="extraction")
 
         print(parsed_response)
 
@@ -76,3 +122,69 @@ class TextToObjectList(BaseNode):
             object_descr_list = object_descr_list[:max_objects]
 
         return (object_descr_list, )
+
+    def extract_from_chunk(self, chunk_text, chunk_idx, n_chunks, max_objects, progress_bar):
+        llm_params = {}
+        llm_params["temperature"] = 0.0
+
+        extra_params = {}
+
+        # a part of the text can mention only a few objects, the minimum applies to the whole text
+        prompt_data = {}
+        prompt_data['min_objects'] = 1
+        prompt_data['max_objects'] = max_objects
+        prompt_data['user_input'] = chunk_text
+
+        print(f"Extracting objects from chunk [{chunk_idx+1}/{n_chunks}] ... ")
+
+        sys_prompt = variable_substitution(TextToObjectList.__DEFAULT_PROMPT_SYS, prompt_data)
+        human_prompt = variable_substitution(TextToObjectList.__DEFAULT_PROMPT_HUMAN, prompt_data)
+
+        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="extraction")
+        progress_bar.step_done()
+        return parsed_response['objects']
+
+    def extract_in_chunks(self, chunks, min_objects, max_objects, consolidate, num_processes):
+        n_chunks = len(chunks)
+        print(f"Extracting objects from {n_chunks} chunks ...")
+
+        pbar = StepProgress(n_chunks + (1 if consolidate else 0))
+
+        # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel and causes issue with the comfy progress bar object
+        chunk_objects = Parallel(backend="threading", n_jobs=num_processes)(delayed(with_trace_context(self.extract_from_chunk, item=i))(
+            chunks[i],
+            i,
+            n_chunks,
+            max_objects,
+            pbar
+        ) for i in range(n_chunks))
+
+        # objects in document order, the chunks overlap so objects at chunk boundaries are usually found twice
+        all_objects = [obj for objects in chunk_objects for obj in objects]
+        object_descr_list = dedupe_texts(all_objects)
+        print(f"Removed {len(all_objects) - len(object_descr_list)} duplicates from the {len(all_objects)} objects found in the {n_chunks} parts.")
+
+        if consolidate and len(object_descr_list) > 1:
+            llm_params = {}
+            llm_params["temperature"] = 0.0
+
+            extra_params = {}
+
+            prompt_data = {}
+            prompt_data['min_objects'] = min_objects
+            prompt_data['max_objects'] = max_objects
+            prompt_data['objects'] = object_descr_list
+
+            sys_prompt = variable_substitution(TextToObjectList.__CONSOLIDATE_PROMPT_SYS, prompt_data)
+            human_prompt = variable_substitution(TextToObjectList.__CONSOLIDATE_PROMPT_HUMAN, prompt_data)
+
+            parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="transform")
+            object_descr_list = parsed_response['objects']
+        if consolidate:
+            pbar.step_done()
+
+        # truncate the object list if it's bigger than max_objects
+        if len(object_descr_list) > max_objects:
+            object_descr_list = object_descr_list[:max_objects]
+
+        return (object_descr_list, )
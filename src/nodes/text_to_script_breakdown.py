@@ -1,4 +1,11 @@
+# system imports
+from joblib import Parallel, delayed, cpu_count
+
+# MPX imports
 from .utils.general import hash_node_inputs, variable_substitution, llm_call_with_json_parsing
+from .utils.script_chunking import split_script_into_chunks, canonicalize_names, ambiguous_clusters, pick_canonical_entry
+from .utils.progress import StepProgress
+from .sdk.tracing import with_trace_context
 
 from ..base import BaseNode
 
@@ -18,9 +25,34 @@ class TextToScriptBreakdown(BaseNode):
                     "tooltip": "The script or story text that needs to be broken down into production elements.",
                     "agent_description": "The film/animation script text to analyze."
                 })
+            },
+            "optional": {
+                "split_into_scenes": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Break down long scripts in chunks of whole scenes in parallel and merge the characters and props found in the chunks. Use this for feature-length scripts.",
+                    "agent_description": "When enabled, the script is split at scene headings and the chunks are analyzed in parallel, then duplicate characters and props are merged. Default false."
+                }),
+                "max_chunk_words": ("INT", {
+                    "default": 4000,
+                    "min": 500,
+                    "max": 50000,
+                    "step": 500,
+                    "tooltip": "Maximum number of words in a chunk when splitting into scenes.",
+                    "agent_description": "Maximum number of words per chunk of scenes. Default: 4000."
+                }),
+                "num_processes": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": cpu_count(),
+                    "tooltip": "Number of chunks analyzed in parallel when splitting into scenes.",
+                    "agent_description": "Number of parallel processes for analyzing chunks. Default: 1."
+                }),
             }
         }
 
+    # the LLM is always called with a temperature of 0
+    DETERMINISTIC = True
+
     RETURN_TYPES = ("LIST", "LIST", "LIST", "STRING")
     RETURN_NAMES = ("CharactersInScript_list", "PropsInScript_list", "SynopsesPerSceneInScript_list", "Reasoning_string")
     RETURN_AGENT_DESCRIPTIONS = (
@@ -48,12 +80,32 @@ class TextToScriptBreakdown(BaseNode):
         "Extract the required elements as described."
     )
 
-    def execute(self, script_text):
+    __CHUNK_PROMPT_HUMAN = (
+        "### The following is part {chunk_number} of {n_chunks} of a film/animation script:\n\n{script_text}\n\n"
+        "Extract the required elements as described, only for this part of the script."
+    )
+
+    __MERGE_PROMPT_SYS = (
+        "You are an expert film and animation script analyst. The {kind} of a script were extracted from different parts of the script separately, "
+        "so the same {kind_singular} can appear more than once under slightly different names or descriptions. "
+        "You are given a numbered list of some of the extracted {kind} whose names are similar. Decide which entries refer to the same {kind_singular}. "
+        "Return the result as a JSON object with the keys 'groups' and 'reasoning'. "
+        "In the 'groups' key provide a list of lists of entry numbers, where each inner list contains the numbers of the entries that are the same {kind_singular}. Every entry number appears in exactly one inner list. "
+        "In the 'reasoning' key provide an explaination for why the entries were grouped this way."
+    )
+
+    __MERGE_PROMPT_HUMAN = "### The extracted {kind}:\n{numbered_entries}"
+
+    def execute(self, script_text, split_into_scenes=False, max_chunk_words=4000, num_processes=1):
+        if split_into_scenes:
+            chunks = split_script_into_chunks(script_text, max_chunk_words)
+            if len(chunks) > 1:
+                return self.breakdown_in_chunks(chunks, num_processes)
+
         llm_params = {}
         llm_params["temperature"] = 0.0
 
         extra_params = {}
-        extra_params["model"] = "gpt-4o"
 
         prompt_data = {}
         prompt_data["script_text"] = script_text
@@ -61,7 +113,7 @@ class TextToScriptBreakdown(BaseNode):
         sys_prompt = variable_substitution(TextToScriptBreakdown.__DEFAULT_PROMPT_SYS, prompt_data)
         human_prompt = variable_substitution(TextToScriptBreakdown.__DEFAULT_PROMPT_HUMAN, prompt_data)
 
-        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params)
+        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="long_form")
 
         characters = parsed_response["characters"]
         props = parsed_response["props"]
@@ -69,3 +121,129 @@ class TextToScriptBreakdown(BaseNode):
         llm_reasoning = parsed_response['reasoning']
 
         return characters, props, scene_synopses, llm_reasoning
+
+    def breakdown_chunk(self, chunk_text, chunk_idx, n_chunks, progress_bar):
+        llm_params = {}
+        llm_params["temperature"] = 0.0
+
+        extra_params = {}
+
+        prompt_data = {}
+        prompt_data["script_text"] = chunk_text
+        prompt_data["chunk_number"] = chunk_idx + 1
+        prompt_data["n_chunks"] = n_chunks
+
+        print(f"Breaking down script chunk [{chunk_idx+1}/{n_chunks}] ... ")
+
+        sys_prompt = variable_substitution(TextToScriptBreakdown.__DEFAULT_PROMPT_SYS, prompt_data)
+        human_prompt = variable_substitution(TextToScriptBreakdown.__CHUNK_PROMPT_HUMAN, prompt_data)
+
+        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="long_form")
+
+        progress_bar.step_done()
+        return parsed_response
+
+    def resolve_ambiguous_names(self, entries, groups, cluster, kind, kind_singular):
+        """
+            Ask the LLM which of the groups in an ambiguous cluster are the same thing.
+            Returns lists of positions into cluster that should be merged.
+        """
+        llm_params = {}
+        llm_params["temperature"] = 0.0
+
+        extra_params = {}
+
+        prompt_data = {}
+        prompt_data["kind"] = kind
+        prompt_data["kind_singular"] = kind_singular
+        prompt_data["numbered_entries"] = "\n".join(f"{pos+1}. {pick_canonical_entry(entries, groups[g])}" for pos, g in enumerate(cluster))
+
+        sys_prompt = variable_substitution(TextToScriptBreakdown.__MERGE_PROMPT_SYS, prompt_data)
+        human_prompt = variable_substitution(TextToScriptBreakdown.__MERGE_PROMPT_HUMAN, prompt_data)
+
+        try:
+            parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="checklist")
+            merges = []
+            for numbers in parsed_response["groups"]:
+                positions = sorted({ int(n) - 1 for n in numbers if 1 <= int(n) <= len(cluster) })
+                if len(positions) > 1:
+                    merges.append(positions)
+            return merges
+        except Exception as e:
+            # keeping similar names apart is the safe fallback
+            print(f"Unable to decide which {kind} are the same, keeping them apart: {e}")
+            return []
+
+    def merge_entries(self, entries, kind, kind_singular, num_processes):
+        """
+            Merge the characters or props found in the different chunks, returns (merged entries, reasoning).
+        """
+        groups, ambiguous_pairs = canonicalize_names(entries)
+        clusters = ambiguous_clusters(len(groups), ambiguous_pairs)
+
+        # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel and causes issue with the comfy progress bar object
+        all_merges = Parallel(backend="threading", n_jobs=num_processes)(delayed(with_trace_context(self.resolve_ambiguous_names, item=i))(
+            entries,
+            groups,
+            clusters[i],
+            kind,
+            kind_singular
+        ) for i in range(len(clusters)))
+
+        parent = list(range(len(groups)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for cluster, merges in zip(clusters, all_merges):
+            for positions in merges:
+                first = find(cluster[positions[0]])
+                for pos in positions[1:]:
+                    other = find(cluster[pos])
+                    if other != first:
+                        parent[max(first, other)] = min(first, other)
+                        first = min(first, other)
+
+        merged = {}
+        for g in range(len(groups)):
+            merged.setdefault(find(g), []).extend(groups[g])
+        merged_entries = [pick_canonical_entry(entries, merged[root]) for root in sorted(merged)]
+
+        reasoning = f"Merged {len(entries)} {kind} found in the chunks into {len(merged_entries)}"
+        if clusters:
+            reasoning += f" ({len(clusters)} groups of similar names were checked by the LLM)"
+        return merged_entries, reasoning + ".\n"
+
+    def breakdown_in_chunks(self, chunks, num_processes):
+        n_chunks = len(chunks)
+        print(f"Breaking down the script in {n_chunks} chunks ...")
+
+        pbar = StepProgress(n_chunks + 1) # the merge is the last step
+
+        # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel and causes issue with the comfy progress bar object
+        chunk_results = Parallel(backend="threading", n_jobs=num_processes)(delayed(with_trace_context(self.breakdown_chunk, item=i))(
+            chunks[i],
+            i,
+            n_chunks,
+            pbar
+        ) for i in range(n_chunks))
+
+        all_characters = []
+        all_props = []
+        scene_synopses = []
+        llm_reasoning = ""
+        for chunk_idx, parsed_response in enumerate(chunk_results):
+            all_characters.extend(parsed_response["characters"])
+            all_props.extend(parsed_response["props"])
+            scene_synopses.extend(parsed_response["scene_synopses"])
+            llm_reasoning += f"Part {chunk_idx+1}/{n_chunks}: {parsed_response['reasoning']}\n\n"
+
+        characters, characters_reasoning = self.merge_entries(all_characters, "characters", "character", num_processes)
+        props, props_reasoning = self.merge_entries(all_props, "props", "prop", num_processes)
+        llm_reasoning += characters_reasoning + props_reasoning
+        pbar.finish()
+
+        return characters, props, scene_synopses, llm_reasoning
@@ -1,5 +1,13 @@
+# system imports
+import math
+from joblib import Parallel, delayed, cpu_count
+
+# MPX imports
 # from .sdk.llms.call import llm_call
 from .utils.general import hash_node_inputs, parse_llm_json, variable_substitution, llm_call_with_json_parsing
+from .utils.progress import StepProgress
+
+from .sdk.tracing import with_trace_context
 
 from ..base import BaseNode
 
@@ -28,10 +36,10 @@ class TextToStory(BaseNode):
                 "story_word_length": ("INT", {
                     "default": 150,
                     "min": 10,
-                    "max": 2000,                    
+                    "max": 20000,
                     "display": "slider",
-                    "tooltip": "The approximate word count for the story.",
-                    "agent_description": "The length of the story in words. Range: 10-2000, default: 150."
+                    "tooltip": "The approximate word count for the story. Stories longer than a few thousand words should use the long form mode.",
+                    "agent_description": "The length of the story in words. Range: 10-20000, default: 150."
                 }),
                 "temperature": ("FLOAT", {
                     "default": 0.8,
@@ -49,6 +57,29 @@ class TextToStory(BaseNode):
                     "tooltip": "Additional specific instructions for story style, tone, or special requirements.",
                     "agent_description": "Any additional custom instructions for how the story should be told, formatted and/or styled."
                 })
+            },
+            "optional":
+            {
+                "long_form": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Write an outline first, then write the sections of the story in parallel and smooth the transitions between them. Much faster for long stories.",
+                    "agent_description": "When enabled, the story is outlined first and its sections are written in parallel, then the transitions are smoothed. Default false."
+                }),
+                "words_per_section": ("INT", {
+                    "default": 600,
+                    "min": 200,
+                    "max": 2000,
+                    "step": 100,
+                    "tooltip": "Approximate length of each section in long form mode.",
+                    "agent_description": "Approximate number of words per section in long form mode. Default: 600."
+                }),
+                "num_processes": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": cpu_count(),
+                    "tooltip": "Number of sections written in parallel in long form mode.",
+                    "agent_description": "Number of parallel processes for writing sections. Default: 1."
+                }),
             }
         }
 
@@ -94,12 +125,44 @@ class TextToStory(BaseNode):
     __DEFAULT_PROMPT_HUMAN += "### (4) Set of custom instructions to incorporate\n{custom_instructions}\n\n"
 
 
-    def execute(self, text_prompt, genre, story_word_length, temperature, custom_instructions):
+    __OUTLINE_PROMPT_SYS = "You are a master storyteller with expertise across multiple genres and narrative styles. You plan a story based on the client's specifications before it gets written section by section by several writers at the same time. The client will provide: (1) The overall concept or theme of the story, (2) the desired genre, (3) preferred length, and optionally (4) custom instructions or stylistic preferences.\n\n"
+    __OUTLINE_PROMPT_SYS += "The story should have a strong hook, a clear narrative arc with rising action, climax, and resolution, memorable characters whose decisions drive the plot, and it should incorporate the conventions of the genre without clichés.\n\n"
+    __OUTLINE_PROMPT_SYS += "Return the answer as only a JSON with four keys: 'style_guide', 'characters', 'sections', and 'reasoning'.\n"
+    __OUTLINE_PROMPT_SYS += "- In 'style_guide': Describe the point of view, tense, tone and prose style every writer has to follow so the sections read as one story.\n"
+    __OUTLINE_PROMPT_SYS += "- In 'characters': Provide a numbered list of all characters in the story with detailed character profiles. Each character should be described in a concise description starting with a number followed by a period (e.g., '1. Character description...'). Include: their name, age and gender, personality traits and quirks, visual details, motivations and goals, relationships with other characters, and any significant character arcs or development throughout the story. Do not use JSON formatting within this section.\n"
+    __OUTLINE_PROMPT_SYS += "- In 'sections': Provide a list of exactly {n_sections} strings, one per consecutive section of the story. Each string summarizes in a few sentences what happens in the section, which characters appear, and where the section starts and ends so the sections connect.\n"
+    __OUTLINE_PROMPT_SYS += "- In 'reasoning': Explain how the story fulfills the client's requirements, your narrative choices, and how the characters and their arcs serve the story's themes."
+    __OUTLINE_PROMPT_SYS += "Make sure you return the answer as a JSON string with the ```json and ``` markers."
+
+    __SECTION_PROMPT_SYS = "You are a master storyteller writing one section of a longer story in the {story_genre} genre. Other writers are writing the other sections at the same time from the same outline, so follow the outline, the style guide and the character profiles exactly. "
+    __SECTION_PROMPT_SYS += "Only write what happens in your section: do not recap earlier sections and do not anticipate later ones. Use a mix of dialogue, description, and action, and show rather than tell.\n\n"
+    __SECTION_PROMPT_SYS += "Return the answer as only a JSON with one key: 'section_text'. In 'section_text' provide the text of your section with appropriate paragraphing and dialogue formatting. No preamble, title or explanation.\n"
+    __SECTION_PROMPT_SYS += "Make sure you return the answer as a JSON string with the ```json and ``` markers."
+
+    __SECTION_PROMPT_HUMAN = "### What the story is about\n{story_gist}\n\n"
+    __SECTION_PROMPT_HUMAN += "### Custom instructions to incorporate\n{custom_instructions}\n\n"
+    __SECTION_PROMPT_HUMAN += "### Style guide\n{style_guide}\n\n"
+    __SECTION_PROMPT_HUMAN += "### Characters\n{characters}\n\n"
+    __SECTION_PROMPT_HUMAN += "### Outline of the whole story\n{outline}\n\n"
+    __SECTION_PROMPT_HUMAN += "### Your section\nWrite section {section_number} of {n_sections} in about {section_word_length} words: {section_summary}"
+
+    __STITCH_PROMPT_SYS = "You are a story editor. Two consecutive sections of a story were written by different writers. You are given the last paragraph of the earlier section and the first paragraph of the later section. "
+    __STITCH_PROMPT_SYS += "Lightly edit the two paragraphs so the story flows from one into the other: fix inconsistencies in names, tense and point of view, remove repeated information and smooth the transition. Keep the events, the length and the style the same.\n\n"
+    __STITCH_PROMPT_SYS += "Return the answer as only a JSON with two keys: 'ending' and 'opening'. In 'ending' provide the edited last paragraph of the earlier section, in 'opening' the edited first paragraph of the later section.\n"
+    __STITCH_PROMPT_SYS += "Make sure you return the answer as a JSON string with the ```json and ``` markers."
+
+    __STITCH_PROMPT_HUMAN = "### Style guide\n{style_guide}\n\n"
+    __STITCH_PROMPT_HUMAN += "### Last paragraph of the earlier section\n{ending}\n\n"
+    __STITCH_PROMPT_HUMAN += "### First paragraph of the later section\n{opening}"
+
+    def execute(self, text_prompt, genre, story_word_length, temperature, custom_instructions, long_form=False, words_per_section=600, num_processes=1):
+        if long_form and story_word_length > words_per_section:
+            return self.write_long_form(text_prompt, genre, story_word_length, temperature, custom_instructions, words_per_section, num_processes)
+
         llm_params = {}
         llm_params["temperature"] = temperature
 
         extra_params = {}
-        extra_params["model"] = "gpt-4o"
 
         prompt_data = {}
         prompt_data['story_gist'] = text_prompt
@@ -113,7 +176,7 @@ class TextToStory(BaseNode):
         # llm_response = llm_call(sys_prompt, human_prompt, llm_params, extra_params)
         # parsed_response = parse_llm_json(llm_response)
         
-        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params)
+        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="long_form")
 
         generated_story = parsed_response['story']
         generated_characters = parsed_response['characters']
@@ -123,3 +186,118 @@ class TextToStory(BaseNode):
 
 
 
+
+    def write_section(self, prompt_data, section_idx, section_summary, temperature, progress_bar):
+        llm_params = {}
+        llm_params["temperature"] = temperature
+
+        extra_params = {}
+
+        section_prompt_data = dict(prompt_data)
+        section_prompt_data['section_number'] = section_idx + 1
+        section_prompt_data['section_summary'] = section_summary
+
+        print(f"Writing story section [{section_idx+1}/{prompt_data['n_sections']}] ... ")
+
+        sys_prompt = variable_substitution(TextToStory.__SECTION_PROMPT_SYS, section_prompt_data)
+        human_prompt = variable_substitution(TextToStory.__SECTION_PROMPT_HUMAN, section_prompt_data)
+
+        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="long_form")
+        progress_bar.step_done()
+        return parsed_response['section_text']
+
+    def stitch_transition(self, style_guide, ending, opening):
+        """
+            Returns the edited (ending, opening) paragraphs around a section boundary, or the originals if editing fails.
+        """
+        llm_params = {}
+        llm_params["temperature"] = 0.0
+
+        extra_params = {}
+
+        prompt_data = {}
+        prompt_data['style_guide'] = style_guide
+        prompt_data['ending'] = ending
+        prompt_data['opening'] = opening
+
+        sys_prompt = variable_substitution(TextToStory.__STITCH_PROMPT_SYS, prompt_data)
+        human_prompt = variable_substitution(TextToStory.__STITCH_PROMPT_HUMAN, prompt_data)
+
+        try:
+            parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="transform")
+            return parsed_response['ending'], parsed_response['opening']
+        except Exception as e:
+            print(f"Unable to smooth a section transition, keeping it as written: {e}")
+            return ending, opening
+
+    def write_long_form(self, text_prompt, genre, story_word_length, temperature, custom_instructions, words_per_section, num_processes):
+        n_sections = math.ceil(story_word_length / words_per_section)
+
+        pbar = StepProgress(1 + n_sections + 1) # outline, sections, stitching
+
+        # 1. a short outline everything else is written from
+        llm_params = {}
+        llm_params["temperature"] = temperature
+
+        extra_params = {}
+
+        prompt_data = {}
+        prompt_data['story_gist'] = text_prompt
+        prompt_data['story_genre'] = genre
+        prompt_data['story_word_length'] = story_word_length
+        prompt_data['custom_instructions'] = custom_instructions
+        prompt_data['n_sections'] = n_sections
+
+        print(f"Outlining a story of {story_word_length} words in {n_sections} sections ...")
+        sys_prompt = variable_substitution(TextToStory.__OUTLINE_PROMPT_SYS, prompt_data)
+        human_prompt = variable_substitution(TextToStory.__DEFAULT_PROMPT_HUMAN, prompt_data)
+        outline = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="transform")
+        pbar.step_done()
+
+        section_summaries = [str(summary) for summary in outline['sections']]
+        n_sections = len(section_summaries)
+        if n_sections == 0:
+            raise ValueError("The story outline has no sections!")
+
+        prompt_data['n_sections'] = n_sections
+        prompt_data['style_guide'] = outline['style_guide']
+        prompt_data['characters'] = outline['characters']
+        prompt_data['outline'] = "\n".join(f"{idx+1}. {summary}" for idx, summary in enumerate(section_summaries))
+        prompt_data['section_word_length'] = math.ceil(story_word_length / n_sections)
+
+        # 2. all sections at once
+        # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel and causes issue with the comfy progress bar object
+        sections = Parallel(backend="threading", n_jobs=num_processes)(delayed(with_trace_context(self.write_section, item=i))(
+            prompt_data,
+            i,
+            section_summaries[i],
+            temperature,
+            pbar
+        ) for i in range(n_sections))
+
+        # 3. smooth every transition from the last paragraph of a section into the first paragraph of the next one
+        paragraphs = [[p for p in section.split("\n\n") if p.strip()] or [section] for section in sections]
+        pending = list(range(n_sections - 1))
+        while pending:
+            # the transitions on both sides of a single-paragraph section edit the same paragraph, the second one
+            # waits for the first and is written against the edited paragraph
+            ready = [b for b in pending if not (b - 1 in pending and len(paragraphs[b]) == 1)]
+
+            # NOTE: the backend needs to 'threading' in order to avoid Pickle errors as joblib attempts to pickle all inputs and data to run things in parallel and causes issue with the comfy progress bar object
+            stitched = Parallel(backend="threading", n_jobs=num_processes)(delayed(self.stitch_transition)(
+                prompt_data['style_guide'],
+                paragraphs[b][-1],
+                paragraphs[b + 1][0]
+            ) for b in ready)
+
+            for b, (ending, opening) in zip(ready, stitched):
+                paragraphs[b][-1] = ending
+                paragraphs[b + 1][0] = opening
+            pending = [b for b in pending if b not in ready]
+        pbar.step_done()
+
+        generated_story = "\n\n".join("\n\n".join(section_paragraphs) for section_paragraphs in paragraphs)
+        generated_characters = outline['characters']
+        llm_reasoning = f"{outline['reasoning']}\n\nThe story was outlined first and written in {n_sections} sections in parallel, then the transitions between the sections were smoothed."
+
+        return generated_story, generated_characters, llm_reasoning
@@ -29,7 +29,7 @@ class TwoTextToText(BaseNode):
             },
             "optional":
             {
-                "model": (["gpt-4o", "gpt-4o-mini"], "COMBO"),
+                "model": (["gpt-4o", "gpt-4o-mini", "auto"], "COMBO"),
                 "temp": ("FLOAT", {
                     "default": 0.0,
                     "min": 0.0,
@@ -74,7 +74,7 @@ class TwoTextToText(BaseNode):
         sys_prompt = variable_substitution(TwoTextToText.__DEFAULT_PROMPT_SYS, prompt_data)
         human_prompt = variable_substitution(TwoTextToText.__DEFAULT_PROMPT_HUMAN, prompt_data)
 
-        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params)
+        parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="transform")
 
         updated_text = parsed_response['updated_text']
         llm_reasoning = parsed_response['reasoning']
@@ -87,7 +87,6 @@ Follow the custom instructions carefully as they contain important details about
         llm_params["temperature"] = temp
 
         extra_params = {}
-        extra_params["model"] = "gpt-4o"
 
         n_objects = len(object_list)
         pbar = comfy.utils.ProgressBar(n_objects)
@@ -112,7 +111,7 @@ Follow the custom instructions carefully as they contain important details about
             sys_prompt = variable_substitution(TransformObjectList.__DEFAULT_PROMPT_SYS, prompt_data)
             human_prompt = variable_substitution(TransformObjectList.__DEFAULT_PROMPT_HUMAN, prompt_data)
 
-            parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params)
+            parsed_response = llm_call_with_json_parsing(sys_prompt, human_prompt, llm_params, extra_params, call_class="transform")
 
             updated_object_description = parsed_response['description']
             LLM_reasoning = parsed_response['reasoning']
@@ -0,0 +1,141 @@
+import os
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import torch
+from PIL import Image
+
+from ..sdk.metrics import count_cache_lookup
+
+# Stable fingerprints of node inputs (strings, numbers, lists, dicts, tensors, arrays, PIL images) for memoizing nodes.
+#
+# Tensors are hashed over their full content, but a digest is remembered per tensor object (as long as it is
+# alive and not modified in place) so passing the same image batch through several prompts only hashes it once.
+
+FINGERPRINT_SIZE = 16 # bytes of the blake2b digest
+
+_tensor_digests = {}  # id(tensor) -> (weakref to the tensor, tensor._version, digest)
+_tensor_digests_lock = threading.Lock()
+
+
+def _hash_array_bytes(h, array: np.ndarray):
+    h.update(f"{array.dtype}{array.shape}".encode("utf-8"))
+    h.update(np.ascontiguousarray(array).data)
+
+
+def _tensor_digest(tensor: torch.Tensor) -> bytes:
+    key = id(tensor)
+    with _tensor_digests_lock:
+        cached = _tensor_digests.get(key)
+    if cached is not None:
+        ref, version, digest = cached
+        if ref() is tensor and version == tensor._version:
+            return digest
+
+    h = hashlib.blake2b(digest_size=FINGERPRINT_SIZE)
+    t = tensor.detach().cpu()
+    if t.dtype == torch.bfloat16:
+        t = t.float() # numpy has no bfloat16
+    _hash_array_bytes(h, t.numpy())
+    digest = h.digest()
+
+    def forget(_ref, key=key):
+        with _tensor_digests_lock:
+            if _tensor_digests.get(key, (None,))[0] is _ref:
+                del _tensor_digests[key]
+
+    with _tensor_digests_lock:
+        _tensor_digests[key] = (weakref.ref(tensor, forget), tensor._version, digest)
+    return digest
+
+
+def _update(h, value):
+    # every value is prefixed with its type so e.g. 1, 1.0, "1" and [1] all hash differently
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        h.update(f"{type(value).__name__}:{value!r};".encode("utf-8"))
+    elif isinstance(value, torch.Tensor):
+        h.update(b"tensor:")
+        h.update(_tensor_digest(value))
+    elif isinstance(value, np.ndarray):
+        h.update(b"ndarray:")
+        _hash_array_bytes(h, value)
+    elif isinstance(value, Image.Image):
+        h.update(f"image:{value.mode}{value.size}:".encode("utf-8"))
+        h.update(value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(f"{type(value).__name__}[{len(value)}]:".encode("utf-8"))
+        for item in value:
+            _update(h, item)
+    elif isinstance(value, dict):
+        h.update(f"dict[{len(value)}]:".encode("utf-8"))
+        for k in sorted(value, key=repr):
+            _update(h, k)
+            _update(h, value[k])
+    else:
+        h.update(f"{type(value).__name__}:{value!r};".encode("utf-8"))
+
+
+def fingerprint(*values) -> str:
+    """
+        Hex digest of the contents of values. Equal contents give equal fingerprints across node instances and prompts.
+    """
+    h = hashlib.blake2b(digest_size=FINGERPRINT_SIZE)
+    for value in values:
+        _update(h, value)
+    return h.hexdigest()
+
+
+# Results of deterministic node executions, shared by all instances of a node (see BaseNode).
+# MPX_NODE_MEMO_MB=256   memory the kept results may take up (image batches count with their full size), 0 turns the memo off
+
+_node_results = OrderedDict() # key -> (result, size in bytes)
+_node_results_bytes = 0
+_node_results_lock = threading.Lock()
+
+
+def _size_in_bytes(value) -> int:
+    # close enough to tell a few strings from an image batch
+    if isinstance(value, torch.Tensor):
+        return value.element_size() * value.nelement()
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, Image.Image):
+        return value.width * value.height * len(value.getbands())
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(_size_in_bytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_size_in_bytes(k) + _size_in_bytes(v) for k, v in value.items())
+    return 8
+
+
+def get_memoized_result(key: str):
+    """
+        (True, result) if a node execution with this fingerprint has been memoized, otherwise (False, None).
+    """
+    with _node_results_lock:
+        found = key in _node_results
+        result = _node_results[key][0] if found else None
+        if found:
+            _node_results.move_to_end(key)
+    count_cache_lookup("node_results", found)
+    return found, result
+
+
+def memoize_result(key: str, result):
+    global _node_results_bytes
+    max_bytes = float(os.getenv("MPX_NODE_MEMO_MB", 256)) * 1024 * 1024
+    size = _size_in_bytes(result)
+    if max_bytes <= 0 or size > max_bytes:
+        return
+    with _node_results_lock:
+        if key in _node_results:
+            _node_results_bytes -= _node_results.pop(key)[1]
+        _node_results[key] = (result, size)
+        _node_results_bytes += size
+        while _node_results_bytes > max_bytes:
+            _node_results_bytes -= _node_results.popitem(last=False)[1][1]
@@ -4,6 +4,8 @@ import hjson
 
 from ..sdk.llms.call import llm_call
 from ..sdk.llms.image_query import image_query, image_query_from_urls
+from ..sdk.metrics import count_retry
+from ..sdk.cancellation import OperationCancelled
 
 
 def hash_node_inputs(inputs: dict) -> str:
@@ -56,30 +58,53 @@ def parse_llm_json(s: str):
 
 def variable_substitution(prompt: str, data: dict):
     return prompt.format(**data)
+
+
+def is_llm_json(s: str) -> bool:
+    """
+    True if parse_llm_json() can parse s, used so unparseable answers are not shared with other workers.
+    """
+    try:
+        parse_llm_json(s)
+        return True
+    except Exception:
+        return False
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough number of LLM tokens in text (about 4 characters per token for English), without running a tokenizer.
+    """
+    return max(1, (len(str(text)) + 3) // 4)
     
 
 def llm_call_with_json_parsing(sys_prompt: str, 
                                human_prompt: str, 
                                llm_params: dict, 
                                extra_params: dict,
-                               max_retry_attempts: int = 3):
+                               max_retry_attempts: int = 3,
+                               call_class: str = None):
     call_success = False
     attempt = 1
     while (call_success == False) and (attempt <= max_retry_attempts):
         try:
-            llm_response = llm_call(sys_prompt, human_prompt, llm_params, extra_params)
+            llm_response = llm_call(sys_prompt, human_prompt, llm_params, extra_params, call_class=call_class, is_valid=is_llm_json)
             parsed_response = parse_llm_json(llm_response)
             call_success = True
             return parsed_response
         
+        except OperationCancelled:
+            raise
+
         except Exception as e:
             print(f"llm_call_with_json_parsing() -- Error:\n{e}\nwhen trying to obtain a valid JSON response - retrying...")
+            count_retry("llm_call_with_json_parsing")
             continue
 
         finally:
             attempt += 1
-            if attempt > max_retry_attempts:
-                raise Exception(f"llm_call_with_json_parsing() -- Failed to get a valid response after {max_retry_attempts} attempts!")
+
+    raise Exception(f"llm_call_with_json_parsing() -- Failed to get a valid response after {max_retry_attempts} attempts!")
 
 def image_query_with_with_json_parsing(query: str,
                                        input_images: list,
@@ -92,11 +117,11 @@ def image_query_with_with_json_parsing(query: str,
         try:
             # first attempt? need to get the image urls that were uploaded for possible retry attempts
             if input_image_urls is None:
-                llm_results, input_image_urls = image_query(query, input_images, return_image_urls=True)
+                llm_results, input_image_urls = image_query(query, input_images, return_image_urls=True, is_valid=is_llm_json)
 
             # re-use the uploaded image URLs in the retry attempts
             else:
-                llm_results = image_query_from_urls(query, input_image_urls)
+                llm_results = image_query_from_urls(query, input_image_urls, is_valid=is_llm_json)
 
             parsed_response = parse_llm_json(llm_results)
             call_success = True
@@ -104,9 +129,36 @@ def image_query_with_with_json_parsing(query: str,
 
         except Exception as e:
             print(f"image_query_with_with_json_parsing() -- Error:\n{e}\nwhen trying to obtain a valid JSON response - retrying...")
+            count_retry("image_query_with_with_json_parsing")
             continue
 
         finally:
             attempt += 1
             if attempt > max_retry_attempts:
                 raise Exception(f"image_query_with_with_json_parsing() -- Failed to get a valid response after {max_retry_attempts} attempts!")
+
+def image_query_from_urls_with_json_parsing(query: str,
+                                            input_image_urls: list,
+                                            max_retry_attempts: int = 3,
+                                            **kwargs):
+    """
+    Same as image_query_with_with_json_parsing() but for images that have already been uploaded.
+    """
+    call_success = False
+    attempt = 1
+    while (call_success == False) and (attempt <= max_retry_attempts):
+        try:
+            llm_results = image_query_from_urls(query, input_image_urls, is_valid=is_llm_json, **kwargs)
+            parsed_response = parse_llm_json(llm_results)
+            call_success = True
+            return parsed_response
+
+        except Exception as e:
+            print(f"image_query_from_urls_with_json_parsing() -- Error:\n{e}\nwhen trying to obtain a valid JSON response - retrying...")
+            count_retry("image_query_from_urls_with_json_parsing")
+            continue
+
+        finally:
+            attempt += 1
+            if attempt > max_retry_attempts and not call_success:
+                raise Exception(f"image_query_from_urls_with_json_parsing() -- Failed to get a valid response after {max_retry_attempts} attempts!")
@@ -0,0 +1,53 @@
+import torch
+import torch.nn.functional as F
+
+
+DHASH_SIZE = 8 # 8 x 8 = 64 bit hashes
+
+
+def compute_dhash_batch(images: torch.Tensor, hash_size: int = DHASH_SIZE) -> torch.Tensor:
+    """
+        Compute the difference hash (dHash) of every image in a (B x H x W x C) or (H x W x C) tensor at once.
+        Returns a (B x hash_size*hash_size) bool tensor.
+    """
+    if images.ndim == 3:
+        images = images.unsqueeze(0)
+
+    rgb = images[..., :3].float()
+    if rgb.shape[-1] == 3:
+        gray = rgb[..., 0] * 0.299 + rgb[..., 1] * 0.587 + rgb[..., 2] * 0.114
+    else:
+        gray = rgb.mean(dim=-1)
+
+    # (B x H x W) -> (B x 1 x hash_size x hash_size+1) so each row has hash_size horizontal gradients
+    small = F.interpolate(gray.unsqueeze(1), size=(hash_size, hash_size + 1), mode="area").squeeze(1)
+    return (small[:, :, 1:] > small[:, :, :-1]).reshape(small.shape[0], -1)
+
+
+def hamming_distance_matrix(hashes: torch.Tensor) -> torch.Tensor:
+    """
+        (B x N) bool tensor -> (B x B) int tensor of pairwise Hamming distances
+    """
+    return (hashes.unsqueeze(1) != hashes.unsqueeze(0)).sum(dim=-1)
+
+
+def cluster_near_duplicate_images(images: torch.Tensor, max_hamming_distance: int) -> list:
+    """
+        Group images whose dHashes are within max_hamming_distance of each other.
+        Returns, for every image, the index of the first image in its cluster which can stand in for the whole cluster.
+    """
+    hashes = compute_dhash_batch(images)
+    close = (hamming_distance_matrix(hashes) <= max_hamming_distance).tolist()
+
+    # an image is only compared with the earlier images that are kept, so closeness doesn't chain
+    # (a ~ b ~ c with a far from c would otherwise put a and c in one cluster)
+    kept = []
+    representative = []
+    for i in range(len(close)):
+        match = next((k for k in kept if close[k][i]), None)
+        if match is None:
+            kept.append(i)
+            representative.append(i)
+        else:
+            representative.append(match)
+    return representative
@@ -0,0 +1,100 @@
+import torch
+
+
+# a pixel counts as white background when all of its color channels are bright and roughly equal
+WHITE_MIN_VALUE = 0.90
+WHITE_MAX_CHROMA = 0.08
+
+# fraction of the border that has to be white before the background is considered white at all
+BORDER_WHITE_FAIL_BELOW = 0.60
+
+# fraction of a single edge covered by the foreground before the object is considered cut-off by that edge
+EDGE_FOREGROUND_FAIL_ABOVE = 0.05
+
+
+def _as_batch(images: torch.Tensor) -> torch.Tensor:
+    """
+        Return a (B x H x W x 3) view of either a (B x H x W x C) or (H x W x C) tensor, dropping any alpha channel.
+    """
+    if images.ndim == 3:
+        images = images.unsqueeze(0)
+    return images[..., :3]
+
+
+def compute_white_mask(images: torch.Tensor) -> torch.Tensor:
+    """
+        (B x H x W x C) tensor with pixel values from 0.0 to 1.0 -> (B x H x W) bool tensor which is True for near-white pixels
+    """
+    rgb = _as_batch(images)
+    channel_min = rgb.amin(dim=-1)
+    channel_max = rgb.amax(dim=-1)
+    return (channel_min >= WHITE_MIN_VALUE) & ((channel_max - channel_min) <= WHITE_MAX_CHROMA)
+
+
+def compute_border_stats(images: torch.Tensor, border_fraction: float = 0.02) -> dict:
+    """
+        Compute per-image border statistics for a whole batch at once.
+
+        Returns a dict of (B,) tensors:
+            border_white_fraction: fraction of pixels within the border band that are near-white
+            edge_foreground_fraction: largest fraction of non-white pixels on any one of the four outermost rows/columns
+    """
+    white = compute_white_mask(images)
+    B, H, W = white.shape
+
+    band = max(1, int(round(min(H, W) * border_fraction)))
+    border = torch.zeros((H, W), dtype=torch.bool, device=white.device)
+    border[:band, :] = True
+    border[-band:, :] = True
+    border[:, :band] = True
+    border[:, -band:] = True
+
+    border_white_fraction = white[:, border].float().mean(dim=1)
+
+    foreground = ~white
+    edge_foreground_fraction = torch.stack([
+        foreground[:, 0, :].float().mean(dim=1),
+        foreground[:, -1, :].float().mean(dim=1),
+        foreground[:, :, 0].float().mean(dim=1),
+        foreground[:, :, -1].float().mean(dim=1),
+    ], dim=1).amax(dim=1)
+
+    return {
+        "border_white_fraction": border_white_fraction,
+        "edge_foreground_fraction": edge_foreground_fraction,
+    }
+
+
+def run_local_prechecks(images: torch.Tensor) -> list:
+    """
+        Decide the "blank white background" and "fully visible, not cut-off by the edge" checklist items from pixels.
+
+        Returns one dict per image with the keys:
+            has_blank_white_background: False if the check failed locally, None if it needs the vision model
+            object_is_fully_visible: False if the check failed locally, None if it needs the vision model
+            reasoning: explanation of any failed item
+    """
+    stats = compute_border_stats(images)
+    border_white_fraction = stats["border_white_fraction"].tolist()
+    edge_foreground_fraction = stats["edge_foreground_fraction"].tolist()
+
+    results = []
+    for white_frac, edge_frac in zip(border_white_fraction, edge_foreground_fraction):
+        result = { "has_blank_white_background": None, "object_is_fully_visible": None, "reasoning": "" }
+
+        if white_frac < BORDER_WHITE_FAIL_BELOW:
+            result["has_blank_white_background"] = False
+            result["reasoning"] += f"Only {white_frac:.0%} of the image border is white. "
+
+        # the foreground mask is only meaningful when the background is actually white
+        elif edge_frac > EDGE_FOREGROUND_FAIL_ABOVE:
+            result["object_is_fully_visible"] = False
+            result["reasoning"] += f"The object covers {edge_frac:.0%} of one of the image edges so part of it is cut-off. "
+
+        results.append(result)
+
+    return results
+
+
+def precheck_failed(precheck: dict) -> bool:
+    return precheck["has_blank_white_background"] == False or precheck["object_is_fully_visible"] == False
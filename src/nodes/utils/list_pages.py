@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+
+# Server-side storage of the rows shown by ShowList.
+#
+# Instead of sending a whole list to the frontend in one websocket message, ShowList registers its rows here under
+# a handle and the widget fetches the pages it scrolls to through the /mpx_show_list route.
+# Only the latest list of every node is kept, and at most MAX_REGISTERED_LISTS lists overall. For a list that was
+# dropped (e.g. shown again from ComfyUI's cache) the widget falls back to the first page sent with the execution message.
+
+MAX_REGISTERED_LISTS = 64
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 2000
+
+_lists = OrderedDict()      # handle -> list of rows
+_handle_per_node = {}       # node id -> handle of its latest list
+_lists_lock = threading.Lock()
+
+
+def register_list(node_id: str, fingerprint: str, rows: list) -> str:
+    """
+        Store the rows of a node's list and return the handle the frontend fetches pages with.
+    """
+    handle = f"{node_id}-{fingerprint[:16]}"
+    with _lists_lock:
+        previous_handle = _handle_per_node.get(node_id)
+        if previous_handle is not None and previous_handle != handle:
+            _lists.pop(previous_handle, None)
+        _handle_per_node[node_id] = handle
+        _lists[handle] = rows
+        _lists.move_to_end(handle)
+        while len(_lists) > MAX_REGISTERED_LISTS:
+            _lists.popitem(last=False)
+    return handle
+
+
+def get_list_page(handle: str, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE) -> dict | None:
+    """
+        Rows [offset, offset + limit) of a registered list, or None if the handle is unknown (or was dropped).
+    """
+    with _lists_lock:
+        rows = _lists.get(handle)
+        if rows is None:
+            return None
+        _lists.move_to_end(handle)
+
+    offset = max(0, offset)
+    limit = max(0, min(limit, MAX_PAGE_SIZE))
+    return {
+        "handle": handle,
+        "total": len(rows),
+        "offset": offset,
+        "rows": rows[offset:offset + limit],
+    }
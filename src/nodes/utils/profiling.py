@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Opt-in sampling profiler around node execution (every thread, idle waits left out), written to
+# <user directory>/profiles/. Off unless MPX_PROFILE=1, sampled every MPX_PROFILE_INTERVAL_MS.
+
+PROFILES_SUBFOLDER = "profiles"
+RECENT_PROFILES = 50
+MAX_STACK_DEPTH = 64
+
+# (file name, function) of frames that mean the thread is blocked rather than using the CPU
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "readinto"),
+    ("ssl.py", "read"),
+    ("ssl.py", "recv_into"),
+    ("pool.py", "worker"),
+    ("thread.py", "_worker"),
+}
+
+_enabled_override = None
+_recent_profiles = deque(maxlen=RECENT_PROFILES)
+_recent_profiles_lock = threading.Lock()
+_active_profiler = None
+
+
+def is_profiling_enabled() -> bool:
+    if _enabled_override is not None:
+        return _enabled_override
+    return os.getenv("MPX_PROFILE", "0") == "1"
+
+
+def set_profiling_enabled(enabled: bool | None):
+    """
+        Turn profiling on or off at runtime (from MPX Settings). None goes back to the MPX_PROFILE environment variable.
+    """
+    global _enabled_override
+    _enabled_override = enabled
+
+
+def _frame_key(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+class SamplingProfiler():
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self.self_samples = Counter()       # function -> samples where it was on top of the stack
+        self.total_samples = Counter()      # function -> samples where it was anywhere on the stack
+        self.stacks = Counter()             # "outer;...;inner" -> samples
+        self.n_samples = 0
+        self.n_idle_samples = 0
+        self.started_at = None
+        self.duration_s = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mpx-profiler", daemon=True)
+
+    def _sample(self):
+        own_thread_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+            if _is_idle(frame):
+                self.n_idle_samples += 1
+                continue
+
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            stack.reverse()
+
+            self.n_samples += 1
+            self.self_samples[stack[-1]] += 1
+            for function in set(stack):
+                self.total_samples[function] += 1
+            self.stacks[";".join(stack)] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self._sample()
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration_s = time.time() - self.started_at
+
+    def top_functions(self, n: int = 20) -> list:
+        return [{
+            "function": function,
+            "self_samples": count,
+            "self_percent": 100.0 * count / self.n_samples if self.n_samples else 0.0,
+            "total_samples": self.total_samples[function],
+        } for function, count in self.self_samples.most_common(n)]
+
+
+def _get_profiles_directory() -> str:
+    from ..sdk.sdk_client import get_user_data_path
+    user_data_path = get_user_data_path()
+    if user_data_path is None:
+        user_data_path = tempfile.gettempdir()
+    return os.path.join(user_data_path, PROFILES_SUBFOLDER)
+
+
+def save_profile(node_name: str, profiler: SamplingProfiler) -> str:
+    profiles_directory = _get_profiles_directory()
+    os.makedirs(profiles_directory, exist_ok=True)
+    timestamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(profiler.started_at))
+    base_path = os.path.join(profiles_directory, f"{node_name}_{timestamp}")
+
+    with open(f"{base_path}.json", "w") as f:
+        json.dump({
+            "node": node_name,
+            "started_at": profiler.started_at,
+            "duration_s": profiler.duration_s,
+            "interval_s": profiler.interval_s,
+            "samples": profiler.n_samples,
+            "idle_samples": profiler.n_idle_samples,
+            "top_functions": profiler.top_functions(100),
+        }, f, indent=2)
+
+    # collapsed stacks, one "outer;...;inner count" line per distinct stack
+    with open(f"{base_path}.folded", "w") as f:
+        for stack, count in profiler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    return f"{base_path}.json"
+
+
+@contextmanager
+def profile_node(node_name: str):
+    """
+        Sample the stacks of all threads while the body of the with-statement runs, if profiling is enabled.
+        Nested nodes (e.g. a node calling another node's execute) are included in the outermost profile.
+    """
+    global _active_profiler
+    if not is_profiling_enabled() or _active_profiler is not None:
+        yield
+        return
+
+    profiler = SamplingProfiler(float(os.getenv("MPX_PROFILE_INTERVAL_MS", 5)) / 1000.0)
+    _active_profiler = profiler
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        _active_profiler = None
+        with _recent_profiles_lock:
+            _recent_profiles.append((node_name, profiler))
+        try:
+            profile_path = save_profile(node_name, profiler)
+            print(f"[mpx] {node_name}: profile written to {profile_path}")
+        except Exception as e:
+            print(f"[mpx] {node_name}: unable to write profile: {e}")
+
+
+def get_profile_summary(n: int = 20) -> dict:
+    """
+        Hot functions over the most recent profiled executions, overall and per node.
+    """
+    with _recent_profiles_lock:
+        recent = list(_recent_profiles)
+
+    overall = Counter()
+    per_node = {}
+    n_samples = 0
+    for node_name, profiler in recent:
+        overall.update(profiler.self_samples)
+        n_samples += profiler.n_samples
+        node_summary = per_node.setdefault(node_name, { "executions": 0, "duration_s": 0.0, "samples": 0, "self_samples": Counter() })
+        node_summary["executions"] += 1
+        node_summary["duration_s"] += profiler.duration_s
+        node_summary["samples"] += profiler.n_samples
+        node_summary["self_samples"].update(profiler.self_samples)
+
+    def top(counter, total):
+        return [{ "function": f, "self_samples": c, "self_percent": 100.0 * c / total if total else 0.0 } for f, c in counter.most_common(n)]
+
+    return {
+        "enabled": is_profiling_enabled(),
+        "executions": len(recent),
+        "samples": n_samples,
+        "top_functions": top(overall, n_samples),
+        "nodes": {
+            node_name: {
+                "executions": s["executions"],
+                "duration_s": s["duration_s"],
+                "samples": s["samples"],
+                "top_functions": top(s["self_samples"], s["samples"]),
+            } for node_name, s in per_node.items()
+        },
+    }
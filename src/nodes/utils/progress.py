@@ -0,0 +1,24 @@
+import threading
+
+import comfy.utils
+
+
+class StepProgress():
+    """
+    A ComfyUI progress bar of n_steps steps that the threads of one node execution advance as they finish their work.
+    """
+    def __init__(self, n_steps: int):
+        self.n_steps = n_steps
+        self.n_steps_done = 0
+        self._lock = threading.Lock()
+        self._progress_bar = comfy.utils.ProgressBar(n_steps)
+
+    def step_done(self):
+        with self._lock:
+            self.n_steps_done += 1
+            self._progress_bar.update_absolute(self.n_steps_done, self.n_steps)
+
+    def finish(self):
+        with self._lock:
+            self.n_steps_done = self.n_steps
+            self._progress_bar.update_absolute(self.n_steps, self.n_steps)
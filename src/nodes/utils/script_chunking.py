@@ -0,0 +1,197 @@
+import re
+import difflib
+
+# Helpers for breaking down long scripts (see TextToScriptBreakdown) and other long texts in parts.
+#
+# Scripts are split at scene headings into chunks of whole scenes, and the characters and props found in the
+# different chunks are merged again by name: entries whose names are (nearly) the same are merged right away,
+# pairs that might or might not be the same entity ("JOHN" and "JOHN SMITH", "the old car" and "the car")
+# are returned separately so they can be decided by an LLM.
+
+# INT. KITCHEN - NIGHT / EXT. / INT./EXT. / I/E. / EST. / SCENE 12 / numbered headings like "12 INT. KITCHEN"
+SCENE_HEADING = re.compile(r"^\s*(\d+[A-Z]?\.?\s+)?(INT\.?/EXT\.?|EXT\.?/INT\.?|I/E\.?|INT\.|EXT\.|EST\.|SCENE\s+\d+)", re.IGNORECASE | re.MULTILINE)
+
+# separators between a name and its description, e.g. "JOHN - a detective", "Lamp: brass, old", "Mary (30s)"
+NAME_DESCRIPTION_SEPARATOR = re.compile(r"\s+[-–—]\s+|:|\(|,")
+IGNORED_NAME_WORDS = {"a", "an", "the", "his", "her", "their", "its"}
+
+SAME_NAME_SIMILARITY = 0.9      # at or above: merged without asking
+AMBIGUOUS_NAME_SIMILARITY = 0.75 # from here up to SAME_NAME_SIMILARITY: asked
+
+
+def _count_words(text: str) -> int:
+    return len(text.split())
+
+
+def split_script_into_scenes(script_text: str) -> list:
+    """
+        Split a script at its scene headings. Text before the first heading (title page, cold open) is its own scene.
+    """
+    starts = [m.start() for m in SCENE_HEADING.finditer(script_text)]
+    if not starts or starts[0] != 0:
+        starts = [0] + starts
+    scenes = [script_text[start:end] for start, end in zip(starts, starts[1:] + [len(script_text)])]
+    return [scene for scene in scenes if scene.strip()]
+
+
+def _split_long_scene(scene: str, max_chunk_words: int) -> list:
+    # a scene that is longer than a chunk on its own is split between paragraphs
+    parts = []
+    current = []
+    current_words = 0
+    for paragraph in re.split(r"\n\s*\n", scene):
+        n_words = _count_words(paragraph)
+        if current and current_words + n_words > max_chunk_words:
+            parts.append("\n\n".join(current))
+            current, current_words = [], 0
+        current.append(paragraph)
+        current_words += n_words
+    if current:
+        parts.append("\n\n".join(current))
+    return parts
+
+
+def split_script_into_chunks(script_text: str, max_chunk_words: int) -> list:
+    """
+        Group consecutive scenes into chunks of at most max_chunk_words words (unless a single paragraph is longer).
+    """
+    chunks = []
+    current = []
+    current_words = 0
+    for scene in split_script_into_scenes(script_text):
+        for part in _split_long_scene(scene, max_chunk_words):
+            n_words = _count_words(part)
+            if current and current_words + n_words > max_chunk_words:
+                chunks.append("".join(current))
+                current, current_words = [], 0
+            current.append(part)
+            current_words += n_words
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def split_text_with_overlap(text: str, max_chunk_words: int, overlap_paragraphs: int = 1) -> list:
+    """
+        Split text at paragraph boundaries into chunks of at most max_chunk_words words (unless a single paragraph is longer).
+        Every chunk after the first starts with the last overlap_paragraphs paragraphs of the previous one, so items
+        that are described across a chunk boundary are complete in at least one chunk.
+    """
+    paragraphs = [p for p in re.split(r"\n\s*\n", text) if p.strip()]
+    chunks = []
+    start = 0
+    while start < len(paragraphs):
+        end = start
+        n_words = 0
+        while end < len(paragraphs) and (end == start or n_words + _count_words(paragraphs[end]) <= max_chunk_words):
+            n_words += _count_words(paragraphs[end])
+            end += 1
+        chunks.append("\n\n".join(paragraphs[start:end]))
+        if end >= len(paragraphs):
+            break
+        # step back for the overlap, but always move forward
+        start = max(start + 1, end - overlap_paragraphs)
+    return chunks
+
+
+def name_key(entry: str) -> str:
+    """
+        The normalized name part of a "NAME - description" entry.
+    """
+    name = NAME_DESCRIPTION_SEPARATOR.split(str(entry).strip(), maxsplit=1)[0]
+    words = re.sub(r"[^\w\s']", " ", name.lower()).split()
+    return " ".join(w for w in words if w not in IGNORED_NAME_WORDS)
+
+
+def name_similarity(key_a: str, key_b: str) -> float:
+    return difflib.SequenceMatcher(None, key_a, key_b).ratio()
+
+
+def canonicalize_names(entries: list) -> tuple:
+    """
+        Merge the entries (e.g. characters found in different chunks of a script) that name the same thing.
+
+        Returns (groups, ambiguous_pairs):
+            groups          lists of indices into entries that were merged, in order of first appearance
+            ambiguous_pairs (group_a, group_b) index pairs into groups whose names are similar but not clearly the same
+    """
+    keys = [name_key(e) for e in entries]
+
+    # entries with the same key are merged first so similar names only have to be compared once per distinct key
+    group_of_key = {}
+    groups = []
+    for idx, key in enumerate(keys):
+        if key not in group_of_key:
+            group_of_key[key] = len(groups)
+            groups.append([])
+        groups[group_of_key[key]].append(idx)
+    group_keys = list(group_of_key)
+
+    def similarity(a, b):
+        if not group_keys[a] or not group_keys[b]:
+            return 0.0
+        return name_similarity(group_keys[a], group_keys[b])
+
+    # a group is only merged into an earlier group that is kept, so similarity doesn't chain
+    # ("Dr. Smith" ~ "Dr. Smyth" ~ "Mr. Smyth" with "Dr. Smith" !~ "Mr. Smyth")
+    representative = list(range(len(groups)))
+    kept = []
+    for g in range(len(groups)):
+        match = next((k for k in kept if similarity(k, g) >= SAME_NAME_SIMILARITY), None)
+        if match is None:
+            kept.append(g)
+        else:
+            representative[g] = match
+
+    # similar names that ended up apart (including the ones that would only have merged by chaining) are asked
+    ambiguous = []
+    for a in range(len(groups)):
+        for b in range(a + 1, len(groups)):
+            key_a, key_b = group_keys[a], group_keys[b]
+            if representative[a] == representative[b] or not key_a or not key_b:
+                continue
+            if similarity(a, b) >= AMBIGUOUS_NAME_SIMILARITY or set(key_a.split()) <= set(key_b.split()) or set(key_b.split()) <= set(key_a.split()):
+                ambiguous.append((a, b))
+
+    merged = { k: [] for k in kept }
+    for g in range(len(groups)):
+        merged[representative[g]].extend(groups[g])
+    position = { k: i for i, k in enumerate(kept) }
+
+    ambiguous_pairs = sorted({ tuple(sorted((position[representative[a]], position[representative[b]]))) for a, b in ambiguous })
+    return [sorted(merged[k]) for k in kept], ambiguous_pairs
+
+
+def ambiguous_clusters(n_groups: int, ambiguous_pairs: list) -> list:
+    """
+        Connected components (with more than one group) of the ambiguous pairs, i.e. the sets of groups an LLM has to decide on together.
+    """
+    neighbours = {}
+    for a, b in ambiguous_pairs:
+        neighbours.setdefault(a, set()).add(b)
+        neighbours.setdefault(b, set()).add(a)
+
+    clusters = []
+    seen = set()
+    for start in range(n_groups):
+        if start in seen or start not in neighbours:
+            continue
+        cluster = []
+        stack = [start]
+        seen.add(start)
+        while stack:
+            g = stack.pop()
+            cluster.append(g)
+            for n in neighbours[g]:
+                if n not in seen:
+                    seen.add(n)
+                    stack.append(n)
+        clusters.append(sorted(cluster))
+    return clusters
+
+
+def pick_canonical_entry(entries: list, indices: list) -> str:
+    """
+        The most descriptive of the merged entries.
+    """
+    return max((entries[i] for i in indices), key=lambda entry: len(str(entry)))
@@ -0,0 +1,107 @@
+import re
+import hashlib
+import unicodedata
+
+import numpy as np
+
+# Local near-duplicate detection for short texts, e.g. list items extracted from overlapping chunks of a document.
+#
+# Items are first compared by their normalized text (case, punctuation, numbering and whitespace removed). The
+# remaining items are compared by MinHash signatures of their character shingles: locality-sensitive hashing
+# over bands of the signature finds candidate pairs without comparing every pair, and candidates whose estimated
+# Jaccard similarity reaches the threshold are treated as duplicates.
+
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16 # NUM_PERMUTATIONS / LSH_BANDS rows per band
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+# small enough that (a * hash + b) of 32 bit shingle hashes fits in uint64
+_MERSENNE_PRIME = (1 << 31) - 1
+
+LEADING_NUMBERING = re.compile(r"^\s*(\d+[\.\)]|[-*•])\s+")
+
+
+def normalize_text(text: str) -> str:
+    """
+        Lowercase, without accents, leading list numbering, punctuation and repeated whitespace.
+    """
+    text = LEADING_NUMBERING.sub("", str(text))
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    if len(text) <= size:
+        return { text }
+    return { text[i:i + size] for i in range(len(text) - size + 1) }
+
+
+def _hash_shingle(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+class MinHasher():
+    def __init__(self, num_permutations: int = NUM_PERMUTATIONS, seed: int = 1):
+        # (a * x + b) mod p permutations with coefficients derived from the seed, so signatures are stable across runs
+        a, b = [], []
+        for i in range(num_permutations):
+            digest = hashlib.blake2b(f"{seed}:{i}".encode("utf-8"), digest_size=16).digest()
+            a.append(int.from_bytes(digest[:8], "little") % (_MERSENNE_PRIME - 1) + 1)
+            b.append(int.from_bytes(digest[8:], "little") % _MERSENNE_PRIME)
+        self._a = np.array(a, dtype=np.uint64)[:, None]
+        self._b = np.array(b, dtype=np.uint64)[:, None]
+
+    def signature(self, text: str) -> tuple:
+        hashes = np.fromiter((_hash_shingle(s) for s in shingles(text)), dtype=np.uint64)
+        return tuple(((self._a * hashes[None, :] + self._b) % _MERSENNE_PRIME).min(axis=1).tolist())
+
+
+def estimated_jaccard(signature_a: tuple, signature_b: tuple) -> float:
+    return sum(1 for x, y in zip(signature_a, signature_b) if x == y) / len(signature_a)
+
+
+def find_near_duplicates(texts: list, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> list:
+    """
+        For every text, the index of the first text it is a (near-)duplicate of, or its own index.
+    """
+    normalized = [normalize_text(t) for t in texts]
+    representative = list(range(len(texts)))
+
+    # exact duplicates after normalization
+    first_of_normalized = {}
+    for idx, text in enumerate(normalized):
+        representative[idx] = first_of_normalized.setdefault(text, idx)
+    distinct = [idx for idx in range(len(texts)) if representative[idx] == idx and normalized[idx]]
+
+    # near duplicates among the distinct texts
+    hasher = MinHasher()
+    signatures = { idx: hasher.signature(normalized[idx]) for idx in distinct }
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    buckets = {}
+    for idx in distinct:
+        for band in range(LSH_BANDS):
+            buckets.setdefault((band, signatures[idx][band * rows:(band + 1) * rows]), []).append(idx)
+
+    # a text is only compared with earlier texts that are kept, so similarity doesn't chain (a ~ b ~ c with a !~ c)
+    kept = set()
+    for idx in distinct:
+        candidates = set()
+        for band in range(LSH_BANDS):
+            candidates.update(c for c in buckets[(band, signatures[idx][band * rows:(band + 1) * rows])] if c < idx and c in kept)
+        match = next((c for c in sorted(candidates) if estimated_jaccard(signatures[c], signatures[idx]) >= threshold), None)
+        if match is None:
+            kept.add(idx)
+        else:
+            representative[idx] = match
+    return [representative[representative[idx]] for idx in range(len(texts))]
+
+
+def dedupe_texts(texts: list, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> list:
+    """
+        The texts without (near-)duplicates, in their original order. Of every group of duplicates the first one is kept.
+    """
+    representative = find_near_duplicates(texts, threshold)
+    return [text for idx, text in enumerate(texts) if representative[idx] == idx]
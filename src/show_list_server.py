@@ -0,0 +1,30 @@
+import logging
+from aiohttp import web
+from server import PromptServer
+
+from .nodes.utils.list_pages import get_list_page, DEFAULT_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Check if the route is already registered
+if not hasattr(PromptServer.instance, '_mpx_comfyui_show_list_route_registered'):
+    routes = PromptServer.instance.routes
+
+    # Pages of the rows registered by ShowList, fetched by the widget as it scrolls
+    @routes.get('/mpx_show_list/{handle}')
+    async def get_show_list_page(request: web.Request) -> web.Response:
+        try:
+            offset = int(request.query.get("offset", 0))
+            limit = int(request.query.get("limit", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return web.json_response({ "status": "error", "message": "'offset' and 'limit' must be numbers" }, status=400)
+
+        page = get_list_page(request.match_info["handle"], offset, limit)
+        if page is None:
+            return web.json_response({ "status": "error", "message": "Unknown list, run the workflow again to display it." }, status=404)
+        return web.json_response(page)
+
+    # Mark the route as registered to avoid duplicate registration
+    PromptServer.instance._mpx_comfyui_show_list_route_registered = True
+else:
+    logger.info("Route '/mpx_show_list' already registered; skipping duplicate initialization.")
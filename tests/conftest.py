@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# The tests import the package's modules through benchmarks/comfy_shims.py, which stands in for the ComfyUI
+# modules when ComfyUI isn't installed and skips the package's __init__.py.
+# Tests of modules that need torch, numpy or the MPX SDK are skipped when those aren't installed.
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import comfy_shims
+
+comfy_shims.install()
+
+
+class _PackageRootAsDirectory():
+    # the repository root is the ComfyUI package, pytest would import its __init__.py (which needs ComfyUI) before the tests
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collect_directory(self, path, parent):
+        if path == parent.config.rootpath:
+            return pytest.Dir.from_parent(parent, path=path)
+        return None
+
+
+def pytest_configure(config):
+    # registered as a plugin, the hooks of a conftest.py only apply to the directory it is in
+    config.pluginmanager.register(_PackageRootAsDirectory(), "mpx_package_root_as_directory")
@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("mpx_genai_sdk")
+
+from server import PromptServer
+from comfy_shims import import_package_module
+
+cancellation = import_package_module("nodes.sdk.cancellation")
+job_journal = import_package_module("nodes.sdk.job_journal")
+
+
+@pytest.fixture
+def token():
+    token = cancellation.get_cancellation_token()
+    yield token
+    token.reset()
+
+
+def test_cancel_of_the_previous_prompt_is_reset_when_the_next_prompt_starts(token):
+    PromptServer.instance.last_prompt_id = "prompt-1"
+    token.cancel("prompt-1")
+    assert cancellation.get_cancellation_token().is_cancelled()
+
+    PromptServer.instance.last_prompt_id = "prompt-2"
+    assert not cancellation.get_cancellation_token().is_cancelled()
+    cancellation.raise_if_cancelled()
+
+
+class RecordingJournal():
+    def __init__(self):
+        self.finished = []
+
+    def find_reusable(self, kind, fingerprint):
+        return "request-1"
+
+    def record_submitted(self, kind, fingerprint, request_id):
+        raise AssertionError("nothing should be submitted")
+
+    def record_finished(self, request_id, status):
+        self.finished.append((request_id, status))
+
+
+def test_cancel_during_reattach_neither_fails_the_job_nor_resubmits(monkeypatch):
+    journal = RecordingJournal()
+    monkeypatch.setattr(job_journal, "get_job_journal", lambda: journal)
+
+    def cancelled_get_status(request_id):
+        raise cancellation.OperationCancelled("MPX operation cancelled by the user")
+    monkeypatch.setattr(job_journal, "get_status", cancelled_get_status)
+
+    def submit():
+        raise AssertionError("nothing should be submitted")
+
+    with pytest.raises(cancellation.OperationCancelled):
+        job_journal.run_journaled_job("text2image", { "prompt": "a chair" }, submit)
+    assert journal.finished == []
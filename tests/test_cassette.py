@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("httpx")
+
+from comfy_shims import import_package_module
+
+cassette = import_package_module("nodes.sdk.cassette")
+
+
+def test_urls_in_text_bodies_are_redacted():
+    text = "<html>Moved to <a href=\"https://storage.example.com/a.glb?X-Amz-Signature=abc&v=2\">here</a></html>"
+    redacted = cassette.redact_text(text)
+    assert "abc" not in redacted
+    assert "https://storage.example.com/a.glb?X-Amz-Signature=<redacted>&v=2" in redacted
+
+
+def test_bearer_tokens_in_text_bodies_are_redacted():
+    redacted = cassette.redact_text("invalid credentials: Bearer eyJhbGci.payload.sig")
+    assert redacted == "invalid credentials: Bearer <redacted>"
+
+
+def test_json_bodies_are_redacted():
+    body = b'{"api_key": "k", "url": "https://example.com/x?token=t", "requestId": "r"}'
+    assert cassette._redact_body(body) == '{"api_key": "<redacted>", "requestId": "r", "url": "https://example.com/x?token=<redacted>"}'
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+
+requests = pytest.importorskip("requests")
+pytest.importorskip("joblib")
+pytest.importorskip("mpx_genai_sdk")
+pytest.importorskip("PIL")
+
+import fake_mpx
+from comfy_shims import import_package_module
+
+optimizer = import_package_module("nodes.sdk.components.optimizer")
+
+MESH_BYTES = bytes(range(256)) * 1000
+
+
+def source_response(headers):
+    def iter_content(chunk_size):
+        for start in range(0, len(MESH_BYTES), chunk_size):
+            yield MESH_BYTES[start:start + chunk_size]
+    return SimpleNamespace(headers=requests.structures.CaseInsensitiveDict(headers), iter_content=iter_content)
+
+
+@pytest.fixture
+def storage():
+    server = fake_mpx.FakeStorageServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.mark.parametrize("headers", [
+    { "Content-Length": str(len(MESH_BYTES)) },
+    {},                                                               # no Content-Length
+    { "Content-Length": "1234", "Content-Encoding": "gzip" },         # length on the wire, not of the decoded body
+], ids=["sized", "unsized", "encoded"])
+def test_relay_uploads_every_byte(storage, headers):
+    relay = optimizer.GLBStreamingRelay(source_response(headers), chunk_size=4096)
+    response = requests.put(f"{storage.base_url}/mesh.glb", data=relay.body())
+
+    assert response.ok
+    assert storage._get("/mesh.glb") == MESH_BYTES
+    assert relay.bytes_relayed == len(MESH_BYTES)
+    relay.check_complete()
+
+
+def test_relay_is_truthy_without_a_length():
+    assert optimizer.GLBStreamingRelay(source_response({}))
+
+
+def test_check_complete_rejects_empty_and_short_relays():
+    empty = optimizer.GLBStreamingRelay(SimpleNamespace(headers={}, iter_content=lambda chunk_size: iter([])))
+    list(empty)
+    with pytest.raises(ValueError):
+        empty.check_complete()
+
+    short = optimizer.GLBStreamingRelay(source_response({ "Content-Length": str(len(MESH_BYTES) + 1) }))
+    list(short)
+    with pytest.raises(ValueError):
+        short.check_complete()
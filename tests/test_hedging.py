@@ -0,0 +1,69 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("mpx_genai_sdk")
+
+from comfy_shims import import_package_module
+
+hedging = import_package_module("nodes.sdk.hedging")
+sdk_client = import_package_module("nodes.sdk.sdk_client")
+
+
+class SlowPrimaryClient():
+    """
+        The first request never finishes, every later one is complete on its first poll.
+    """
+    def __init__(self):
+        self.cancelled = []
+        self.status = SimpleNamespace(retrieve=self.retrieve, cancel=self.cancelled.append)
+
+    def retrieve(self, request_id):
+        return SimpleNamespace(status="processing" if request_id == "request-0" else "complete", processing_time_s=None)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(hedging, "POLL_INTERVAL_S", 0.01)
+    monkeypatch.setattr(hedging, "HEDGED_POLL_INTERVAL_S", 0.01)
+    client = SlowPrimaryClient()
+    previous = sdk_client.set_client(client)
+    yield client
+    sdk_client.set_client(previous)
+
+
+def test_losing_request_is_cancelled(client):
+    tracker = hedging.get_latency_tracker("test.hedge")
+    for _ in range(10):
+        tracker.record_latency(0.001)
+    request_ids = (f"request-{i}" for i in itertools.count())
+    policy = hedging.HedgingPolicy(enabled=True, percentile=50, budget_ratio=1.0, min_samples=1, endpoints=("test.hedge",))
+
+    request_id, status_resp = hedging.run_hedged("test.hedge", lambda: next(request_ids), policy=policy)
+
+    assert request_id == "request-1"
+    assert status_resp.status == "complete"
+    assert client.cancelled == ["request-0"]
+
+
+def test_unhedged_request_cancels_nothing(client):
+    request_id, _ = hedging.run_hedged("test.plain", lambda: "request-1", policy=hedging.HedgingPolicy(enabled=False))
+    assert request_id == "request-1"
+    assert client.cancelled == []
+
+
+def test_endpoints_that_upload_are_not_hedged(client):
+    tracker = hedging.get_latency_tracker("imageto3d")
+    for _ in range(10):
+        tracker.record_latency(0.001)
+    polls = itertools.count()
+    # the only request finishes after a few polls, long after it could have been hedged
+    client.status.retrieve = lambda request_id: SimpleNamespace(status="complete" if next(polls) >= 5 else "processing", processing_time_s=None)
+    submitted = []
+    policy = hedging.HedgingPolicy(enabled=True, percentile=50, budget_ratio=1.0, min_samples=1)
+
+    request_id, _ = hedging.run_hedged("imageto3d", lambda: submitted.append("request-0") or "request-0", policy=policy)
+
+    assert request_id == "request-0"
+    assert submitted == ["request-0"]
@@ -0,0 +1,36 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from comfy_shims import import_package_module
+
+image_hashing = import_package_module("nodes.utils.image_hashing")
+
+
+def gradient_image(width=64, height=64, reverse=False):
+    row = torch.linspace(0.0, 1.0, width)
+    if reverse:
+        row = row.flip(0)
+    return row.repeat(height, 1).unsqueeze(-1).repeat(1, 1, 3)
+
+
+def test_identical_images_are_clustered():
+    a = gradient_image()
+    b = gradient_image(reverse=True)
+    images = torch.stack([a, b, a.clone(), b.clone()])
+    assert image_hashing.cluster_near_duplicate_images(images, 4) == [0, 1, 0, 1]
+
+
+def test_closeness_does_not_chain(monkeypatch):
+    # a ~ b and b ~ c within the threshold, but a and c are twice as far apart
+    hashes = torch.zeros(3, 64, dtype=torch.bool)
+    hashes[1, :4] = True
+    hashes[2, :8] = True
+    monkeypatch.setattr(image_hashing, "compute_dhash_batch", lambda images: hashes)
+
+    assert image_hashing.cluster_near_duplicate_images(torch.zeros(3, 8, 8, 3), 4) == [0, 0, 2]
+
+
+def test_every_image_is_its_own_cluster_at_threshold_minus_one():
+    images = torch.stack([gradient_image(), gradient_image()])
+    assert image_hashing.cluster_near_duplicate_images(images, -1) == [0, 1]
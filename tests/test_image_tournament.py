@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("joblib")
+pytest.importorskip("hjson")
+pytest.importorskip("mpx_genai_sdk")
+
+from comfy_shims import import_node_module
+
+agent_pick_best = import_node_module("agent_pick_best_image_from_list")
+
+
+def test_index_returned_as_a_string_picks_that_image(monkeypatch):
+    # the judge always prefers the last image of a group and answers with a quoted index
+    monkeypatch.setattr(agent_pick_best, "pick_best_image_from_four_urls", lambda urls, *args: (str(len(urls)), ""))
+    ranking, rounds = agent_pick_best.run_image_tournament([f"url{i}" for i in range(6)], "", "", "")
+    assert [r["winner"] for r in rounds[0]] == [2, 5]
+    assert ranking[0] == 5
+
+
+def test_invalid_index_falls_back_to_the_first_image(monkeypatch):
+    monkeypatch.setattr(agent_pick_best, "pick_best_image_from_four_urls", lambda urls, *args: ("best", ""))
+    ranking, rounds = agent_pick_best.run_image_tournament(["a", "b", "c"], "", "", "")
+    assert rounds[0][0]["winner"] == 0
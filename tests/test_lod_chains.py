@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("joblib")
+pytest.importorskip("mpx_genai_sdk")
+
+from comfy_shims import import_package_module
+
+optimizer = import_package_module("nodes.sdk.components.optimizer")
+sdk_client = import_package_module("nodes.sdk.sdk_client")
+
+
+class ReusingJournal():
+    """
+        Journal in which every job re-attaches to the same earlier request.
+    """
+    def find_reusable(self, kind, fingerprint):
+        return "request-1"
+
+    def record_submitted(self, kind, fingerprint, request_id):
+        pass
+
+    def record_finished(self, request_id, status):
+        pass
+
+
+@pytest.fixture
+def client():
+    status = SimpleNamespace(retrieve=lambda request_id: SimpleNamespace(status="complete", output_url=f"https://example.com/{request_id}.glb"))
+    previous = sdk_client.set_client(SimpleNamespace(status=status))
+    yield
+    sdk_client.set_client(previous)
+
+
+def test_progress_reaches_the_total_with_shared_requests(client, monkeypatch):
+    monkeypatch.setattr(optimizer, "get_job_journal", lambda: ReusingJournal())
+    progress = []
+
+    manifests = optimizer.component_optimizer_lod_chains(
+        [{ "mesh_request_id": "mesh" }, { "mesh_request_id": "mesh" }],
+        target_ratios=[0.5, 0.25],
+        on_job_done=lambda n_done, n_jobs: progress.append((n_done, n_jobs)),
+    )
+
+    assert progress[-1][0] == progress[-1][1] == 1
+    assert all(lod["model_urls"]["glb"] == "https://example.com/request-1.glb" for manifest in manifests for lod in manifest["lods"])
+
+
+def test_waiting_without_a_client_fails_clearly():
+    get_status = import_package_module("nodes.sdk.get_status")
+    previous = sdk_client.set_client(None)
+    try:
+        with pytest.raises(RuntimeError, match="MPX_SDK_BEARER_TOKEN"):
+            get_status.get_status_many(["request-1"])
+    finally:
+        sdk_client.set_client(previous)
@@ -0,0 +1,62 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from comfy_shims import import_package_module
+
+base = import_package_module("base")
+fingerprint = import_package_module("nodes.utils.fingerprint")
+
+
+class CountingNode(base.BaseNode):
+    DETERMINISTIC = True
+
+    def __init__(self):
+        self.n_executions = 0
+
+    def execute(self, text="", output_folder=""):
+        self.n_executions += 1
+        return (text.upper(),)
+
+
+@pytest.fixture(autouse=True)
+def empty_memo(monkeypatch):
+    monkeypatch.setattr(fingerprint, "_node_results", fingerprint.OrderedDict())
+    monkeypatch.setattr(fingerprint, "_node_results_bytes", 0)
+
+
+def test_deterministic_node_runs_once():
+    node = CountingNode()
+    assert node.execute(text="a") == ("A",)
+    assert node.execute(text="a") == ("A",)
+    assert node.n_executions == 1
+
+
+def test_node_writing_files_always_runs():
+    node = CountingNode()
+    node.execute(text="a", output_folder="/tmp")
+    node.execute(text="a", output_folder="/tmp")
+    assert node.n_executions == 2
+
+
+def test_seed_does_not_make_a_node_deterministic():
+    assert not base.BaseNode.is_deterministic(seed=1)
+    assert not base.BaseNode.is_deterministic(seed=1, temp=0.7)
+    assert base.BaseNode.is_deterministic(seed=1, temp=0)
+
+
+def test_memo_is_bounded_by_bytes(monkeypatch):
+    monkeypatch.setenv("MPX_NODE_MEMO_MB", str(3 / 1024))  # 3 KiB
+    image = torch.zeros(256, dtype=torch.float32)  # 1 KiB
+    for key in ["a", "b", "c", "d"]:
+        fingerprint.memoize_result(key, [image])
+    assert list(fingerprint._node_results) == ["b", "c", "d"]
+
+    fingerprint.memoize_result("too_big", torch.zeros(1024, dtype=torch.float32))
+    assert fingerprint.get_memoized_result("too_big") == (False, None)
+
+
+def test_memo_off(monkeypatch):
+    monkeypatch.setenv("MPX_NODE_MEMO_MB", "0")
+    fingerprint.memoize_result("a", [])
+    assert fingerprint.get_memoized_result("a") == (False, None)
@@ -0,0 +1,77 @@
+import pytest
+
+from comfy_shims import import_package_module
+
+routing = import_package_module("nodes.sdk.llms.routing")
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(routing, "_model_stats", {})
+    monkeypatch.delenv("MPX_LLM_ROUTING", raising=False)
+    monkeypatch.setenv("MPX_LLM_FAILOVER_RATE", "0.5")
+    monkeypatch.setenv("MPX_LLM_FAILOVER_COOLDOWN_S", "60")
+
+
+def test_call_classes_get_the_cheapest_good_enough_model():
+    assert routing.choose_model("checklist") == "gpt-4o-mini"
+    assert routing.choose_model("long_form") == "gpt-4o"
+    assert routing.choose_model(None) == routing.choose_model("unknown") == routing.DEFAULT_MODEL
+
+
+def test_routing_off_uses_the_default_model(monkeypatch):
+    monkeypatch.setenv("MPX_LLM_ROUTING", "0")
+    assert routing.choose_model("checklist") == routing.DEFAULT_MODEL
+
+
+def test_excluded_model_is_not_chosen():
+    assert routing.choose_model("long_form", exclude=["gpt-4o"]) == "gpt-4o-mini"
+
+
+def test_failing_model_fails_over_and_comes_back(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(routing.time, "monotonic", lambda: now[0])
+
+    for _ in range(routing.FAILOVER_MIN_CALLS):
+        routing.record_model_call("gpt-4o", "long_form", False)
+    stats = routing.get_model_stats("gpt-4o")
+    assert not stats.is_available()
+    assert stats.n_failovers == 1
+    # a weaker model is better than a failing one
+    assert routing.choose_model("long_form") == "gpt-4o-mini"
+
+    now[0] += 61
+    assert stats.is_available()
+    routing.record_model_call("gpt-4o", "long_form", True, 1.0)
+    assert routing.choose_model("long_form") == "gpt-4o"
+
+
+def test_few_failures_do_not_fail_over():
+    routing.record_model_call("gpt-4o", "long_form", False)
+    routing.record_model_call("gpt-4o", "long_form", True, 1.0)
+    assert routing.get_model_stats("gpt-4o").is_available()
+
+
+def test_every_model_failing_picks_the_first_out_of_cooldown(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(routing.time, "monotonic", lambda: now[0])
+    for model in ["gpt-4o", "gpt-4o-mini"]:
+        for _ in range(routing.FAILOVER_MIN_CALLS):
+            routing.record_model_call(model, "checklist", False)
+        now[0] += 1
+    assert routing.choose_model("checklist") == "gpt-4o"
+
+
+def test_slow_model_costs_more():
+    for _ in range(5):
+        routing.record_model_call("gpt-4o-mini", "transform", True, 30.0 * 100)
+    assert routing.choose_model("transform") == "gpt-4o"
+
+
+def test_latency_percentiles():
+    stats = routing.ModelStats()
+    assert stats.percentile(50) is None
+    for latency in [1.0, 2.0, 3.0, 4.0, 5.0]:
+        stats.record(True, latency)
+    assert stats.percentile(50) == 3.0
+    assert stats.percentile(95) == 5.0
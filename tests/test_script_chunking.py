@@ -0,0 +1,102 @@
+from comfy_shims import import_package_module
+
+script_chunking = import_package_module("nodes.utils.script_chunking")
+
+SCRIPT = """TITLE PAGE
+
+INT. KITCHEN - NIGHT
+
+John makes coffee.
+
+EXT. GARDEN - DAY
+
+Mary waters the roses while the dog barks.
+
+12 INT./EXT. CAR - DAY
+
+They drive off.
+"""
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_scenes_start_at_headings():
+    scenes = script_chunking.split_script_into_scenes(SCRIPT)
+    assert len(scenes) == 4
+    assert scenes[0].strip() == "TITLE PAGE"
+    assert [scene.strip().split("\n")[0] for scene in scenes[1:]] == ["INT. KITCHEN - NIGHT", "EXT. GARDEN - DAY", "12 INT./EXT. CAR - DAY"]
+
+
+def test_chunks_are_whole_scenes_in_order():
+    chunks = script_chunking.split_script_into_chunks(SCRIPT, 12)
+    assert "".join(chunks) == SCRIPT
+    assert all(count_words(chunk) <= 12 for chunk in chunks)
+    assert len(chunks) > 1
+    for chunk in chunks[1:]:
+        assert script_chunking.SCENE_HEADING.match(chunk)
+
+
+def test_everything_fits_in_one_chunk():
+    assert script_chunking.split_script_into_chunks(SCRIPT, 1000) == [SCRIPT]
+
+
+def test_long_scene_is_split_between_paragraphs():
+    scene = "INT. HALL - DAY\n\n" + "\n\n".join(f"line {i} of the scene" for i in range(10))
+    chunks = script_chunking.split_script_into_chunks(scene, 12)
+    assert len(chunks) > 1
+    assert all(count_words(chunk) <= 12 for chunk in chunks)
+    assert "\n\n".join(chunks) == scene
+
+
+def test_paragraph_longer_than_a_chunk_is_kept_whole():
+    paragraph = " ".join(["word"] * 30)
+    assert script_chunking.split_script_into_chunks(paragraph, 10) == [paragraph]
+
+
+def test_same_names_are_merged():
+    entries = ["JOHN - a detective", "Mary (30s)", "John: tall", "the old car", "Old Car, rusty", "Lamp"]
+    groups, ambiguous_pairs = script_chunking.canonicalize_names(entries)
+    assert groups == [[0, 2], [1], [3, 4], [5]]
+    assert ambiguous_pairs == []
+
+
+def test_partial_names_are_ambiguous():
+    entries = ["JOHN - a detective", "JOHN SMITH - the boss", "Mary"]
+    groups, ambiguous_pairs = script_chunking.canonicalize_names(entries)
+    assert groups == [[0], [1], [2]]
+    assert ambiguous_pairs == [(0, 1)]
+    assert script_chunking.ambiguous_clusters(len(groups), ambiguous_pairs) == [[0, 1]]
+
+
+def test_similar_names_do_not_chain():
+    # Miller ~ Millar ~ Mellar, but Miller and Mellar are not clearly the same
+    entries = ["Sergeant Miller", "Sergeant Millar", "Sergeant Mellar"]
+    groups, ambiguous_pairs = script_chunking.canonicalize_names(entries)
+    assert groups == [[0, 1], [2]]
+    assert ambiguous_pairs == [(0, 1)]
+
+
+def test_canonical_entry_is_the_most_descriptive():
+    entries = ["JOHN", "John - a tired detective in a raincoat"]
+    assert script_chunking.pick_canonical_entry(entries, [0, 1]) == entries[1]
+
+
+def test_chunks_overlap_by_paragraphs():
+    text = "a b\n\nc d\n\ne f\n\ng h"
+    assert script_chunking.split_text_with_overlap(text, 4, 1) == ["a b\n\nc d", "c d\n\ne f", "e f\n\ng h"]
+    assert script_chunking.split_text_with_overlap(text, 4, 0) == ["a b\n\nc d", "e f\n\ng h"]
+
+
+def test_overlap_always_moves_forward():
+    text = "a b\n\nc d\n\ne f"
+    assert script_chunking.split_text_with_overlap(text, 2, 3) == ["a b", "c d", "e f"]
+
+
+def test_overlapping_chunks_cover_every_paragraph():
+    paragraphs = [f"paragraph {i} " + "word " * (i % 5) for i in range(30)]
+    chunks = script_chunking.split_text_with_overlap("\n\n".join(paragraphs), 12, 1)
+    covered = [p for chunk in chunks for p in chunk.split("\n\n")]
+    assert set(covered) == set(paragraphs)
+    assert all(count_words(chunk) <= 12 for chunk in chunks)
@@ -0,0 +1,93 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("mpx_genai_sdk")
+
+from comfy_shims import import_package_module
+
+shared_cache = import_package_module("nodes.sdk.shared_cache")
+
+
+@pytest.fixture
+def backend(monkeypatch, tmp_path):
+    monkeypatch.setenv("MPX_SHARED_CACHE", f"sqlite:{tmp_path / 'shared_cache.sqlite3'}")
+    monkeypatch.setenv("MPX_SHARED_CACHE_LEASE_S", "0.3")
+    return shared_cache.get_shared_cache()
+
+
+def test_result_is_stored_and_shared(backend):
+    calls = []
+    assert shared_cache.run_shared("op", { "x": 1 }, lambda: calls.append(1) or "result") == "result"
+    assert shared_cache.run_shared("op", { "x": 1 }, lambda: calls.append(1) or "other") == "result"
+    assert len(calls) == 1
+
+
+def test_ttl_of_the_call_site_is_used(backend, monkeypatch):
+    stored = []
+    monkeypatch.setattr(backend, "put", lambda namespace, key, value, ttl_s: stored.append(ttl_s))
+    shared_cache.run_shared("llms.call", { "x": 2 }, lambda: "answer", ttl_s=shared_cache.LLM_TTL_S)
+    assert stored == [shared_cache.LLM_TTL_S]
+    assert shared_cache.LLM_TTL_S < shared_cache.DEFAULT_TTL_S
+
+
+def test_lost_lease_is_not_stored(backend, monkeypatch):
+    claim = backend.claim
+
+    def slow_request():
+        # another worker takes the request over while this one stalls
+        monkeypatch.setattr(backend, "claim", lambda *args: False)
+        time.sleep(0.5)
+        return "result"
+
+    assert shared_cache.run_shared("op", { "x": 3 }, slow_request) == "result"
+    monkeypatch.setattr(backend, "claim", claim)
+    assert backend.get("op", shared_cache.request_key({ "x": 3 })) is None
+
+
+def test_unreachable_backend_runs_the_request(backend, monkeypatch):
+    def unreachable(*args):
+        raise ConnectionError("down")
+    monkeypatch.setattr(backend, "get", unreachable)
+    assert shared_cache.run_shared("op", { "x": 4 }, lambda: "result") == "result"
+
+
+def test_llm_output_the_caller_rejects_is_not_shared(backend):
+    call = import_package_module("nodes.sdk.llms.call")
+    sdk_client = import_package_module("nodes.sdk.sdk_client")
+    outputs = iter(["not json", '{"answer": 1}'])
+    completed = {}
+
+    def submit(**kwargs):
+        request_id = f"request-{len(completed)}"
+        completed[request_id] = next(outputs)
+        return SimpleNamespace(request_id=request_id)
+
+    def retrieve(request_id):
+        return SimpleNamespace(status="complete", processing_time_s=None, outputs=SimpleNamespace(output=completed[request_id]))
+
+    previous = sdk_client.set_client(SimpleNamespace(llms=SimpleNamespace(call=submit), status=SimpleNamespace(retrieve=retrieve)))
+    try:
+        is_valid = lambda output: output.startswith("{")
+        params = { "temperature": 0 }
+        assert call.llm_call("sys", "question", params, { "model": "gpt-4o" }, is_valid=is_valid) == "not json"
+        # the retry isn't answered from the shared cache with the rejected output
+        assert call.llm_call("sys", "question", params, { "model": "gpt-4o" }, is_valid=is_valid) == '{"answer": 1}'
+        assert call.llm_call("sys", "question", params, { "model": "gpt-4o" }, is_valid=is_valid) == '{"answer": 1}'
+        assert len(completed) == 2
+    finally:
+        sdk_client.set_client(previous)
+
+
+def test_incomplete_backend_fails_when_constructed():
+    class ResultsOnly(shared_cache.SharedCacheBackend):
+        def get(self, namespace, key):
+            return None
+
+        def put(self, namespace, key, value, ttl_s):
+            pass
+
+    with pytest.raises(TypeError):
+        ResultsOnly()
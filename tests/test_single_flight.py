@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+pytest.importorskip("mpx_genai_sdk")
+
+from comfy_shims import import_package_module
+
+single_flight = import_package_module("nodes.sdk.single_flight")
+
+
+def run_concurrently(n_callers, call):
+    results = [None] * n_callers
+    errors = [None] * n_callers
+
+    def caller(idx):
+        try:
+            results[idx] = call()
+        except Exception as e:
+            errors[idx] = e
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(n_callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_request_key_ignores_key_order():
+    assert single_flight.request_key({ "a": 1, "b": [1, 2] }) == single_flight.request_key({ "b": [1, 2], "a": 1 })
+    assert single_flight.request_key({ "a": 1 }) != single_flight.request_key({ "a": 2 })
+
+
+def test_concurrent_identical_requests_run_once(monkeypatch):
+    monkeypatch.delenv("MPX_SINGLE_FLIGHT", raising=False)
+    release = threading.Event()
+    n_runs = []
+
+    def fn():
+        n_runs.append(1)
+        release.wait(5)
+        return "result"
+
+    timer = threading.Timer(0.3, release.set)
+    timer.start()
+    results, errors = run_concurrently(4, lambda: single_flight.run_single_flight("op", { "prompt": "x" }, fn))
+    timer.cancel()
+    assert results == ["result"] * 4
+    assert errors == [None] * 4
+    assert len(n_runs) == 1
+
+
+def test_errors_are_shared(monkeypatch):
+    monkeypatch.delenv("MPX_SINGLE_FLIGHT", raising=False)
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ValueError("job failed")
+
+    timer = threading.Timer(0.3, release.set)
+    timer.start()
+    results, errors = run_concurrently(3, lambda: single_flight.run_single_flight("op", { "prompt": "y" }, fn))
+    timer.cancel()
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+def test_finished_requests_are_not_kept(monkeypatch):
+    monkeypatch.delenv("MPX_SINGLE_FLIGHT", raising=False)
+    n_runs = []
+    for _ in range(2):
+        single_flight.run_single_flight("op", { "prompt": "z" }, lambda: n_runs.append(1))
+    assert len(n_runs) == 2
+
+
+def test_turned_off(monkeypatch):
+    monkeypatch.setenv("MPX_SINGLE_FLIGHT", "0")
+    release = threading.Event()
+    n_runs = []
+
+    def fn():
+        n_runs.append(1)
+        release.wait(5)
+
+    timer = threading.Timer(0.3, release.set)
+    timer.start()
+    run_concurrently(3, lambda: single_flight.run_single_flight("op", { "prompt": "w" }, fn))
+    timer.cancel()
+    assert len(n_runs) == 3
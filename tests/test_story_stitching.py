@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+pytest.importorskip("joblib")
+pytest.importorskip("hjson")
+pytest.importorskip("torch")
+pytest.importorskip("mpx_genai_sdk")
+
+from comfy_shims import import_node_module
+
+text_to_story = import_node_module("text_to_story")
+
+
+def write_story(monkeypatch, sections):
+    outline = { "sections": [f"part {i}" for i in range(len(sections))], "style_guide": "", "characters": "", "reasoning": "" }
+    monkeypatch.setattr(text_to_story, "llm_call_with_json_parsing", lambda *args, **kwargs: outline)
+
+    node = text_to_story.TextToStory()
+    monkeypatch.setattr(node, "write_section", lambda prompt_data, idx, summary, temperature, pbar: sections[idx])
+
+    stitches = []
+    stitches_lock = threading.Lock()
+
+    def stitch_transition(style_guide, ending, opening):
+        with stitches_lock:
+            stitches.append((ending, opening))
+        return ending + "+", "+" + opening
+    monkeypatch.setattr(node, "stitch_transition", stitch_transition)
+
+    story, _, _ = node.write_long_form("gist", "fantasy", 100 * len(sections), 0.7, "", 100, 4)
+    return story, stitches
+
+
+def test_every_transition_is_stitched(monkeypatch):
+    story, stitches = write_story(monkeypatch, ["a1\n\na2", "b1\n\nb2", "c1"])
+    assert sorted(stitches) == [("a2", "b1"), ("b2", "c1")]
+    assert story.split("\n\n") == ["a1", "a2+", "+b1", "b2+", "+c1"]
+
+
+def test_single_paragraph_section_keeps_both_edits(monkeypatch):
+    story, stitches = write_story(monkeypatch, ["a1\n\na2", "b", "c", "d1\n\nd2"])
+    # the transition out of "b" and "c" is written against the edited paragraph
+    assert stitches[0] == ("a2", "b")
+    assert ("+b", "c") in stitches and ("+c", "d1") in stitches
+    assert story.split("\n\n") == ["a1", "a2+", "+b+", "+c+", "+d1", "d2"]
@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from comfy_shims import import_package_module
+
+text_similarity = import_package_module("nodes.utils.text_similarity")
+
+
+def test_normalized_duplicates():
+    texts = ["1. A red Car!", "a red car", "- A  RED car", "a blue boat"]
+    assert text_similarity.find_near_duplicates(texts) == [0, 0, 0, 3]
+
+
+def test_near_duplicates():
+    texts = [
+        "a small wooden table with four carved legs",
+        "a tall glass vase filled with dried flowers",
+        "a small wooden table with four carved leg",
+    ]
+    assert text_similarity.find_near_duplicates(texts) == [0, 1, 0]
+
+
+def test_different_texts_are_kept():
+    texts = ["an old brass lamp", "a rusty bicycle", "a stack of letters", ""]
+    assert text_similarity.find_near_duplicates(texts) == [0, 1, 2, 3]
+
+
+def test_signatures_are_stable():
+    a = text_similarity.MinHasher().signature("a small wooden table")
+    b = text_similarity.MinHasher().signature("a small wooden table")
+    assert a == b
+    assert text_similarity.estimated_jaccard(a, b) == 1.0
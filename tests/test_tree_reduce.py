@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("joblib")
+pytest.importorskip("hjson")
+pytest.importorskip("torch")
+pytest.importorskip("mpx_genai_sdk")
+
+from comfy_shims import import_node_module, import_package_module
+
+list_to_text = import_node_module("list_to_text")
+general = import_package_module("nodes.utils.general")
+
+
+def test_estimate_tokens():
+    assert general.estimate_tokens("") == 1
+    assert general.estimate_tokens("abcd") == 1
+    assert general.estimate_tokens("abcde") == 2
+    assert general.estimate_tokens("x" * 400) == 100
+    assert general.estimate_tokens(12345678) == 2
+
+
+def test_groups_stay_within_the_budget():
+    token_estimates = [10, 10, 10, 90, 95, 10, 10]
+    groups = list_to_text.pack_groups(token_estimates, 100)
+    assert groups == [[0, 1, 2], [3], [4], [5, 6]]
+    assert [i for group in groups for i in group] == list(range(len(token_estimates)))
+    assert all(sum(token_estimates[i] for i in group) <= 100 for group in groups)
+
+
+def test_string_over_the_budget_is_its_own_group():
+    assert list_to_text.pack_groups([150, 10, 10], 100) == [[0], [1, 2]]
+
+
+def reduce(monkeypatch, strings, max_group_tokens):
+    node = list_to_text.StringListToText()
+    merged_groups = []
+
+    def merge_strings(group, model, temp, custom_instructions):
+        merged_groups.append(group)
+        return " ".join(group)
+    monkeypatch.setattr(node, "merge_strings", merge_strings)
+    items, levels = node.reduce_to_fit(strings, "auto", 0, "", max_group_tokens, 2)
+    return items, levels, merged_groups
+
+
+def test_long_strings_are_not_grouped_past_the_budget(monkeypatch):
+    strings = ["x" * 40] * 6 + ["y" * 380] * 2
+    items, levels, merged_groups = reduce(monkeypatch, strings, 100)
+    assert all(sum(general.estimate_tokens(s) for s in group) <= 100 for group in merged_groups)
+    assert levels >= 1
+
+
+def test_warns_when_the_list_still_does_not_fit(monkeypatch, capsys):
+    items, levels, merged_groups = reduce(monkeypatch, ["x" * 800], 100)
+    assert items == ["x" * 800]
+    assert levels == 0
+    assert merged_groups == []
+    assert "Warning" in capsys.readouterr().out